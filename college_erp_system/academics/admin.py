@@ -1,9 +1,46 @@
+from django import forms
 from django.contrib import admin
 from .models import (
     Department, Course, Class, Subject, TimeSlot, 
-    Timetable, Attendance, Exam, Result, Fee,
-    AcademicCalendar, TeacherTimetable
+    Timetable, Attendance, AttendanceSummary, DailyAttendanceRollup, Exam, Result, Fee,
+    AcademicCalendar, TeacherTimetable, DailyFeeCollection
 )
+from .conflicts import describe, timetable_conflicts, teacher_timetable_conflicts
+from .rollups import refresh_attendance_summaries, refresh_daily_attendance
+
+
+class ConflictCheckedForm(forms.ModelForm):
+    """Reject entries that double-book a teacher, room or class"""
+    required_for_check = ()
+    find_conflicts = None
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if all(cleaned_data.get(field) for field in self.required_for_check):
+            fields = {name: cleaned_data.get(name) for name in self._meta.fields}
+            entry = self._meta.model(pk=self.instance.pk, **fields)
+            conflicts = type(self).find_conflicts(entry)
+            if conflicts:
+                raise forms.ValidationError([describe(conflict) for conflict in conflicts])
+        return cleaned_data
+
+
+class TimetableAdminForm(ConflictCheckedForm):
+    required_for_check = ('class_assigned', 'subject', 'time_slot')
+    find_conflicts = timetable_conflicts
+
+    class Meta:
+        model = Timetable
+        fields = ['class_assigned', 'subject', 'time_slot', 'room_number']
+
+
+class TeacherTimetableAdminForm(ConflictCheckedForm):
+    required_for_check = ('teacher', 'subject', 'time_slot', 'academic_year')
+    find_conflicts = teacher_timetable_conflicts
+
+    class Meta:
+        model = TeacherTimetable
+        fields = ['teacher', 'subject', 'time_slot', 'room_number', 'academic_year']
 
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
@@ -37,6 +74,7 @@ class TimeSlotAdmin(admin.ModelAdmin):
 
 @admin.register(Timetable)
 class TimetableAdmin(admin.ModelAdmin):
+    form = TimetableAdminForm
     list_display = ['class_assigned', 'subject', 'time_slot', 'room_number']
     list_filter = ['class_assigned__department', 'time_slot__day']
     search_fields = ['subject__course__name', 'room_number']
@@ -48,6 +86,43 @@ class AttendanceAdmin(admin.ModelAdmin):
     search_fields = ['student__username', 'subject__course__name']
     date_hierarchy = 'date'
 
+    # Admin edits bypass save_attendance, so the counters derived from Attendance
+    # are recomputed for every (student, subject, date) a change touches
+    def save_model(self, request, obj, form, change):
+        before = Attendance.objects.filter(pk=obj.pk).values_list('student_id', 'subject_id', 'date').first()
+        super().save_model(request, obj, form, change)
+        self.refresh_rollups([before, (obj.student_id, obj.subject_id, obj.date)])
+
+    def delete_model(self, request, obj):
+        touched = (obj.student_id, obj.subject_id, obj.date)
+        super().delete_model(request, obj)
+        self.refresh_rollups([touched])
+
+    def delete_queryset(self, request, queryset):
+        touched = list(queryset.values_list('student_id', 'subject_id', 'date'))
+        super().delete_queryset(request, queryset)
+        self.refresh_rollups(touched)
+
+    def refresh_rollups(self, touched):
+        touched = [key for key in touched if key]
+        refresh_attendance_summaries((student_id, subject_id) for student_id, subject_id, _ in touched)
+        for subject_id in {subject_id for _, subject_id, _ in touched}:
+            refresh_daily_attendance({day for _, subject, day in touched if subject == subject_id}, subject_id)
+
+@admin.register(AttendanceSummary)
+class AttendanceSummaryAdmin(admin.ModelAdmin):
+    list_display = ['student', 'subject', 'present_count', 'total_count', 'updated_at']
+    list_filter = ['subject__course__department', 'subject__subject_type']
+    search_fields = ['student__username', 'subject__course__name']
+    readonly_fields = ['student', 'subject', 'present_count', 'total_count', 'updated_at']
+
+@admin.register(DailyAttendanceRollup)
+class DailyAttendanceRollupAdmin(admin.ModelAdmin):
+    list_display = ['date', 'class_assigned', 'subject', 'department', 'present_count', 'total_count']
+    list_filter = ['department', 'date']
+    date_hierarchy = 'date'
+    readonly_fields = ['date', 'class_assigned', 'subject', 'department', 'present_count', 'total_count', 'updated_at']
+
 @admin.register(Exam)
 class ExamAdmin(admin.ModelAdmin):
     list_display = ['name', 'exam_type', 'subject', 'date', 'total_marks', 'created_by']
@@ -70,6 +145,15 @@ class FeeAdmin(admin.ModelAdmin):
     date_hierarchy = 'due_date'
     list_editable = ['payment_status']
 
+@admin.register(DailyFeeCollection)
+class DailyFeeCollectionAdmin(admin.ModelAdmin):
+    list_display = ['date', 'academic_year', 'fee_type', 'payment_method', 'department', 'amount', 'transaction_count']
+    list_filter = ['fee_type', 'academic_year', 'department', 'payment_method']
+    date_hierarchy = 'date'
+    readonly_fields = [
+        'date', 'academic_year', 'fee_type', 'payment_method', 'department', 'amount', 'transaction_count', 'updated_at'
+    ]
+
 @admin.register(AcademicCalendar)
 class AcademicCalendarAdmin(admin.ModelAdmin):
     list_display = ['title', 'category', 'start_date', 'end_date', 'academic_year', 'instructional_days', 'working_days']
@@ -80,6 +164,7 @@ class AcademicCalendarAdmin(admin.ModelAdmin):
 
 @admin.register(TeacherTimetable)
 class TeacherTimetableAdmin(admin.ModelAdmin):
+    form = TeacherTimetableAdminForm
     list_display = ['teacher', 'subject', 'time_slot', 'room_number', 'academic_year']
     list_filter = ['academic_year', 'time_slot__day', 'teacher']
     search_fields = ['teacher__username', 'teacher__first_name', 'teacher__last_name', 'subject__course__name', 'room_number']
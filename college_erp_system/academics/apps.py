@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AcademicsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'academics'
+
+    def ready(self):
+        from .signals import connect_reference_signals, connect_timetable_signals
+        connect_timetable_signals()
+        connect_reference_signals()
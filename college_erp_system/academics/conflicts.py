@@ -0,0 +1,233 @@
+"""
+Double-booking detection for timetables.
+
+Every entry books up to three resources on its day: the teacher (Subject.teacher
+for a class timetable), the room and the class. Slots can overlap without being
+equal, so bookings are compared as [start, end) time intervals.
+
+`ConflictIndex` keeps, per (resource, day), the accepted bookings as a sorted list
+of disjoint intervals; checking a proposed entry is a binary search per resource.
+A single entry is checked by `timetable_conflicts` / `teacher_timetable_conflicts`
+against only the rows the database finds overlapping its slot. `find_conflicts`
+audits a whole academic year in one sweep over the sorted intervals instead of
+comparing rows pairwise.
+"""
+from bisect import bisect_right
+from collections import defaultdict, namedtuple
+
+from .models import Timetable, TeacherTimetable
+
+# One booked interval; `resources` is a tuple of (kind, key, label) it occupies
+Booking = namedtuple('Booking', 'pk day start end resources label')
+
+# Two bookings of the same resource whose intervals overlap
+Conflict = namedtuple('Conflict', 'kind resource day first second')
+
+RESOURCE_NAMES = {'teacher': 'Teacher', 'room': 'Room', 'class': 'Class'}
+
+
+def room_key(room_number):
+    """Rooms compare case- and whitespace-insensitively"""
+    return ' '.join(room_number.split()).upper() if room_number else None
+
+
+def _booking(pk, day, start, end, label, teacher=None, room_number=None, class_=None):
+    resources = []
+    if teacher:
+        resources.append(('teacher', teacher[0], teacher[1]))
+    room = room_key(room_number)
+    if room:
+        resources.append(('room', room, room_number.strip()))
+    if class_:
+        resources.append(('class', class_[0], class_[1]))
+    return Booking(pk, day, start, end, tuple(resources), label)
+
+
+def overlapping_slots(queryset, booking):
+    """Rows of `queryset` whose time slot overlaps `booking` on its day, filtered in the database"""
+    return queryset.filter(
+        time_slot__day=booking.day,
+        time_slot__start_time__lt=booking.end,
+        time_slot__end_time__gt=booking.start,
+    )
+
+
+def timetable_bookings(academic_year=None, exclude=None, overlapping=None):
+    """Bookings of class Timetable rows (teacher, room, class), in one query"""
+    queryset = Timetable.objects.all()
+    if overlapping:
+        queryset = overlapping_slots(queryset, overlapping)
+    if academic_year:
+        queryset = queryset.filter(class_assigned__academic_year=academic_year)
+    if exclude:
+        queryset = queryset.exclude(pk=exclude)
+    rows = queryset.values(
+        'pk', 'room_number', 'class_assigned_id', 'class_assigned__name', 'subject__course__code',
+        'subject__teacher_id', 'subject__teacher__username',
+        'time_slot__day', 'time_slot__start_time', 'time_slot__end_time',
+    )
+    return [
+        _booking(
+            row['pk'], row['time_slot__day'], row['time_slot__start_time'], row['time_slot__end_time'],
+            label=f"{row['subject__course__code']} for {row['class_assigned__name']}",
+            teacher=(row['subject__teacher_id'], row['subject__teacher__username']) if row['subject__teacher_id'] else None,
+            room_number=row['room_number'],
+            class_=(row['class_assigned_id'], row['class_assigned__name']),
+        )
+        for row in rows
+    ]
+
+
+def teacher_timetable_bookings(academic_year=None, exclude=None, overlapping=None):
+    """Bookings of TeacherTimetable rows (teacher, room), in one query"""
+    queryset = TeacherTimetable.objects.all()
+    if overlapping:
+        queryset = overlapping_slots(queryset, overlapping)
+    if academic_year:
+        queryset = queryset.filter(academic_year=academic_year)
+    if exclude:
+        queryset = queryset.exclude(pk=exclude)
+    rows = queryset.values(
+        'pk', 'room_number', 'teacher_id', 'teacher__username', 'subject__course__code',
+        'time_slot__day', 'time_slot__start_time', 'time_slot__end_time',
+    )
+    return [
+        _booking(
+            row['pk'], row['time_slot__day'], row['time_slot__start_time'], row['time_slot__end_time'],
+            label=f"{row['subject__course__code']} taught by {row['teacher__username']}",
+            teacher=(row['teacher_id'], row['teacher__username']),
+            room_number=row['room_number'],
+        )
+        for row in rows
+    ]
+
+
+def booking_for_timetable(entry):
+    """Booking for an unsaved or edited Timetable instance"""
+    subject, slot = entry.subject, entry.time_slot
+    teacher = subject.teacher
+    return _booking(
+        entry.pk, slot.day, slot.start_time, slot.end_time,
+        label=f"{subject.course.code} for {entry.class_assigned.name}",
+        teacher=(teacher.pk, teacher.username) if teacher else None,
+        room_number=entry.room_number,
+        class_=(entry.class_assigned_id, entry.class_assigned.name),
+    )
+
+
+def booking_for_teacher_timetable(entry):
+    """Booking for an unsaved or edited TeacherTimetable instance"""
+    slot = entry.time_slot
+    return _booking(
+        entry.pk, slot.day, slot.start_time, slot.end_time,
+        label=f"{entry.subject.course.code} taught by {entry.teacher.username}",
+        teacher=(entry.teacher_id, entry.teacher.username),
+        room_number=entry.room_number,
+    )
+
+
+class IntervalIndex:
+    """
+    [start, end) intervals of one resource on one day, sorted by start.
+
+    `max_ends[i]` is the latest end among the first i + 1 intervals, so the lookup
+    stays correct even if the stored rows already overlap each other.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.max_ends = []
+        self.bookings = []
+
+    def overlapping(self, start, end):
+        """A booking overlapping [start, end), or None, found by binary search"""
+        i = bisect_right(self.starts, start)
+        # Intervals starting at or before `start` overlap only if one ends after it
+        if i > 0 and self.max_ends[i - 1] > start:
+            for j in range(i - 1, -1, -1):
+                if self.bookings[j].end > start:
+                    return self.bookings[j]
+        # Otherwise only the next interval can start before `end`
+        if i < len(self.bookings) and self.bookings[i].start < end:
+            return self.bookings[i]
+        return None
+
+    def add(self, booking):
+        i = bisect_right(self.starts, booking.start)
+        self.starts.insert(i, booking.start)
+        self.bookings.insert(i, booking)
+        self.max_ends.insert(i, booking.end)
+        latest = self.max_ends[i - 1] if i else booking.end
+        for j in range(i, len(self.max_ends)):
+            latest = max(latest, self.bookings[j].end)
+            self.max_ends[j] = latest
+
+
+class ConflictIndex:
+    """Per-day interval indexes of every resource booked by a set of entries"""
+
+    def __init__(self, bookings=()):
+        self.indexes = defaultdict(IntervalIndex)
+        for booking in bookings:
+            self.add(booking)
+
+    def conflicts(self, booking):
+        """Existing bookings that `booking` would double-book, one per clashing resource"""
+        found = []
+        for kind, key, label in booking.resources:
+            index = self.indexes.get((kind, key, booking.day))
+            other = index.overlapping(booking.start, booking.end) if index else None
+            if other is not None:
+                found.append(Conflict(kind, label, booking.day, other, booking))
+        return found
+
+    def add(self, booking):
+        for kind, key, _ in booking.resources:
+            self.indexes[(kind, key, booking.day)].add(booking)
+
+
+def find_conflicts(bookings):
+    """
+    Every pair of bookings that overlap on a shared resource.
+
+    One sweep per (resource, day) over the intervals sorted by start: a booking clashes
+    with each still-active booking that ends after it starts.
+    """
+    by_resource = defaultdict(list)
+    for booking in bookings:
+        for kind, key, label in booking.resources:
+            by_resource[(kind, key, booking.day)].append((booking, label))
+
+    conflicts = []
+    for (kind, _, day), entries in by_resource.items():
+        entries.sort(key=lambda item: (item[0].start, item[0].end))
+        active = []
+        for booking, label in entries:
+            active = [other for other in active if other.end > booking.start]
+            conflicts.extend(Conflict(kind, label, day, other, booking) for other in active)
+            active.append(booking)
+    return conflicts
+
+
+def timetable_conflicts(entry):
+    """Conflicts a Timetable entry would create within its class's academic year"""
+    booking = booking_for_timetable(entry)
+    index = ConflictIndex(timetable_bookings(entry.class_assigned.academic_year, exclude=entry.pk, overlapping=booking))
+    return index.conflicts(booking)
+
+
+def teacher_timetable_conflicts(entry):
+    """Conflicts a TeacherTimetable entry would create within its academic year"""
+    booking = booking_for_teacher_timetable(entry)
+    index = ConflictIndex(teacher_timetable_bookings(entry.academic_year, exclude=entry.pk, overlapping=booking))
+    return index.conflicts(booking)
+
+
+def describe(conflict):
+    """One-line description of a conflict for messages and reports"""
+    first, second = conflict.first, conflict.second
+    return (
+        f"{RESOURCE_NAMES[conflict.kind]} {conflict.resource} is double-booked on {conflict.day.title()}: "
+        f"{first.label} ({first.start:%H:%M}-{first.end:%H:%M}) overlaps "
+        f"{second.label} ({second.start:%H:%M}-{second.end:%H:%M})"
+    )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from academics.conflicts import describe, find_conflicts, timetable_bookings, teacher_timetable_bookings
+
+SOURCES = {
+    'timetable': ('Class timetable', timetable_bookings),
+    'teacher': ('Teacher timetable', teacher_timetable_bookings),
+}
+
+
+class Command(BaseCommand):
+    help = 'Report every teacher, room and class double-booking in the timetables of an academic year'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', help='Academic year to audit, e.g. 2025-2026 (default: all years)')
+        parser.add_argument(
+            '--source',
+            choices=sorted(SOURCES) + ['all'],
+            default='all',
+            help='Audit the class timetable, the teacher timetable or both (default)'
+        )
+
+    def handle(self, *args, **options):
+        sources = SOURCES if options['source'] == 'all' else {options['source']: SOURCES[options['source']]}
+        total = 0
+        for title, load_bookings in sources.values():
+            bookings = load_bookings(options['year'])
+            conflicts = find_conflicts(bookings)
+            total += len(conflicts)
+            self.stdout.write(f'{title}: {len(bookings)} entries, {len(conflicts)} conflict(s)')
+            for conflict in conflicts:
+                self.stdout.write(self.style.WARNING(f'  {describe(conflict)}'))
+
+        if total:
+            self.stdout.write(self.style.ERROR(f'Found {total} double-booking(s)'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No double-bookings found'))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from academics.scheduler import TimetableSolver, synthetic_instance
+
+
+class Command(BaseCommand):
+    help = 'Time the timetable solver on synthetic departments of increasing size'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='25,50,100,200,400',
+            help='Comma-separated numbers of classes (default 25,50,100,200,400)'
+        )
+        parser.add_argument('--subjects', type=int, default=6, help='Subjects per class (default 6)')
+        parser.add_argument('--teacher-load', type=int, default=5, help='Subjects per teacher (default 5)')
+        parser.add_argument('--periods', type=int, default=7, help='Periods per day, six days a week (default 7)')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'classes':>8} {'sessions':>9} {'slots':>6} {'seconds':>8} {'unplaced':>9} {'repeats':>8} {'conflicts':>10}")
+        for size in (int(value) for value in options['sizes'].split(',')):
+            sessions, slots, rooms, labs = synthetic_instance(
+                size, subjects_per_class=options['subjects'], teacher_load=options['teacher_load'],
+                periods=options['periods'], seed=options['seed']
+            )
+            solver = TimetableSolver(sessions, slots, rooms, labs, seed=options['seed'])
+            started = time.perf_counter()
+            unplaced = solver.solve()
+            elapsed = time.perf_counter() - started
+            conflicts = len(solver.conflicts())
+            style = self.style.SUCCESS if not (unplaced or conflicts) else self.style.WARNING
+            self.stdout.write(style(
+                f'{size:>8} {len(sessions):>9} {len(slots):>6} {elapsed:>8.2f} {len(unplaced):>9} '
+                f'{solver.same_day_repeats():>8} {conflicts:>10}'
+            ))
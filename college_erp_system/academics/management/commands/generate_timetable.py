@@ -0,0 +1,185 @@
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from academics.conflicts import room_key
+from academics.models import Class, Subject, TimeSlot, Timetable, TeacherTimetable
+from academics.scheduler import DEFAULT_WEEKLY_SESSIONS, Slot, TimetableSolver, build_sessions
+from academics.timetables import bump_timetable_version
+
+User = get_user_model()
+
+
+def _weekly_sessions(value):
+    """TH=3,PR=2,TU=1"""
+    sessions = dict(DEFAULT_WEEKLY_SESSIONS)
+    for part in filter(None, value.split(',')):
+        subject_type, _, count = part.partition('=')
+        sessions[subject_type.strip().upper()] = int(count)
+    return sessions
+
+
+def _names(value):
+    return [' '.join(name.split()) for name in value.split(',') if name.strip()]
+
+
+class Command(BaseCommand):
+    help = 'Generate conflict-free class and teacher timetables for the classes of an academic year'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', required=True, help='Academic year of the classes, e.g. 2025-2026')
+        parser.add_argument('--department', help='Only classes of this department code')
+        parser.add_argument('--semester', type=int, help='Only classes of this semester')
+        parser.add_argument(
+            '--sessions',
+            type=_weekly_sessions,
+            default=dict(DEFAULT_WEEKLY_SESSIONS),
+            help='Weekly sessions per subject type (default TH=3,PR=2,TU=1)'
+        )
+        parser.add_argument('--rooms', type=_names, default=[], help='Comma-separated classrooms to allocate')
+        parser.add_argument('--labs', type=_names, default=[], help='Comma-separated labs for practical (PR) sessions')
+        parser.add_argument(
+            '--unavailable',
+            action='append',
+            default=[],
+            metavar='USERNAME:DAY[:HH:MM-HH:MM]',
+            help='A time a teacher cannot teach (whole day without a time range); repeatable'
+        )
+        parser.add_argument('--iterations', type=int, default=20000, help='Repair steps for hard-to-place sessions')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--dry-run', action='store_true', help='Solve and report without writing anything')
+
+    def handle(self, *args, **options):
+        year = options['year']
+        classes = Class.objects.filter(academic_year=year)
+        if options['department']:
+            classes = classes.filter(department__code=options['department'])
+        if options['semester']:
+            classes = classes.filter(semester=options['semester'])
+        class_ids = list(classes.values_list('id', flat=True))
+        if not class_ids:
+            raise CommandError(f'No classes found for {year}')
+
+        subjects = list(Subject.objects.filter(class_assigned_id__in=class_ids).values_list(
+            'id', 'class_assigned_id', 'teacher_id', 'subject_type'
+        ))
+        subject_ids = [subject[0] for subject in subjects]
+        slots = [Slot(*row) for row in TimeSlot.objects.values_list('id', 'day', 'start_time', 'end_time')]
+        if not slots:
+            raise CommandError('No time slots defined')
+
+        rooms = {room_key(name): name for name in options['rooms'] + options['labs']}
+        blocked = self.fixed_bookings(year, class_ids, subject_ids, slots)
+        for spec in options['unavailable']:
+            self.block_unavailable(spec, slots, blocked)
+
+        sessions = build_sessions(subjects, options['sessions'])
+        solver = TimetableSolver(
+            sessions, slots,
+            rooms=[room_key(name) for name in options['rooms']],
+            labs=[room_key(name) for name in options['labs']],
+            blocked=blocked, seed=options['seed']
+        )
+        started = time.perf_counter()
+        unplaced = solver.solve(options['iterations'])
+        elapsed = time.perf_counter() - started
+
+        conflicts = solver.conflicts()
+        if conflicts:
+            raise CommandError(f'Solver produced {len(conflicts)} conflict(s); nothing written')
+
+        self.stdout.write(
+            f'{len(class_ids)} classes, {len(subjects)} subjects, {len(sessions)} weekly sessions, '
+            f'{len(slots)} slots: placed {len(solver.assignment)} in {elapsed:.2f}s, '
+            f'{solver.same_day_repeats()} same-day repeat(s)'
+        )
+        if unplaced:
+            names = dict(Subject.objects.filter(id__in={sessions[i].subject_id for i in unplaced}).values_list(
+                'id', 'course__code'
+            ))
+            for i in unplaced:
+                self.stdout.write(self.style.WARNING(
+                    f'  Could not place a session of {names.get(sessions[i].subject_id)} '
+                    f'(class {sessions[i].class_id}): no free slot for its teacher, class or room'
+                ))
+
+        if options['dry_run']:
+            self.stdout.write('Dry run: nothing written')
+            return
+
+        timetable, teacher_timetable = [], []
+        for i, (slot_id, room) in solver.assignment.items():
+            session = sessions[i]
+            room_number = rooms.get(room, '')
+            timetable.append(Timetable(
+                class_assigned_id=session.class_id, subject_id=session.subject_id,
+                time_slot_id=slot_id, room_number=room_number
+            ))
+            if session.teacher_id:
+                teacher_timetable.append(TeacherTimetable(
+                    teacher_id=session.teacher_id, subject_id=session.subject_id,
+                    time_slot_id=slot_id, room_number=room_number, academic_year=year
+                ))
+
+        with transaction.atomic():
+            Timetable.objects.filter(class_assigned_id__in=class_ids).delete()
+            TeacherTimetable.objects.filter(subject_id__in=subject_ids, academic_year=year).delete()
+            Timetable.objects.bulk_create(timetable, batch_size=500)
+            TeacherTimetable.objects.bulk_create(teacher_timetable, batch_size=500)
+        # bulk_create sends no post_save, so refresh the cached grids here
+        bump_timetable_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {len(timetable)} timetable and {len(teacher_timetable)} teacher timetable entries'
+        ))
+
+    def fixed_bookings(self, year, class_ids, subject_ids, slots):
+        """Slots taken by teachers and rooms outside the classes being generated"""
+        busy = []
+        for teacher_id, room, day, start, end in Timetable.objects.filter(
+            class_assigned__academic_year=year
+        ).exclude(class_assigned_id__in=class_ids).values_list(
+            'subject__teacher_id', 'room_number', 'time_slot__day', 'time_slot__start_time', 'time_slot__end_time'
+        ):
+            if teacher_id:
+                busy.append((('teacher', teacher_id), day, start, end))
+            if room_key(room):
+                busy.append((('room', room_key(room)), day, start, end))
+        for teacher_id, room, day, start, end in TeacherTimetable.objects.filter(
+            academic_year=year
+        ).exclude(subject_id__in=subject_ids).values_list(
+            'teacher_id', 'room_number', 'time_slot__day', 'time_slot__start_time', 'time_slot__end_time'
+        ):
+            busy.append((('teacher', teacher_id), day, start, end))
+            if room_key(room):
+                busy.append((('room', room_key(room)), day, start, end))
+
+        blocked = defaultdict(set)
+        for resource, day, start, end in busy:
+            for slot in slots:
+                if slot.day == day and slot.start < end and start < slot.end:
+                    blocked[resource].add(slot.id)
+        return blocked
+
+    def block_unavailable(self, spec, slots, blocked):
+        username, _, rest = spec.partition(':')
+        day, _, times = rest.partition(':')
+        day = day.lower()
+        try:
+            teacher_id = User.objects.get(username=username, user_type='teacher').id
+        except User.DoesNotExist:
+            raise CommandError(f'Unknown teacher "{username}" in --unavailable {spec}')
+        if day not in dict(TimeSlot.DAY_CHOICES):
+            raise CommandError(f'Unknown day "{day}" in --unavailable {spec}')
+        if times:
+            try:
+                start, end = (datetime.strptime(value, '%H:%M').time() for value in times.split('-'))
+            except ValueError:
+                raise CommandError(f'Times must be HH:MM-HH:MM in --unavailable {spec}')
+        for slot in slots:
+            if slot.day == day and (not times or (slot.start < end and start < slot.end)):
+                blocked[('teacher', teacher_id)].add(slot.id)
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from academics.models import TeacherTimetable, TimeSlot, Subject
+from academics.conflicts import ConflictIndex, booking_for_teacher_timetable, describe, teacher_timetable_bookings
 from datetime import time
 
 User = get_user_model()
@@ -103,6 +104,9 @@ class Command(BaseCommand):
             ('friday', time(15, 30), time(16, 30), 'RJS - VY 403', 'VY 403'),
         ]
         
+        # Other teachers' entries this year, to keep rooms from being double-booked
+        booked = ConflictIndex(teacher_timetable_bookings('2025-2026'))
+        
         created_count = 0
         for day, start_time, end_time, subject_pattern, room in timetable_mapping:
             # Find the appropriate subject (simplified - you may need better matching)
@@ -122,15 +126,24 @@ class Command(BaseCommand):
                     )
                 )
             
+            entry = TeacherTimetable(
+                teacher=teacher,
+                subject=subject,
+                time_slot=time_slot,
+                room_number=room,
+                academic_year='2025-2026'
+            )
+            booking = booking_for_teacher_timetable(entry)
+            conflicts = booked.conflicts(booking)
+            if conflicts:
+                for conflict in conflicts:
+                    self.stdout.write(self.style.WARNING(f'Skipped: {describe(conflict)}'))
+                continue
+            
             # Create teacher timetable entry
             try:
-                TeacherTimetable.objects.create(
-                    teacher=teacher,
-                    subject=subject,
-                    time_slot=time_slot,
-                    room_number=room,
-                    academic_year='2025-2026'
-                )
+                entry.save()
+                booked.add(booking)
                 created_count += 1
                 self.stdout.write(
                     self.style.SUCCESS(
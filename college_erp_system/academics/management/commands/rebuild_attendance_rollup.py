@@ -0,0 +1,25 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from academics.rollups import rebuild_daily_attendance
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily attendance rollup used by the admin attendance analytics'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from-date',
+            type=date.fromisoformat,
+            help='First day to rebuild (YYYY-MM-DD); defaults to the earliest attendance record'
+        )
+        parser.add_argument(
+            '--to-date',
+            type=date.fromisoformat,
+            help='Last day to rebuild (YYYY-MM-DD); defaults to the latest attendance record'
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_daily_attendance(options['from_date'], options['to_date'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {written} daily attendance rollup row(s)')
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from academics.rollups import rebuild_attendance_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-student/per-subject attendance summaries from the Attendance table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Number of summary rows written per INSERT',
+            default=1000
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_attendance_summaries(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {written} attendance summary row(s)')
+        )
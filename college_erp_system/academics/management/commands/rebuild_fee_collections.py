@@ -0,0 +1,25 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from academics.rollups import rebuild_fee_collections
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily fee-collection rollup used by the financial dashboard and reports'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from-date',
+            type=date.fromisoformat,
+            help='First day to rebuild (YYYY-MM-DD); defaults to the earliest completed transaction'
+        )
+        parser.add_argument(
+            '--to-date',
+            type=date.fromisoformat,
+            help='Last day to rebuild (YYYY-MM-DD); defaults to the latest completed transaction'
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_fee_collections(options['from_date'], options['to_date'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {written} daily fee collection row(s)')
+        )
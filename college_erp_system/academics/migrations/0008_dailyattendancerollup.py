@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0007_attendancesummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('class_assigned', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='academics.class')),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='academics.department')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='academics.subject')),
+            ],
+            options={
+                'ordering': ['date'],
+                'unique_together': {('date', 'class_assigned', 'subject', 'department')},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0008_dailyattendancerollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['marked_by', 'date'], name='attendance_marker_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date'], name='attendance_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['subject', 'date'], name='exam_subject_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['date'], name='exam_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fee',
+            index=models.Index(fields=['academic_year', 'payment_status'], name='fee_year_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fee',
+            index=models.Index(fields=['payment_status', 'due_date'], name='fee_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['created_at', 'status'], name='transaction_created_status_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0009_attendance_attendance_marker_date_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyFeeCollection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('academic_year', models.CharField(max_length=9)),
+                ('fee_type', models.CharField(choices=[('tuition', 'Tuition Fee'), ('library', 'Library Fee'), ('lab', 'Laboratory Fee'), ('exam', 'Examination Fee'), ('development', 'Development Fee'), ('other', 'Other Fee')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='academics.department')),
+                ('payment_method', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='academics.paymentmethod')),
+            ],
+            options={
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['academic_year', 'date'], name='fee_collection_year_date_idx')],
+                'unique_together': {('date', 'academic_year', 'fee_type', 'payment_method', 'department')},
+            },
+        ),
+    ]
@@ -143,11 +143,57 @@ class Attendance(models.Model):
     
     class Meta:
         unique_together = ['student', 'subject', 'date']
+        indexes = [
+            # Teacher dashboard: attendance recently marked by a teacher
+            models.Index(fields=['marked_by', 'date'], name='attendance_marker_date_idx'),
+            # Date-range reports and rollup refreshes
+            models.Index(fields=['date'], name='attendance_date_idx'),
+        ]
     
     def __str__(self):
         status = "Present" if self.is_present else "Absent"
         return f"{self.student.username} - {self.subject.course.name} - {self.date} - {status}"
 
+class AttendanceSummary(models.Model):
+    """Running present/total counters per student and subject, kept in step with Attendance"""
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='attendance_summaries'
+    )
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='attendance_summaries')
+    present_count = models.PositiveIntegerField(default=0)
+    total_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['student', 'subject']
+        verbose_name_plural = 'Attendance summaries'
+
+    def __str__(self):
+        return f"{self.student.username} - {self.subject.course.name} - {self.present_count}/{self.total_count}"
+
+    @property
+    def percentage(self):
+        return round((self.present_count / self.total_count * 100), 2) if self.total_count > 0 else 0.0
+
+class DailyAttendanceRollup(models.Model):
+    """Present/total attendance per day and subject, with class and department denormalized for analytics"""
+    date = models.DateField()
+    class_assigned = models.ForeignKey(Class, on_delete=models.CASCADE)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+    department = models.ForeignKey(Department, on_delete=models.CASCADE)
+    present_count = models.PositiveIntegerField(default=0)
+    total_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['date', 'class_assigned', 'subject', 'department']
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.date} - {self.subject.course.name} - {self.present_count}/{self.total_count}"
+
 class Exam(models.Model):
     EXAM_TYPE_CHOICES = [
         ('midterm', 'Mid-term Exam'),
@@ -173,6 +219,14 @@ class Exam(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            # Upcoming/past exams per subject, ordered by date
+            models.Index(fields=['subject', 'date'], name='exam_subject_date_idx'),
+            # Admin dashboard: exams in the coming week
+            models.Index(fields=['date'], name='exam_date_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.name} - {self.subject.course.name}"
 
@@ -261,6 +315,14 @@ class Fee(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Financial dashboards and reports for an academic year, split by status
+            models.Index(fields=['academic_year', 'payment_status'], name='fee_year_status_idx'),
+            # Pending/overdue totals and defaulter lists (status first so status-only filters can use it too)
+            models.Index(fields=['payment_status', 'due_date'], name='fee_status_due_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.student.username} - {self.get_fee_type_display()} - {self.amount}"
     
@@ -368,10 +430,36 @@ class Transaction(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Transaction history: newest first, filtered by status
+            models.Index(fields=['created_at', 'status'], name='transaction_created_status_idx'),
+        ]
     
     def __str__(self):
         return f"Transaction {self.transaction_id} - {self.amount}"
 
+class DailyFeeCollection(models.Model):
+    """Completed payments per day, fee type, payment method and department, for the financial views"""
+    date = models.DateField()
+    academic_year = models.CharField(max_length=9)
+    fee_type = models.CharField(max_length=20, choices=Fee.FEE_TYPE_CHOICES)
+    payment_method = models.ForeignKey(PaymentMethod, on_delete=models.SET_NULL, null=True, blank=True)
+    department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    transaction_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['date', 'academic_year', 'fee_type', 'payment_method', 'department']
+        ordering = ['date']
+        indexes = [
+            # Reports scoped to an academic year
+            models.Index(fields=['academic_year', 'date'], name='fee_collection_year_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.get_fee_type_display()} - {self.amount}"
+
 class FeeStructure(models.Model):
     """Define fee structure for courses/classes"""
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='fee_structures')
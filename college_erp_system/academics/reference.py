@@ -0,0 +1,90 @@
+"""
+Per-process cache of small reference tables.
+
+Departments, time slots and payment methods change a few times a term but are
+read on almost every page (base.html lists the departments through the global
+context processor). Each worker loads a table once into a tuple and keeps it
+until the version stamp in the default cache changes or REFERENCE_CACHE_TTL
+seconds pass. academics.signals replaces the stamp whenever one of these rows is
+saved or deleted: the worker that made the change reloads on its next read, and
+so does every other worker when CACHES is shared. With the per-process
+LocMemCache other workers only reload once the TTL runs out.
+
+The tuples hold model instances shared by every request and thread of the
+process, so callers must treat them as read-only: no attribute assignment, no
+save(), and no relation lookups that would cache onto them (filter on the id
+instead). To change a row, fetch a fresh instance, e.g.
+Department.objects.get(pk=department.pk).
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Department, PaymentMethod, TimeSlot
+
+REFERENCE_VERSION_KEY = 'academics:reference:version'
+
+_lock = threading.RLock()
+_tables = {}
+_loaded_version = None
+_loaded_at = 0.0
+
+
+def reference_version():
+    # A random token rather than a counter: after a cache clear or eviction a
+    # counter would restart at a value workers may already have loaded
+    version = cache.get(REFERENCE_VERSION_KEY)
+    if version is None:
+        cache.add(REFERENCE_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(REFERENCE_VERSION_KEY)
+    return version
+
+
+def _replace_version():
+    cache.set(REFERENCE_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def bump_reference_version(**kwargs):
+    """Signal receiver: make every worker reload the reference tables"""
+    # Now, so this request sees its own change, and again after commit, so no
+    # worker keeps a table it read before the change was committed
+    _replace_version()
+    transaction.on_commit(_replace_version)
+
+
+def _table(name, load):
+    """The cached tuple for `name`; shared between threads, never to be mutated"""
+    global _loaded_version, _loaded_at
+    version = reference_version()
+    with _lock:
+        if version != _loaded_version or time.monotonic() - _loaded_at >= settings.REFERENCE_CACHE_TTL:
+            _tables.clear()
+            _loaded_version = version
+            _loaded_at = time.monotonic()
+        if name not in _tables:
+            _tables[name] = tuple(load())
+        return _tables[name]
+
+
+def departments():
+    """All departments ordered by name"""
+    return _table('departments', lambda: Department.objects.order_by('name'))
+
+
+def time_slots():
+    """All time slots in day and start time order"""
+    return _table('time_slots', lambda: TimeSlot.objects.all())
+
+
+def payment_methods():
+    """All payment methods, active or not"""
+    return _table('payment_methods', lambda: PaymentMethod.objects.order_by('id'))
+
+
+def active_payment_methods():
+    """Payment methods students can pay with"""
+    return _table('active_payment_methods', lambda: (method for method in payment_methods() if method.is_active))
@@ -0,0 +1,333 @@
+"""
+Attendance and fee-collection rollups maintained alongside the raw tables
+
+Attendance written through teachers.views.save_attendance or the Django admin
+keeps the rollups in step. Rows changed any other way (shell, raw SQL, data
+imports) need `manage.py rebuild_attendance_summary` and
+`manage.py rebuild_attendance_rollup` afterwards.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractMonth, TruncDate, TruncDay, TruncWeek
+from django.utils import timezone
+
+from .models import (
+    Attendance, AttendanceSummary, DailyAttendanceRollup, Fee, Transaction, DailyFeeCollection
+)
+
+
+def apply_attendance_changes(subject, changes):
+    """
+    Fold one marking of a subject into the per-student AttendanceSummary counters.
+
+    `changes` maps a student's user id to a `(was_present, is_present)` pair, where
+    `was_present` is None when the Attendance row did not exist before this marking.
+    Call it inside the transaction that wrote the Attendance rows.
+    """
+    if not changes:
+        return
+
+    summaries = {
+        summary.student_id: summary
+        for summary in AttendanceSummary.objects.filter(subject=subject, student_id__in=list(changes))
+    }
+
+    now = timezone.now()
+    to_create, to_update = [], []
+    for student_id, (was_present, is_present) in changes.items():
+        total_delta = 1 if was_present is None else 0
+        present_delta = int(is_present) - int(bool(was_present))
+
+        summary = summaries.get(student_id)
+        if summary is None:
+            to_create.append(AttendanceSummary(
+                student_id=student_id,
+                subject=subject,
+                present_count=max(present_delta, 0),
+                total_count=total_delta,
+            ))
+        elif total_delta or present_delta:
+            summary.total_count += total_delta
+            summary.present_count = max(summary.present_count + present_delta, 0)
+            summary.updated_at = now
+            to_update.append(summary)
+
+    if to_create:
+        AttendanceSummary.objects.bulk_create(to_create)
+    if to_update:
+        AttendanceSummary.objects.bulk_update(to_update, ['present_count', 'total_count', 'updated_at'])
+
+
+def refresh_attendance_summaries(pairs):
+    """Recompute the AttendanceSummary rows of the given (student id, subject id) pairs from Attendance"""
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+    match = reduce(or_, (Q(student_id=student_id, subject_id=subject_id) for student_id, subject_id in pairs))
+
+    grouped = Attendance.objects.filter(match).values('student_id', 'subject_id').annotate(
+        total=Count('id'),
+        present=Count('id', filter=Q(is_present=True))
+    ).order_by()
+    summaries = [
+        AttendanceSummary(
+            student_id=row['student_id'],
+            subject_id=row['subject_id'],
+            present_count=row['present'],
+            total_count=row['total'],
+        )
+        for row in grouped
+    ]
+
+    with transaction.atomic():
+        AttendanceSummary.objects.filter(match).delete()
+        AttendanceSummary.objects.bulk_create(summaries)
+    return len(summaries)
+
+
+@transaction.atomic
+def rebuild_attendance_summaries(batch_size=1000):
+    """Recompute every AttendanceSummary row from Attendance. Returns the number of rows written."""
+    AttendanceSummary.objects.all().delete()
+
+    grouped = Attendance.objects.values('student_id', 'subject_id').annotate(
+        total=Count('id'),
+        present=Count('id', filter=Q(is_present=True))
+    ).order_by()
+
+    written = 0
+    batch = []
+    for row in grouped.iterator(chunk_size=batch_size):
+        batch.append(AttendanceSummary(
+            student_id=row['student_id'],
+            subject_id=row['subject_id'],
+            present_count=row['present'],
+            total_count=row['total'],
+        ))
+        if len(batch) >= batch_size:
+            AttendanceSummary.objects.bulk_create(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        AttendanceSummary.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def refresh_daily_attendance(dates, subject=None):
+    """
+    Recompute DailyAttendanceRollup rows for the given days, optionally limited to one subject.
+
+    Only the Attendance rows of those days are read, so the cost follows the size of the
+    marking rather than the size of the table. Returns the number of rollup rows written.
+    """
+    dates = set(dates)
+    if not dates:
+        return 0
+
+    stale = DailyAttendanceRollup.objects.filter(date__in=dates)
+    records = Attendance.objects.filter(date__in=dates)
+    if subject is not None:
+        stale = stale.filter(subject=subject)
+        records = records.filter(subject=subject)
+
+    grouped = records.values(
+        'date',
+        'subject_id',
+        'subject__class_assigned_id',
+        'subject__class_assigned__department_id'
+    ).annotate(
+        total=Count('id'),
+        present=Count('id', filter=Q(is_present=True))
+    ).order_by()
+
+    rollups = [
+        DailyAttendanceRollup(
+            date=row['date'],
+            subject_id=row['subject_id'],
+            class_assigned_id=row['subject__class_assigned_id'],
+            department_id=row['subject__class_assigned__department_id'],
+            present_count=row['present'],
+            total_count=row['total'],
+        )
+        for row in grouped
+    ]
+
+    with transaction.atomic():
+        stale.delete()
+        DailyAttendanceRollup.objects.bulk_create(rollups)
+    return len(rollups)
+
+
+def rebuild_daily_attendance(date_from=None, date_to=None, batch_days=31):
+    """Rebuild the daily rollup for a date range (the whole Attendance table by default), a batch of days at a time"""
+    dates = Attendance.objects.order_by('date').values_list('date', flat=True).distinct()
+    if date_from:
+        dates = dates.filter(date__gte=date_from)
+    if date_to:
+        dates = dates.filter(date__lte=date_to)
+
+    stale = DailyAttendanceRollup.objects.all()
+    if date_from:
+        stale = stale.filter(date__gte=date_from)
+    if date_to:
+        stale = stale.filter(date__lte=date_to)
+    stale.delete()
+
+    written = 0
+    batch = []
+    for day in list(dates):
+        batch.append(day)
+        if len(batch) >= batch_days:
+            written += refresh_daily_attendance(batch)
+            batch = []
+    if batch:
+        written += refresh_daily_attendance(batch)
+    return written
+
+
+def daily_attendance_totals(date_from, date_to, department_id=None):
+    """Rollup queryset for a date range, optionally scoped to a department"""
+    rollups = DailyAttendanceRollup.objects.filter(date__range=[date_from, date_to])
+    if department_id:
+        rollups = rollups.filter(department_id=department_id)
+    return rollups
+
+
+def attendance_trend(date_from, date_to, granularity='day', department_id=None):
+    """Present/total/percentage per day or per week (weeks start on Monday) from the daily rollup"""
+    trunc = TruncWeek('date') if granularity == 'week' else TruncDay('date')
+    series = daily_attendance_totals(date_from, date_to, department_id).annotate(
+        period=trunc
+    ).values('period').annotate(
+        present=Sum('present_count'),
+        total=Sum('total_count')
+    ).order_by('period')
+
+    return [
+        {
+            'period': row['period'],
+            'present': row['present'] or 0,
+            'total': row['total'] or 0,
+            'percentage': round((row['present'] or 0) / row['total'] * 100, 2) if row['total'] else 0.0,
+        }
+        for row in series
+    ]
+
+
+def record_fee_collection(payment):
+    """
+    Add a completed Transaction to its DailyFeeCollection row.
+
+    Call it inside the transaction that completed the payment. The row for the
+    payment's day, academic year, fee type, method and department is incremented in
+    place, or created when this is its first payment.
+    """
+    fee = payment.fee
+    department_id = Fee.objects.filter(pk=fee.pk).values_list(
+        'student__student_profile__department_id', flat=True
+    ).first()
+    key = {
+        'date': timezone.localdate(payment.completed_at or timezone.now()),
+        'academic_year': fee.academic_year,
+        'fee_type': fee.fee_type,
+        'payment_method_id': payment.payment_method_id,
+        'department_id': department_id,
+    }
+
+    with transaction.atomic():
+        updated = DailyFeeCollection.objects.filter(**key).update(
+            amount=F('amount') + payment.amount,
+            transaction_count=F('transaction_count') + 1,
+            updated_at=timezone.now()
+        )
+        if not updated:
+            DailyFeeCollection.objects.create(amount=payment.amount, transaction_count=1, **key)
+
+
+@transaction.atomic
+def rebuild_fee_collections(date_from=None, date_to=None, batch_size=1000):
+    """Recompute DailyFeeCollection from completed transactions (all of them by default). Returns rows written."""
+    stale = DailyFeeCollection.objects.all()
+    payments = Transaction.objects.filter(status='completed', completed_at__isnull=False).annotate(
+        day=TruncDate('completed_at')
+    )
+    if date_from:
+        stale = stale.filter(date__gte=date_from)
+        payments = payments.filter(day__gte=date_from)
+    if date_to:
+        stale = stale.filter(date__lte=date_to)
+        payments = payments.filter(day__lte=date_to)
+    stale.delete()
+
+    grouped = payments.values(
+        'day',
+        'fee__academic_year',
+        'fee__fee_type',
+        'payment_method_id',
+        'fee__student__student_profile__department_id'
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by()
+
+    written = 0
+    batch = []
+    for row in grouped.iterator(chunk_size=batch_size):
+        batch.append(DailyFeeCollection(
+            date=row['day'],
+            academic_year=row['fee__academic_year'],
+            fee_type=row['fee__fee_type'],
+            payment_method_id=row['payment_method_id'],
+            department_id=row['fee__student__student_profile__department_id'],
+            amount=row['total'],
+            transaction_count=row['count'],
+        ))
+        if len(batch) >= batch_size:
+            DailyFeeCollection.objects.bulk_create(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        DailyFeeCollection.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def monthly_fee_collections(collections):
+    """Amount collected per calendar month (1-12, zero when nothing was collected) over a DailyFeeCollection queryset"""
+    totals = dict(
+        collections.annotate(month=ExtractMonth('date')).values('month').annotate(
+            total=Sum('amount')
+        ).order_by().values_list('month', 'total')
+    )
+    return [{'month': month, 'amount': totals.get(month) or 0} for month in range(1, 13)]
+
+
+def fee_collection_breakdown(collections):
+    """
+    Amount and payment count per fee type and per payment method over a DailyFeeCollection
+    queryset, both read from one grouped query. Returns `(by_fee_type, by_method)` lists.
+    """
+    fee_type_names = dict(Fee.FEE_TYPE_CHOICES)
+    by_type, by_method = {}, {}
+    rows = collections.values('fee_type', 'payment_method__name').annotate(
+        total=Sum('amount'),
+        count=Sum('transaction_count')
+    ).order_by()
+
+    for row in rows:
+        for totals, key in (
+            (by_type, fee_type_names.get(row['fee_type'], row['fee_type'])),
+            (by_method, row['payment_method__name'] or 'Manual'),
+        ):
+            entry = totals.setdefault(key, {'name': key, 'amount': 0, 'count': 0})
+            entry['amount'] += row['total'] or 0
+            entry['count'] += row['count'] or 0
+
+    return (
+        sorted(by_type.values(), key=lambda entry: entry['name']),
+        sorted(by_method.values(), key=lambda entry: entry['name']),
+    )
@@ -0,0 +1,270 @@
+"""
+Timetable generator.
+
+Every subject needs a number of weekly sessions, set per subject type. Two sessions
+clash when they share a teacher or a class and their time slots overlap, so a
+timetable is a colouring of that conflict graph with time slots:
+
+1. Sessions are placed largest degree first (Welsh-Powell: the busiest teachers and
+   classes first), each into the cheapest free slot.
+2. Sessions left without a slot are placed by ejecting the sessions blocking the
+   slot with the fewest blockers; the ejected sessions are re-placed the same way
+   (ejection chains, with a short tabu tenure so the search does not cycle).
+3. A final pass moves sessions to spread each subject over different days.
+
+Rooms are a per-slot capacity: a session needs a free room from its pool (a lab for
+practicals when labs are given). The solver works on plain tuples; the
+generate_timetable command loads them from and writes them to the database.
+"""
+import random
+from collections import Counter, defaultdict, deque, namedtuple
+
+from .conflicts import Booking, find_conflicts
+from .models import TimeSlot
+
+# Weekly sessions per Subject.subject_type
+DEFAULT_WEEKLY_SESSIONS = {'TH': 3, 'PR': 2, 'TU': 1}
+
+DAYS = [day for day, _ in TimeSlot.DAY_CHOICES]
+
+Slot = namedtuple('Slot', 'id day start end')
+Session = namedtuple('Session', 'subject_id class_id teacher_id subject_type')
+
+# Soft-constraint weights
+SAME_DAY_PENALTY = 10  # per extra session of a subject on one day
+DAY_LOAD_PENALTY = 1  # per session the class already has that day
+
+# Repair iterations an ejected session stays put before it may be ejected again
+TABU_TENURE = 7
+
+
+class TimetableSolver:
+    """
+    Place `sessions` into `slots`.
+
+    `blocked` maps a resource - ('teacher', id), ('class', id) or ('room', key) - to
+    the slot ids it is unavailable in (other commitments, existing bookings).
+    """
+
+    def __init__(self, sessions, slots, rooms=(), labs=(), blocked=None, seed=0):
+        self.sessions = list(sessions)
+        self.slots = {slot.id: slot for slot in slots}
+        self.slot_ids = sorted(self.slots, key=lambda i: (
+            DAYS.index(self.slots[i].day) if self.slots[i].day in DAYS else len(DAYS), self.slots[i].start
+        ))
+        self.blocked = defaultdict(set, blocked or {})
+        self.pools = {'room': list(rooms), 'lab': list(labs)}
+        self.rng = random.Random(seed)
+
+        # Slots sharing time with each slot (itself included)
+        self.overlaps = {
+            t: [u for u in self.slot_ids if self.slots[u].day == self.slots[t].day
+                and self.slots[u].start < self.slots[t].end and self.slots[t].start < self.slots[u].end]
+            for t in self.slot_ids
+        }
+
+        self.resources = [
+            [('class', s.class_id)] + ([('teacher', s.teacher_id)] if s.teacher_id else [])
+            for s in self.sessions
+        ]
+        load = Counter(res for resources in self.resources for res in resources)
+        self.degree = [sum(load[res] for res in resources) for resources in self.resources]
+
+        self.assignment = {}
+        self.busy = defaultdict(Counter)  # resource -> slot -> sessions in overlapping slots
+        self.placed = defaultdict(lambda: defaultdict(set))  # resource -> slot -> sessions in that slot
+        self.pool_busy = defaultdict(Counter)  # pool -> slot -> rooms taken in overlapping slots
+        self.subject_days = Counter()
+        self.class_days = Counter()
+
+    # State -----------------------------------------------------------------
+
+    def pool(self, i):
+        if self.sessions[i].subject_type == 'PR' and self.pools['lab']:
+            return 'lab'
+        return 'room' if self.pools['room'] else None
+
+    def place(self, i, t, room):
+        session, day = self.sessions[i], self.slots[t].day
+        self.assignment[i] = (t, room)
+        resources = self.resources[i] + ([('room', room)] if room else [])
+        for res in resources:
+            self.placed[res][t].add(i)
+            for u in self.overlaps[t]:
+                self.busy[res][u] += 1
+        pool = self.pool(i)
+        if room and pool:
+            for u in self.overlaps[t]:
+                self.pool_busy[pool][u] += 1
+        self.subject_days[(session.subject_id, day)] += 1
+        self.class_days[(session.class_id, day)] += 1
+
+    def remove(self, i):
+        t, room = self.assignment.pop(i)
+        session, day = self.sessions[i], self.slots[t].day
+        resources = self.resources[i] + ([('room', room)] if room else [])
+        for res in resources:
+            self.placed[res][t].discard(i)
+            for u in self.overlaps[t]:
+                self.busy[res][u] -= 1
+        pool = self.pool(i)
+        if room and pool:
+            for u in self.overlaps[t]:
+                self.pool_busy[pool][u] -= 1
+        self.subject_days[(session.subject_id, day)] -= 1
+        self.class_days[(session.class_id, day)] -= 1
+
+    # Choosing slots --------------------------------------------------------
+
+    def allowed(self, i, t):
+        """Not ruled out by fixed unavailability, whatever else is placed"""
+        return all(t not in self.blocked[res] for res in self.resources[i])
+
+    def free(self, i, t):
+        """Allowed, no clash with placed sessions and (as a quick upper bound) a room left in the pool"""
+        if not self.allowed(i, t) or any(self.busy[res][t] for res in self.resources[i]):
+            return False
+        pool = self.pool(i)
+        return pool is None or self.pool_busy[pool][t] < len(self.pools[pool])
+
+    def free_room(self, i, t):
+        """A room from the session's pool free at slot t, '' when rooms are not tracked, else None"""
+        pool = self.pool(i)
+        if pool is None:
+            return ''
+        for room in self.pools[pool]:
+            res = ('room', room)
+            if not self.busy[res][t] and t not in self.blocked[res]:
+                return room
+        return None
+
+    def cost(self, i, t):
+        session, day = self.sessions[i], self.slots[t].day
+        return (SAME_DAY_PENALTY * self.subject_days[(session.subject_id, day)]
+                + DAY_LOAD_PENALTY * self.class_days[(session.class_id, day)])
+
+    def place_best(self, i):
+        """Place session i in its cheapest free slot; False if there is none"""
+        candidates = sorted(
+            (self.cost(i, t), self.rng.random(), t) for t in self.slot_ids if self.free(i, t)
+        )
+        for _, _, t in candidates:
+            room = self.free_room(i, t)
+            if room is not None:
+                self.place(i, t, room)
+                return True
+        return False
+
+    def blockers(self, i, t):
+        """Placed sessions that must move for session i to take slot t, and the room it would get"""
+        found = set()
+        for res in self.resources[i]:
+            for u in self.overlaps[t]:
+                found |= self.placed[res][u]
+        room = self.free_room(i, t)
+        if room is None:
+            # Free the room of the pool whose occupants are fewest
+            options = []
+            for candidate in self.pools[self.pool(i)]:
+                res = ('room', candidate)
+                if t in self.blocked[res]:
+                    continue
+                occupants = set().union(*(self.placed[res][u] for u in self.overlaps[t]))
+                options.append((len(occupants - found), candidate, occupants))
+            if not options:
+                return None, None
+            _, room, occupants = min(options)
+            found |= occupants
+        return found, room
+
+    # Solving ---------------------------------------------------------------
+
+    def solve(self, iterations=20000):
+        """Place every session it can; returns the indexes of sessions left unplaced"""
+        order = sorted(range(len(self.sessions)), key=lambda i: (-self.degree[i], self.rng.random()))
+        queue = deque(i for i in order if not self.place_best(i))
+
+        # Ejection chains for the sessions the greedy pass could not place
+        tabu = {}
+        for iteration in range(iterations):
+            if not queue:
+                break
+            i = queue.popleft()
+            if self.place_best(i):
+                continue
+            options = []
+            for t in self.slot_ids:
+                if not self.allowed(i, t):
+                    continue
+                ejected, room = self.blockers(i, t)
+                if ejected is None or any(tabu.get(j, -1) > iteration for j in ejected):
+                    continue
+                options.append((len(ejected), self.rng.random(), t, room, ejected))
+            if not options:
+                queue.append(i)
+                continue
+            _, _, t, room, ejected = min(options)
+            for j in ejected:
+                self.remove(j)
+            self.place(i, t, room)
+            tabu[i] = iteration + TABU_TENURE
+            queue.extend(ejected)
+
+        # Spread subjects over the week
+        for _ in range(2):
+            for i in order:
+                if i in self.assignment:
+                    current = self.assignment[i]
+                    self.remove(i)
+                    if not self.place_best(i):
+                        self.place(i, *current)
+
+        return list(queue)
+
+    # Reporting -------------------------------------------------------------
+
+    def same_day_repeats(self):
+        return sum(count - 1 for count in self.subject_days.values() if count > 1)
+
+    def conflicts(self):
+        """Independent check of the result with the double-booking detector"""
+        bookings = []
+        for i, (t, room) in self.assignment.items():
+            slot = self.slots[t]
+            resources = tuple((kind, key, str(key)) for kind, key in self.resources[i])
+            if room:
+                resources += (('room', room, room),)
+            bookings.append(Booking(i, slot.day, slot.start, slot.end, resources, str(self.sessions[i].subject_id)))
+        return find_conflicts(bookings)
+
+
+def build_sessions(subjects, weekly_sessions=None):
+    """One Session per weekly meeting of each (subject_id, class_id, teacher_id, subject_type)"""
+    weekly_sessions = weekly_sessions or DEFAULT_WEEKLY_SESSIONS
+    return [
+        Session(subject_id, class_id, teacher_id, subject_type)
+        for subject_id, class_id, teacher_id, subject_type in subjects
+        for _ in range(weekly_sessions.get(subject_type, 0))
+    ]
+
+
+def synthetic_instance(classes, subjects_per_class=6, teacher_load=5, days=6, periods=7, seed=0):
+    """Random department: classes with TH/PR/TU subjects, teachers covering `teacher_load` subjects each"""
+    from datetime import time
+
+    rng = random.Random(seed)
+    slots = [
+        Slot(d * periods + p, DAYS[d], time(9 + p), time(10 + p))
+        for d in range(days) for p in range(periods)
+    ]
+    types = ['TH'] * (subjects_per_class - 2) + ['PR', 'TU']
+    subject_count = classes * subjects_per_class
+    teachers = list(range(max(1, subject_count // teacher_load)))
+    rng.shuffle(teachers)
+    subjects = [
+        (c * subjects_per_class + k, c, teachers[(c * subjects_per_class + k) % len(teachers)], types[k])
+        for c in range(classes) for k in range(subjects_per_class)
+    ]
+    rooms = [f'R{n}' for n in range(classes)]
+    labs = [f'LAB{n}' for n in range(max(1, classes // 3))]
+    return build_sessions(subjects), slots, rooms, labs
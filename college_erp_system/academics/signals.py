@@ -0,0 +1,25 @@
+from django.db.models.signals import post_save, post_delete
+
+from .models import Class, Course, Department, PaymentMethod, Subject, TimeSlot, Timetable, TeacherTimetable
+from .reference import bump_reference_version
+from .timetables import bump_timetable_version
+
+# Models whose rows appear in the cached timetable grids
+TIMETABLE_MODELS = [Timetable, TeacherTimetable, Subject, Course, TimeSlot, Class, Department]
+
+# Models held in the per-process reference cache
+REFERENCE_MODELS = [Department, TimeSlot, PaymentMethod]
+
+
+def connect_timetable_signals():
+    for model in TIMETABLE_MODELS:
+        dispatch_uid = f'timetable_version_{model._meta.label_lower}'
+        post_save.connect(bump_timetable_version, sender=model, dispatch_uid=f'{dispatch_uid}_save')
+        post_delete.connect(bump_timetable_version, sender=model, dispatch_uid=f'{dispatch_uid}_delete')
+
+
+def connect_reference_signals():
+    for model in REFERENCE_MODELS:
+        dispatch_uid = f'reference_version_{model._meta.label_lower}'
+        post_save.connect(bump_reference_version, sender=model, dispatch_uid=f'{dispatch_uid}_save')
+        post_delete.connect(bump_reference_version, sender=model, dispatch_uid=f'{dispatch_uid}_delete')
@@ -1,3 +1,603 @@
-from django.test import TestCase
+import io
+import re
+import time as time_module
+from datetime import date, time, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDay, TruncWeek
+from django.contrib.admin.sites import site
+from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from students.models import Notification
+from tests_utils import create_student
+from .models import (
+    Department, Class, Course, Subject, TimeSlot, Timetable, TeacherTimetable, Attendance, Exam, Fee,
+    Transaction, PaymentMethod, DailyFeeCollection, DailyAttendanceRollup, AttendanceSummary
+)
+from .rollups import (
+    apply_attendance_changes, rebuild_attendance_summaries,
+    record_fee_collection, rebuild_fee_collections, monthly_fee_collections, fee_collection_breakdown,
+    refresh_daily_attendance, rebuild_daily_attendance, daily_attendance_totals, attendance_trend
+)
+from .admin import TimetableAdminForm, AttendanceAdmin
+from .conflicts import ConflictIndex, find_conflicts, timetable_bookings, timetable_conflicts, booking_for_timetable
+from .timetables import class_timetable_grid
+from .scheduler import TimetableSolver, synthetic_instance
+from .reference import departments, time_slots, active_payment_methods
+from college_erp.context_processors import global_context
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class HotQueryPlanTests(TestCase):
+    """
+    The filters used by the dashboards and reports must be answered from an index.
+
+    Each queryset mirrors one in administration/, teachers/ or students/views.py; the test
+    fails if SQLite plans a full scan of its table ("SCAN <table>" with no index).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher', user_type='teacher')
+
+    def assertUsesIndex(self, queryset):
+        table = queryset.model._meta.db_table
+        plan = queryset.explain()
+        full_scan = re.search(rf'\bSCAN {table}\b(?! USING)', plan)
+        self.assertIsNone(full_scan, f'Full scan of {table}:\n{plan}')
+
+    def test_attendance_queries(self):
+        today = date(2025, 10, 1)
+        # teachers.dashboard: attendance recently marked by the teacher
+        self.assertUsesIndex(Attendance.objects.filter(marked_by=self.teacher).order_by('-date')[:10])
+        # administration.system_reports: attendance for a date range
+        self.assertUsesIndex(Attendance.objects.filter(date__range=[today - timedelta(days=7), today]))
+
+    def test_fee_queries(self):
+        today = date(2025, 10, 1)
+        # administration.financial_dashboard / financial_reports: one academic year, by status
+        self.assertUsesIndex(Fee.objects.filter(academic_year='2025-2026', payment_status='paid'))
+        self.assertUsesIndex(Fee.objects.filter(academic_year='2025-2026').values('payment_status'))
+        # administration.dashboard: outstanding fees
+        self.assertUsesIndex(Fee.objects.filter(payment_status__in=['pending', 'partial', 'overdue']))
+        # administration.financial_dashboard: defaulters
+        self.assertUsesIndex(
+            Fee.objects.filter(payment_status__in=['overdue', 'pending'], due_date__lt=today).order_by('due_date')
+        )
+
+    def test_exam_queries(self):
+        now = timezone.now()
+        # students.dashboard / teachers.dashboard: upcoming exams for a set of subjects
+        self.assertUsesIndex(Exam.objects.filter(subject__in=[1, 2], date__gte=now).order_by('date'))
+        # administration.dashboard: exams in the next week
+        self.assertUsesIndex(Exam.objects.filter(date__gte=now, date__lte=now + timedelta(days=7)))
+
+    def test_notification_queries(self):
+        # teachers.dashboard: notices for all teachers
+        self.assertUsesIndex(
+            Notification.objects.filter(target_audience__in=['all', 'all_teachers']).order_by('-created_at')[:5]
+        )
+        # administration.dashboard: notices from the last week
+        self.assertUsesIndex(
+            Notification.objects.filter(created_at__gte=timezone.now() - timedelta(days=7)).order_by('-created_at')[:5]
+        )
+
+    def test_transaction_queries(self):
+        # administration.transaction_history: newest first, optionally by status
+        self.assertUsesIndex(Transaction.objects.order_by('-created_at')[:200])
+        self.assertUsesIndex(Transaction.objects.filter(status='completed').order_by('-created_at')[:200])
+
+
+class AttendanceSummaryTests(TestCase):
+    """Per-student, per-subject counters behind the student attendance pages"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Computer Engineering', code='CE')
+        student_class = Class.objects.create(
+            name='CE-1', department=department, semester=1, section='A', academic_year='2025-2026'
+        )
+        cls.teacher = User.objects.create_user('teacher', user_type='teacher', is_staff=True, is_superuser=True)
+        cls.subjects = [
+            Subject.objects.create(
+                course=Course.objects.create(name=f'Course {n}', code=f'CS{n}', department=department, semester=1,
+                                             credits=3),
+                class_assigned=student_class, teacher=cls.teacher, subject_type=subject_type
+            )
+            for n, subject_type in enumerate(('TH', 'PR'))
+        ]
+        cls.students = [User.objects.create_user(f'student{n}', user_type='student') for n in range(3)]
+        create_student(cls.students[0], student_class, 'CE001', 'ADM001')
+
+    def counters(self):
+        return sorted(AttendanceSummary.objects.values_list('student_id', 'subject_id', 'present_count', 'total_count'))
+
+    def from_scratch(self):
+        return sorted(
+            (row['student_id'], row['subject_id'], row['present'], row['total'])
+            for row in Attendance.objects.values('student_id', 'subject_id').annotate(
+                present=Count('id', filter=Q(is_present=True)), total=Count('id')
+            )
+        )
+
+    def test_deltas_of_new_flipped_and_unchanged_rows(self):
+        subject = self.subjects[0]
+        first, second, third = (student.id for student in self.students)
+        apply_attendance_changes(subject, {first: (None, True), second: (None, False), third: (None, True)})
+        self.assertEqual(self.counters(), [(first, subject.id, 1, 1), (second, subject.id, 0, 1),
+                                           (third, subject.id, 1, 1)])
+        untouched = AttendanceSummary.objects.get(student=second).updated_at
+
+        # Present -> absent, an unchanged row, and a new day for the third student
+        apply_attendance_changes(subject, {first: (True, False), second: (False, False), third: (None, False)})
+        self.assertEqual(self.counters(), [(first, subject.id, 0, 1), (second, subject.id, 0, 1),
+                                           (third, subject.id, 1, 2)])
+        self.assertEqual(AttendanceSummary.objects.get(student=second).updated_at, untouched)
+
+    def test_rebuild_command_matches_a_count_from_scratch(self):
+        for day in range(1, 6):
+            for n, student in enumerate(self.students):
+                for subject in self.subjects:
+                    Attendance.objects.create(student=student, subject=subject, date=date(2025, 8, day),
+                                              is_present=(day + n) % 3 > 0)
+        AttendanceSummary.objects.create(student=self.students[0], subject=self.subjects[0], present_count=99,
+                                         total_count=99)
+
+        out = io.StringIO()
+        call_command('rebuild_attendance_summary', batch_size=4, stdout=out)
+        self.assertIn('Rebuilt 6 attendance summary row(s)', out.getvalue())
+        self.assertEqual(self.counters(), self.from_scratch())
+        self.assertEqual(rebuild_attendance_summaries(), 6)
+
+    def test_admin_edits_and_deletes_keep_counters_in_step(self):
+        admin = AttendanceAdmin(Attendance, site)
+        request = RequestFactory().post('/')
+        request.user = self.teacher
+        records = [
+            Attendance.objects.create(student=self.students[0], subject=self.subjects[0], date=date(2025, 8, day),
+                                      is_present=True)
+            for day in (1, 2, 3)
+        ]
+        rebuild_attendance_summaries()
+
+        records[0].is_present = False
+        admin.save_model(request, records[0], None, True)
+        self.assertEqual(self.counters(), self.from_scratch())
+        # Moving a row to another subject recounts both
+        records[1].subject = self.subjects[1]
+        admin.save_model(request, records[1], None, True)
+        self.assertEqual(self.counters(), self.from_scratch())
+        admin.delete_model(request, records[2])
+        admin.delete_queryset(request, Attendance.objects.filter(pk=records[0].pk))
+        self.assertEqual(self.counters(), [(self.students[0].id, self.subjects[1].id, 1, 1)])
+
+    def test_student_views_read_the_summary(self):
+        # Counters with no Attendance rows behind them: only the summary can supply these numbers
+        AttendanceSummary.objects.create(student=self.students[0], subject=self.subjects[0], present_count=3,
+                                         total_count=4)
+        AttendanceSummary.objects.create(student=self.students[0], subject=self.subjects[1], present_count=1,
+                                         total_count=4)
+        self.client.force_login(self.students[0])
+
+        response = self.client.get(reverse('students:dashboard'))
+        self.assertEqual(response.context['attendance_percentage'], 50.0)
+
+        response = self.client.get(reverse('students:attendance'))
+        self.assertEqual([(row['present'], row['total']) for row in response.context['rows']], [(3, 4), (1, 4)])
+        summary = response.context['summary']
+        self.assertEqual((summary['theory']['percentage'], summary['practical']['percentage']), (75.0, 25.0))
+        self.assertEqual(summary['overall'], {'present': 4, 'total': 8, 'percentage': 50.0})
+
+
+class FeeCollectionRollupTests(TestCase):
+    """DailyFeeCollection kept in step with completed transactions"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Computer Engineering', code='CE')
+        student_class = Class.objects.create(
+            name='CE-1', department=cls.department, semester=1, section='A', academic_year='2025-2026'
+        )
+        cls.student = User.objects.create_user('student', user_type='student')
+        create_student(cls.student, student_class, 'CE001', 'ADM001')
+        cls.cash = PaymentMethod.objects.create(name='Cash Counter', method_type='cash')
+
+    def pay(self, fee_type, amount, completed_at, method=None):
+        fee = Fee.objects.create(
+            student=self.student, fee_type=fee_type, amount=amount, due_date=date(2025, 8, 1),
+            academic_year='2025-2026', semester=1
+        )
+        payment = Transaction.objects.create(
+            fee=fee, payment_method=method, amount=amount, status='completed',
+            transaction_id=f'TXN-{Transaction.objects.count()}', completed_at=completed_at
+        )
+        record_fee_collection(payment)
+
+    def rows(self):
+        return sorted(DailyFeeCollection.objects.values_list(
+            'date', 'fee_type', 'payment_method_id', 'department_id', 'amount', 'transaction_count'
+        ))
+
+    def test_incremental_rows_match_a_rebuild(self):
+        noon = timezone.make_aware(timezone.datetime(2025, 8, 5, 12))
+        self.pay('tuition', 1000, noon, self.cash)
+        self.pay('tuition', 500, noon, self.cash)
+        self.pay('library', 200, noon)
+        self.pay('tuition', 300, noon + timedelta(days=40), self.cash)
+
+        incremental = self.rows()
+        self.assertEqual(len(incremental), 3)
+        self.assertEqual(rebuild_fee_collections(), 3)
+        self.assertEqual(self.rows(), incremental)
+
+        collections = DailyFeeCollection.objects.filter(academic_year='2025-2026')
+        monthly = {row['month']: row['amount'] for row in monthly_fee_collections(collections)}
+        self.assertEqual((monthly[8], monthly[9], monthly[1]), (1700, 300, 0))
+
+        by_type, by_method = fee_collection_breakdown(collections)
+        self.assertEqual([(e['name'], e['amount'], e['count']) for e in by_type],
+                         [('Library Fee', 200, 1), ('Tuition Fee', 1800, 3)])
+        self.assertEqual([(e['name'], e['amount']) for e in by_method], [('Cash Counter', 1800), ('Manual', 200)])
+
+
+class DailyAttendanceRollupTests(TestCase):
+    """DailyAttendanceRollup kept in step with Attendance and matching raw aggregates"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.departments = [
+            Department.objects.create(name='Computer Engineering', code='CE'),
+            Department.objects.create(name='Mechanical Engineering', code='ME'),
+        ]
+        teacher = User.objects.create_user('teacher', user_type='teacher')
+        cls.subjects = []
+        for n, department in enumerate(cls.departments):
+            student_class = Class.objects.create(
+                name=f'{department.code}-1', department=department, semester=1, section='A', academic_year='2025-2026'
+            )
+            course = Course.objects.create(name=f'Course {n}', code=f'CS{n}', department=department, semester=1, credits=3)
+            cls.subjects.append(Subject.objects.create(course=course, class_assigned=student_class, teacher=teacher))
+        cls.students = [User.objects.create_user(f'student{n}', user_type='student') for n in range(4)]
+        # Monday 4 August to Wednesday 13 August 2025, spanning two weeks
+        cls.days = [date(2025, 8, 4) + timedelta(days=n) for n in range(10)]
+
+    def mark(self, day, subject):
+        for n, student in enumerate(self.students):
+            Attendance.objects.create(student=student, subject=subject, date=day, is_present=(n + day.day) % 3 != 0)
+        refresh_daily_attendance([day], subject)
+
+    def rows(self):
+        return sorted(DailyAttendanceRollup.objects.values_list(
+            'date', 'subject_id', 'class_assigned_id', 'department_id', 'present_count', 'total_count'
+        ))
+
+    def raw_trend(self, trunc, department_id=None):
+        records = Attendance.objects.filter(date__range=[self.days[0], self.days[-1]])
+        if department_id:
+            records = records.filter(subject__class_assigned__department_id=department_id)
+        return [
+            (row['period'], row['present'], row['total'])
+            for row in records.annotate(period=trunc).values('period').annotate(
+                present=Count('id', filter=Q(is_present=True)), total=Count('id')
+            ).order_by('period')
+        ]
+
+    def test_incremental_rows_match_a_rebuild_and_raw_aggregates(self):
+        for day in self.days:
+            for subject in self.subjects:
+                self.mark(day, subject)
+        # A correction re-marks one subject's day
+        Attendance.objects.filter(date=self.days[2], subject=self.subjects[0]).update(is_present=True)
+        refresh_daily_attendance([self.days[2]], self.subjects[0])
+
+        incremental = self.rows()
+        self.assertEqual(len(incremental), 20)
+        self.assertEqual(rebuild_daily_attendance(), 20)
+        self.assertEqual(self.rows(), incremental)
+        self.assertEqual(rebuild_daily_attendance(self.days[3], self.days[5], batch_days=2), 6)
+        self.assertEqual(self.rows(), incremental)
+
+        for department_id in (None, self.departments[1].id):
+            totals = daily_attendance_totals(self.days[0], self.days[-1], department_id)
+            raw = self.raw_trend(TruncDay('date'), department_id)
+            self.assertEqual(
+                (sum(row.present_count for row in totals), sum(row.total_count for row in totals)),
+                (sum(present for _, present, _ in raw), sum(total for _, _, total in raw))
+            )
+            for granularity, trunc in (('day', TruncDay('date')), ('week', TruncWeek('date'))):
+                series = attendance_trend(self.days[0], self.days[-1], granularity, department_id)
+                self.assertEqual(
+                    [(row['period'], row['present'], row['total']) for row in series],
+                    self.raw_trend(trunc, department_id)
+                )
+        weeks = attendance_trend(self.days[0], self.days[-1], 'week')
+        self.assertEqual([row['total'] for row in weeks], [56, 24])
+
+    def test_admin_edits_refresh_the_rollup(self):
+        for subject in self.subjects:
+            self.mark(self.days[0], subject)
+        admin = AttendanceAdmin(Attendance, site)
+        request = RequestFactory().post('/')
+
+        record = Attendance.objects.filter(subject=self.subjects[0], is_present=False).first()
+        record.is_present = True
+        record.date = self.days[1]
+        admin.save_model(request, record, None, True)
+        admin.delete_queryset(request, Attendance.objects.filter(subject=self.subjects[1], student__in=self.students[:2]))
+
+        incremental = self.rows()
+        rebuild_daily_attendance()
+        self.assertEqual(self.rows(), incremental)
+        self.assertEqual(len(incremental), 3)
+
+
+class TimetableGridTests(TestCase):
+    """Cached day x slot grids behind students.timetable and teachers.teacher_timetable"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Computer Engineering', code='CE')
+        cls.student_class = Class.objects.create(
+            name='CE-3', department=department, semester=3, section='A', academic_year='2025-2026'
+        )
+        cls.teacher = User.objects.create_user('teacher', user_type='teacher')
+        cls.student = User.objects.create_user('student', user_type='student')
+        create_student(cls.student, cls.student_class, 'CE001', 'ADM001')
+        cls.entries = []
+        for i, (day, hour) in enumerate([('monday', 9), ('monday', 10), ('wednesday', 9), ('saturday', 11)]):
+            course = Course.objects.create(name=f'Course {i}', code=f'CS{i}', department=department, semester=3, credits=3)
+            subject = Subject.objects.create(course=course, class_assigned=cls.student_class, teacher=cls.teacher)
+            slot = TimeSlot.objects.create(day=day, start_time=time(hour), end_time=time(hour + 1))
+            cls.entries.append(Timetable.objects.create(
+                class_assigned=cls.student_class, subject=subject, time_slot=slot, room_number=f'R{i}'
+            ))
+            TeacherTimetable.objects.create(
+                teacher=cls.teacher, subject=subject, time_slot=slot, room_number=f'R{i}', academic_year='2025-2026'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_grid_layout(self):
+        with CaptureQueriesContext(connection) as queries:
+            grid = class_timetable_grid(self.student_class.id)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(grid['days'][0], 'monday')
+        self.assertEqual([row['start_time'] for row in grid['rows']], [time(9), time(10), time(11)])
+        nine = [entry and entry['course_code'] for entry in grid['rows'][0]['cells']]
+        self.assertEqual(nine, ['CS0', None, 'CS2', None, None, None])
+        self.assertEqual(grid['rows'][2]['cells'][5]['room_number'], 'R3')
+
+        with CaptureQueriesContext(connection) as queries:
+            class_timetable_grid(self.student_class.id)
+        self.assertEqual(len(queries), 0)
+
+    def test_edits_invalidate_cached_grids(self):
+        self.assertEqual(class_timetable_grid(self.student_class.id)['entries'][0]['room_number'], 'R0')
+        entry = self.entries[0]
+        entry.room_number = 'Lab 1'
+        entry.save()
+        self.assertEqual(class_timetable_grid(self.student_class.id)['entries'][0]['room_number'], 'Lab 1')
+
+        entry.subject.course.name = 'Data Structures'
+        entry.subject.course.save()
+        self.assertEqual(class_timetable_grid(self.student_class.id)['entries'][0]['course_name'], 'Data Structures')
+
+        # The class and department columns are in the grid too
+        self.student_class.section = 'B'
+        self.student_class.save()
+        self.student_class.department.code = 'CSE'
+        self.student_class.department.save()
+        entry = class_timetable_grid(self.student_class.id)['entries'][0]
+        self.assertEqual((entry['section'], entry['department_code']), ('B', 'CSE'))
+
+    def test_views_render_from_grid(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('students:timetable'))
+        self.assertContains(response, 'Course 3')
+        self.assertContains(response, 'Room: R1')
+
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('teachers:timetable'))
+        self.assertEqual(response.context['unique_subjects'], 4)
+        self.assertEqual(response.context['days'], ['monday', 'wednesday', 'saturday'])
+        self.assertContains(response, 'Class: CE-3', count=4)
+
+
+class TimetableConflictTests(TestCase):
+    """Teacher, room and class double-booking detection over overlapping time slots"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Computer Engineering', code='CE')
+        cls.classes = [
+            Class.objects.create(name=f'CE-{n}', department=department, semester=n, section='A', academic_year='2025-2026')
+            for n in (1, 3)
+        ]
+        cls.teachers = [User.objects.create_user(f'teacher{n}', user_type='teacher') for n in range(2)]
+        cls.subjects = {}
+        for n, (student_class, teacher) in enumerate([(cls.classes[0], cls.teachers[0]), (cls.classes[1], cls.teachers[0]),
+                                                       (cls.classes[1], cls.teachers[1])]):
+            course = Course.objects.create(name=f'Course {n}', code=f'CS{n}', department=department, semester=1, credits=3)
+            cls.subjects[n] = Subject.objects.create(course=course, class_assigned=student_class, teacher=teacher)
+        cls.nine = TimeSlot.objects.create(day='monday', start_time=time(9), end_time=time(10))
+        cls.half_past = TimeSlot.objects.create(day='monday', start_time=time(9, 30), end_time=time(10, 30))
+        cls.ten = TimeSlot.objects.create(day='monday', start_time=time(10), end_time=time(11))
+        cls.long = TimeSlot.objects.create(day='monday', start_time=time(8), end_time=time(12))
+        Timetable.objects.create(class_assigned=cls.classes[0], subject=cls.subjects[0], time_slot=cls.nine, room_number='R1')
+
+    def entry(self, subject, slot, room=''):
+        return Timetable(class_assigned=self.subjects[subject].class_assigned, subject=self.subjects[subject],
+                         time_slot=slot, room_number=room)
+
+    def test_overlapping_slots_are_detected(self):
+        index = ConflictIndex(timetable_bookings('2025-2026'))
+        # Same teacher in an overlapping slot, different class and room
+        conflicts = index.conflicts(booking_for_timetable(self.entry(1, self.half_past, 'R2')))
+        self.assertEqual([(c.kind, c.resource) for c in conflicts], [('teacher', 'teacher0')])
+        # Different teacher, same room (case and spacing ignored)
+        conflicts = index.conflicts(booking_for_timetable(self.entry(2, self.long, ' r1 ')))
+        self.assertEqual([c.kind for c in conflicts], ['room'])
+        # Back-to-back is not a clash
+        self.assertEqual(index.conflicts(booking_for_timetable(self.entry(1, self.ten, 'R1'))), [])
+
+    def test_single_entry_loads_only_overlapping_rows(self):
+        Timetable.objects.create(class_assigned=self.classes[1], subject=self.subjects[2], time_slot=self.ten, room_number='R3')
+        loaded = timetable_bookings('2025-2026', overlapping=booking_for_timetable(self.entry(1, self.half_past)))
+        self.assertEqual(sorted(booking.start for booking in loaded), [time(9), time(10)])
+        loaded = timetable_bookings('2025-2026', overlapping=booking_for_timetable(self.entry(1, self.ten)))
+        self.assertEqual([booking.start for booking in loaded], [time(10)])
+
+        conflicts = timetable_conflicts(self.entry(1, self.long, 'R3'))
+        self.assertEqual(sorted(c.kind for c in conflicts), ['class', 'room', 'teacher'])
+
+    def test_audit_reports_every_pair_in_one_query(self):
+        Timetable.objects.create(class_assigned=self.classes[1], subject=self.subjects[1], time_slot=self.half_past, room_number='R2')
+        Timetable.objects.create(class_assigned=self.classes[1], subject=self.subjects[2], time_slot=self.ten, room_number='R1')
+        with CaptureQueriesContext(connection) as queries:
+            conflicts = find_conflicts(timetable_bookings('2025-2026'))
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(sorted(c.kind for c in conflicts), ['class', 'teacher'])
+
+        out = io.StringIO()
+        call_command('audit_timetable', year='2025-2026', source='timetable', stdout=out)
+        self.assertIn('3 entries, 2 conflict(s)', out.getvalue())
+        self.assertIn('Teacher teacher0 is double-booked on Monday', out.getvalue())
+
+    def test_admin_form_rejects_double_booking(self):
+        data = {'class_assigned': self.classes[1].id, 'subject': self.subjects[1].id,
+                'time_slot': self.half_past.id, 'room_number': 'R2'}
+        form = TimetableAdminForm(data)
+        self.assertFalse(form.is_valid())
+        self.assertIn('double-booked', form.non_field_errors()[0])
+
+        form = TimetableAdminForm(dict(data, time_slot=self.ten.id))
+        self.assertTrue(form.is_valid(), form.errors)
+
+        # Editing an entry never clashes with itself
+        existing = Timetable.objects.get()
+        form = TimetableAdminForm({'class_assigned': self.classes[0].id, 'subject': self.subjects[0].id,
+                                   'time_slot': self.nine.id, 'room_number': 'Lab'}, instance=existing)
+        self.assertTrue(form.is_valid(), form.errors)
+
+
+
+class TimetableGeneratorTests(TestCase):
+    """Colouring + local search timetable generation"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Computer Engineering', code='CE')
+        other = Department.objects.create(name='Mechanical Engineering', code='ME')
+        cls.teachers = [User.objects.create_user(f'teacher{n}', user_type='teacher') for n in range(2)]
+        cls.slots = {
+            (day, hour): TimeSlot.objects.create(day=day, start_time=time(hour), end_time=time(hour + 1))
+            for day in ('monday', 'tuesday', 'wednesday', 'thursday') for hour in (9, 10, 11)
+        }
+        cls.classes = []
+        for n, teachers in ((1, (0, 1, 0)), (3, (1, 0, 1))):
+            student_class = Class.objects.create(name=f'CE-{n}', department=department, semester=n, section='A',
+                                                 academic_year='2025-2026')
+            cls.classes.append(student_class)
+            for subject_type, teacher in zip(('TH', 'PR', 'TU'), teachers):
+                course = Course.objects.create(name=f'Course {n}{subject_type}', code=f'CE{n}{subject_type}',
+                                               department=department, semester=n, credits=3)
+                Subject.objects.create(course=course, class_assigned=student_class, teacher=cls.teachers[teacher],
+                                       subject_type=subject_type)
+        # Another department already booked teacher0 and room R1 on Monday at nine
+        me_class = Class.objects.create(name='ME-1', department=other, semester=1, section='A', academic_year='2025-2026')
+        course = Course.objects.create(name='Mechanics', code='ME101', department=other, semester=1, credits=3)
+        subject = Subject.objects.create(course=course, class_assigned=me_class, teacher=cls.teachers[0])
+        Timetable.objects.create(class_assigned=me_class, subject=subject, time_slot=cls.slots[('monday', 9)],
+                                 room_number='r1')
+
+    def generate(self, *args):
+        out = io.StringIO()
+        call_command('generate_timetable', '--year', '2025-2026', '--department', 'CE', '--rooms', 'R1,R2',
+                     '--labs', 'Lab', '--unavailable', 'teacher1:tuesday', *args, stdout=out)
+        return out.getvalue()
+
+    def test_synthetic_instance_is_solved_without_conflicts(self):
+        sessions, slots, rooms, labs = synthetic_instance(20, seed=1)
+        solver = TimetableSolver(sessions, slots, rooms, labs, seed=1)
+        self.assertEqual(solver.solve(), [])
+        self.assertEqual(len(solver.assignment), len(sessions))
+        self.assertEqual(solver.conflicts(), [])
+
+    def test_command_writes_conflict_free_timetables(self):
+        self.assertIn('Dry run', self.generate('--dry-run'))
+        self.assertEqual(Timetable.objects.filter(class_assigned__in=self.classes).count(), 0)
+
+        output = self.generate()
+        self.assertIn('Wrote 12 timetable and 12 teacher timetable entries', output)
+        # Regenerating replaces the previous entries
+        self.generate('--seed', '3')
+        generated = Timetable.objects.filter(class_assigned__in=self.classes)
+        self.assertEqual(generated.count(), 12)
+        self.assertEqual(TeacherTimetable.objects.filter(academic_year='2025-2026').count(), 12)
+        self.assertEqual(find_conflicts(timetable_bookings('2025-2026')), [])
+
+        self.assertFalse(generated.filter(time_slot__day='tuesday', subject__teacher=self.teachers[1]).exists())
+        self.assertEqual(set(generated.filter(subject__subject_type='PR').values_list('room_number', flat=True)), {'Lab'})
+        self.assertEqual(len(class_timetable_grid(self.classes[0].id)['entries']), 6)
+
+
+class ReferenceDataTests(TestCase):
+    """Per-process reference tables reloaded when the shared version stamp changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Department.objects.create(name='Mechanical Engineering', code='ME')
+        Department.objects.create(name='Computer Engineering', code='CE')
+        cls.cash = PaymentMethod.objects.create(name='Cash', method_type='cash')
+        PaymentMethod.objects.create(name='Card', method_type='online')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_tables_load_once_until_a_row_changes(self):
+        with self.assertNumQueries(1):
+            self.assertEqual([d.code for d in departments()], ['CE', 'ME'])
+        with self.assertNumQueries(0):
+            departments()
+            self.assertEqual([d.code for d in global_context(None)['all_departments']], ['CE', 'ME'])
+
+        civil = Department.objects.create(name='Civil Engineering', code='CIV')
+        self.assertEqual([d.code for d in departments()], ['CIV', 'CE', 'ME'])
+        civil.delete()
+        self.assertEqual(len(departments()), 2)
+
+        self.cash.is_active = False
+        self.cash.save()
+        self.assertEqual([m.name for m in active_payment_methods()], ['Card'])
+
+    def test_other_workers_reload_after_commit(self):
+        time_slots()
+        with self.captureOnCommitCallbacks() as callbacks:
+            TimeSlot.objects.create(day='monday', start_time=time(9), end_time=time(10))
+        self.assertEqual(len(time_slots()), 1)
+        # The stamp is replaced again once the change commits
+        version = cache.get('academics:reference:version')
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(cache.get('academics:reference:version'), version)
+        # A cleared shared cache is a new version too
+        cache.clear()
+        with self.assertNumQueries(1):
+            time_slots()
+
+    def test_tables_expire_without_a_shared_version_bump(self):
+        # What another worker sees: its copy, with no bump reaching its cache
+        departments()
+        Department.objects.filter(code='ME').update(name='Mechanical')
+        self.assertEqual(departments()[1].name, 'Mechanical Engineering')
+        with mock.patch('academics.reference.time.monotonic', return_value=time_module.monotonic() + 301):
+            self.assertEqual(departments()[1].name, 'Mechanical')
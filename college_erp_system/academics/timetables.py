@@ -0,0 +1,111 @@
+"""
+Precomputed weekly timetable grids.
+
+A grid is built from one values() query and cached as plain data. Cache keys
+carry a global version number that academics.signals bumps whenever a
+Timetable, TeacherTimetable, Subject, Course, TimeSlot, Class or Department row
+changes, so stale grids are not read again and simply expire. The version lives
+in the default cache: with the per-process LocMemCache other workers only see an
+edit once their copy expires after TIMETABLE_CACHE_TTL.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Subject, TimeSlot, Timetable, TeacherTimetable
+
+TIMETABLE_VERSION_KEY = 'academics:timetable:version'
+
+DAYS = [day for day, _ in TimeSlot.DAY_CHOICES]
+DAY_NAMES = dict(TimeSlot.DAY_CHOICES)
+SUBJECT_TYPES = dict(Subject.SUBJECT_TYPE_CHOICES)
+
+# Columns of one timetable entry, read straight from the joined rows
+ENTRY_FIELDS = {
+    'day': 'time_slot__day',
+    'start_time': 'time_slot__start_time',
+    'end_time': 'time_slot__end_time',
+    'room_number': 'room_number',
+    'subject_type': 'subject__subject_type',
+    'course_id': 'subject__course_id',
+    'course_code': 'subject__course__code',
+    'course_name': 'subject__course__name',
+    'class_id': 'subject__class_assigned_id',
+    'class_name': 'subject__class_assigned__name',
+    'section': 'subject__class_assigned__section',
+    'semester': 'subject__class_assigned__semester',
+    'department_code': 'subject__class_assigned__department__code',
+}
+
+
+def timetable_version():
+    version = cache.get(TIMETABLE_VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(TIMETABLE_VERSION_KEY, version, None)
+    return version
+
+
+def bump_timetable_version(**kwargs):
+    """Signal receiver: make every cached grid stale"""
+    try:
+        cache.incr(TIMETABLE_VERSION_KEY)
+    except ValueError:
+        cache.set(TIMETABLE_VERSION_KEY, 2, None)
+
+
+def build_grid(queryset, days=None):
+    """
+    Lay out timetable rows as a day x slot matrix.
+
+    Returns `days` (all weekdays, or only those with classes when `days` is None),
+    `rows` (one per distinct start/end time, with a cell per day that is an entry or
+    None) and `entries` in day and time order.
+    """
+    entries = []
+    for row in queryset.values(*ENTRY_FIELDS.values()):
+        entry = {key: row[field] for key, field in ENTRY_FIELDS.items()}
+        entry['day_display'] = DAY_NAMES.get(entry['day'], entry['day'])
+        entry['subject_type_display'] = SUBJECT_TYPES.get(entry['subject_type'], '')
+        entries.append(entry)
+    entries.sort(key=lambda e: (DAYS.index(e['day']) if e['day'] in DAYS else len(DAYS), e['start_time']))
+
+    if days is None:
+        days = [day for day in DAYS if any(e['day'] == day for e in entries)]
+    slots = sorted({(e['start_time'], e['end_time']) for e in entries})
+    cells = {(e['day'], e['start_time'], e['end_time']): e for e in entries}
+
+    return {
+        'days': days,
+        'rows': [
+            {'start_time': start, 'end_time': end, 'cells': [cells.get((day, start, end)) for day in days]}
+            for start, end in slots
+        ],
+        'entries': entries,
+        'class_count': len({e['class_id'] for e in entries}),
+        'course_count': len({e['course_id'] for e in entries}),
+    }
+
+
+def _cached_grid(key, build):
+    key = f'{key}:v{timetable_version()}'
+    grid = cache.get(key)
+    if grid is None:
+        grid = build()
+        cache.set(key, grid, settings.TIMETABLE_CACHE_TTL)
+    return grid
+
+
+def class_timetable_grid(class_id):
+    """Weekly grid of a class, Monday to Saturday"""
+    return _cached_grid(
+        f'academics:timetable:class:{class_id}',
+        lambda: build_grid(Timetable.objects.filter(class_assigned_id=class_id), days=DAYS)
+    )
+
+
+def teacher_timetable_grid(teacher_id, academic_year):
+    """Weekly grid of a teacher's sessions in one academic year, limited to the days they teach"""
+    return _cached_grid(
+        f'academics:timetable:teacher:{teacher_id}:{academic_year}',
+        lambda: build_grid(TeacherTimetable.objects.filter(teacher_id=teacher_id, academic_year=academic_year))
+    )
@@ -0,0 +1,63 @@
+"""
+Role checks for views.
+
+`@role_required('student')` replaces the is_student check and the lazy
+request.user.student_profile lookup at the top of every student view: the profile
+is fetched once with the relations the views use and set on request.profile.
+"""
+from collections import namedtuple
+from functools import wraps
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import redirect
+
+# `check` decides access; the profile, if any, is the reverse one-to-one `accessor`
+# on the user, loaded with `related` joined in
+Role = namedtuple('Role', 'check accessor related')
+
+ROLES = {
+    'student': Role(lambda user: user.is_student, 'student_profile', ('student_class', 'department')),
+    'teacher': Role(lambda user: user.is_teacher, 'teacher_profile', ('department',)),
+    'admin': Role(lambda user: user.is_staff or user.is_superuser or user.is_admin, None, ()),
+}
+
+
+def load_profile(user, role):
+    """The user's profile for `role` with its joins, or None if they have none"""
+    accessor = ROLES[role].accessor
+    field = user._meta.get_field(accessor)
+    profile = field.related_model.objects.select_related(*ROLES[role].related).filter(user=user).first()
+    if profile is not None:
+        # Fill the reverse accessor too, so request.user.<accessor> and profile.user cost nothing
+        setattr(user, accessor, profile)
+    return profile
+
+
+def role_required(role, profile=True):
+    """
+    Let only users of `role` ('student', 'teacher' or 'admin') into the view.
+
+    Anonymous users go to the login page as with login_required; users of another
+    role, or without the role's profile, are sent there with a message. With
+    `profile` the profile is set as request.profile (None for admins).
+    """
+    if role not in ROLES:
+        raise ValueError(f'Unknown role {role!r}')
+
+    def decorator(view):
+        @wraps(view)
+        @login_required
+        def wrapper(request, *args, **kwargs):
+            if not ROLES[role].check(request.user):
+                messages.error(request, "You don't have permission to access this page.")
+                return redirect('accounts:login')
+            request.profile = None
+            if profile and ROLES[role].accessor:
+                request.profile = load_profile(request.user, role)
+                if request.profile is None:
+                    messages.error(request, f"{role.title()} profile not found. Please contact administrator.")
+                    return redirect('accounts:login')
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
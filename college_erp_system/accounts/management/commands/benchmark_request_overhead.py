@@ -0,0 +1,65 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.middleware import CachedAuthenticationMiddleware, clear_user_cache
+
+# (label, session engine, authentication middleware)
+CONFIGURATIONS = [
+    ('db sessions, uncached user', 'django.contrib.sessions.backends.db', AuthenticationMiddleware),
+    ('db sessions, cached user', 'django.contrib.sessions.backends.db', CachedAuthenticationMiddleware),
+    ('cached_db, cached user', 'django.contrib.sessions.backends.cached_db', CachedAuthenticationMiddleware),
+    ('signed cookies, cached user', 'django.contrib.sessions.backends.signed_cookies', CachedAuthenticationMiddleware),
+]
+
+
+def view(request):
+    # Only touch the user, so the numbers are the fixed cost every view pays
+    return HttpResponse(str(request.user.is_authenticated))
+
+
+class Command(BaseCommand):
+    help = 'Measure the queries and time session and authentication middleware add to every logged-in request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per configuration (default 500)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{options['requests']} authenticated requests per configuration")
+        # A throwaway user and its sessions, rolled back at the end
+        with transaction.atomic():
+            user = get_user_model().objects.create_user('benchmark-request-overhead', user_type='student')
+            for label, engine, middleware in CONFIGURATIONS:
+                queries, elapsed = self.measure(user, engine, middleware, options['requests'])
+                self.stdout.write(
+                    f'{label:>28}: {queries / options["requests"]:.2f} queries/request, '
+                    f'{elapsed / options["requests"] * 1e6:.0f} us/request'
+                )
+            transaction.set_rollback(True)
+
+    def measure(self, user, engine, middleware, requests):
+        with override_settings(SESSION_ENGINE=engine, AUTH_USER_CACHE_TTL=settings.AUTH_USER_CACHE_TTL or 30):
+            clear_user_cache()
+            client = Client()
+            client.force_login(user)
+            cookie = client.cookies[settings.SESSION_COOKIE_NAME].value
+            handler = SessionMiddleware(middleware(view))
+            factory = RequestFactory()
+
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                for _ in range(requests):
+                    request = factory.get('/')
+                    request.COOKIES[settings.SESSION_COOKIE_NAME] = cookie
+                    if handler(request).content != b'True':
+                        raise CommandError(f'{engine} did not authenticate the benchmark session')
+                elapsed = time.perf_counter() - started
+        return len(captured), elapsed
@@ -0,0 +1,84 @@
+"""
+Authentication with a short-lived per-process cache of the user row.
+
+Django's AuthenticationMiddleware loads the user with one query on every request.
+Entries here are keyed by (user id, backend, session auth hash): the hash is
+derived from the password, so a session created after a password change never
+matches an entry cached before it. Saving or deleting a user, and the unread
+counter updates in students.notices, drop its entries in this process; other
+workers keep theirs for at most AUTH_USER_CACHE_TTL seconds.
+
+The key is the hash stored in the session, so it cannot tell when another worker
+changes the password or deactivates the user: until the entry expires this
+worker still accepts the old session. The cache is therefore off by default
+(AUTH_USER_CACHE_TTL = 0); turn it on only where that delay is acceptable.
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.functional import SimpleLazyObject
+
+# Entries kept before expired ones are pruned
+MAX_CACHED_USERS = 1000
+
+_lock = threading.Lock()
+_users = {}
+
+
+def clear_user_cache(sender=None, instance=None, **kwargs):
+    """Signal receiver: forget one user (or everyone when called without an instance)"""
+    with _lock:
+        if instance is None:
+            _users.clear()
+            return
+        user_id = str(instance.pk)
+        for key in [key for key in _users if key[0] == user_id]:
+            del _users[key]
+
+
+def _remember(key, user, expires):
+    with _lock:
+        if len(_users) >= MAX_CACHED_USERS:
+            now = time.monotonic()
+            for stale in [k for k, (until, _) in _users.items() if until <= now]:
+                del _users[stale]
+            if len(_users) >= MAX_CACHED_USERS:
+                _users.clear()
+        _users[key] = (expires, user)
+
+
+def get_user(request):
+    """django.contrib.auth.get_user, served from the cache while the session hash matches"""
+    ttl = settings.AUTH_USER_CACHE_TTL
+    session = request.session
+    try:
+        key = (str(session[auth.SESSION_KEY]), session[auth.BACKEND_SESSION_KEY], session[auth.HASH_SESSION_KEY])
+    except KeyError:
+        return auth.get_user(request)
+    if ttl <= 0:
+        return auth.get_user(request)
+
+    now = time.monotonic()
+    with _lock:
+        entry = _users.get(key)
+    if entry and entry[0] > now:
+        # Each request gets its own instance; the cached one is never handed out
+        return copy.copy(entry[1])
+
+    user = auth.get_user(request)
+    # Only rows verified against this exact hash are cached (not fallback-key matches)
+    if user.is_authenticated and user.get_session_auth_hash() == key[2]:
+        _remember(key, copy.copy(user), now + ttl)
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware whose request.user comes from the per-process user cache"""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -18,6 +18,8 @@ class User(AbstractUser):
     address = models.TextField(blank=True)
     date_of_birth = models.DateField(null=True, blank=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', null=True, blank=True)
+    # Denormalized count of unread student notifications, shown in the navigation without a query
+    unread_notifications = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
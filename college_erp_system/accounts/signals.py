@@ -0,0 +1,10 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+
+from .middleware import clear_user_cache
+
+
+def connect_user_cache_signals():
+    User = get_user_model()
+    post_save.connect(clear_user_cache, sender=User, dispatch_uid='user_cache_save')
+    post_delete.connect(clear_user_cache, sender=User, dispatch_uid='user_cache_delete')
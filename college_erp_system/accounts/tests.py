@@ -1,3 +1,136 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.messages import get_messages
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import reverse
+
+from academics.models import Department, Class
+from tests_utils import create_student
+from students.notices import publish_notification, mark_read
+from .decorators import load_profile
+from .middleware import CachedAuthenticationMiddleware, clear_user_cache
+from .models import User
+
+
+@override_settings(AUTH_USER_CACHE_TTL=30, SESSION_ENGINE='django.contrib.sessions.backends.db')
+class CachedAuthenticationTests(TestCase):
+    """Per-process user cache keyed by the session auth hash"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('student1', password='old-password', user_type='student')
+
+    def setUp(self):
+        clear_user_cache()
+        self.client.force_login(self.user)
+        self.handler = SessionMiddleware(CachedAuthenticationMiddleware(lambda request: HttpResponse()))
+
+    def request_user(self):
+        request = RequestFactory().get('/')
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.handler(request)
+        return request.user._wrapped if request.user.is_authenticated else request.user
+
+    def test_user_row_is_reused_between_requests(self):
+        with self.assertNumQueries(2):  # session, user
+            first = self.request_user()
+        with self.assertNumQueries(1):  # session only
+            second = self.request_user()
+        self.assertEqual(second.pk, self.user.pk)
+        self.assertIsNot(first, second)
+
+        # Saving the user drops the cached row
+        self.user.first_name = 'Asha'
+        self.user.save()
+        with self.assertNumQueries(2):
+            self.assertEqual(self.request_user().first_name, 'Asha')
+
+    def test_password_change_still_ends_other_sessions(self):
+        self.request_user()
+        self.user.set_password('new-password')
+        self.user.save()
+        self.assertFalse(self.request_user().is_authenticated)
+
+    def test_unread_counter_updates_drop_the_cached_row(self):
+        department = Department.objects.create(name='Computer Engineering', code='CE')
+        student_class = Class.objects.create(name='CE-3', department=department, semester=3, section='A',
+                                             academic_year='2025-2026')
+        student = create_student(self.user, student_class, 'CE001', 'ADM001')
+        self.assertEqual(self.request_user().unread_notifications, 0)
+
+        publish_notification(title='Exam', message='Starts Monday', created_by=self.user,
+                             target_audience='all_students')
+        self.assertEqual(self.request_user().unread_notifications, 1)
+
+        # The recount compares against the stored row even when handed the cached user
+        mark_read(student, self.request_user())
+        self.assertEqual(self.request_user().unread_notifications, 0)
+
+    def test_password_change_in_another_worker(self):
+        self.request_user()
+        # Another worker changes the password: its signal never reaches this process's cache
+        User.objects.filter(pk=self.user.pk).update(password=make_password('changed-elsewhere'))
+
+        # Opted in, this worker honours the change once its entry expires
+        self.assertTrue(self.request_user().is_authenticated)
+        later = time.monotonic() + settings.AUTH_USER_CACHE_TTL + 1
+        with mock.patch('accounts.middleware.time.monotonic', return_value=later):
+            self.assertFalse(self.request_user().is_authenticated)
+
+    @override_settings(AUTH_USER_CACHE_TTL=0)
+    def test_password_change_in_another_worker_ends_the_session_by_default(self):
+        self.assertTrue(self.request_user().is_authenticated)
+        User.objects.filter(pk=self.user.pk).update(password=make_password('changed-elsewhere'))
+        self.assertFalse(self.request_user().is_authenticated)
+        User.objects.filter(pk=self.user.pk).update(password=self.user.password, is_active=False)
+        self.assertFalse(self.request_user().is_authenticated)
+
+    @override_settings(AUTH_USER_CACHE_TTL=0)
+    def test_cache_can_be_disabled(self):
+        self.request_user()
+        with self.assertNumQueries(2):
+            self.request_user()
+
+
+class RoleRequiredTests(TestCase):
+    """Role checks and single-query profile loading"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Computer Engineering', code='CE')
+        student_class = Class.objects.create(name='CE-3', department=department, semester=3, section='A',
+                                             academic_year='2025-2026')
+        cls.student = User.objects.create_user('student1', user_type='student')
+        create_student(cls.student, student_class, 'CE001', 'ADM001')
+        cls.teacher = User.objects.create_user('teacher1', user_type='teacher')
+        cls.orphan = User.objects.create_user('student2', user_type='student')
+
+    def test_profile_and_its_joins_load_in_one_query(self):
+        user = User.objects.get(pk=self.student.pk)
+        with self.assertNumQueries(1):
+            profile = load_profile(user, 'student')
+        with self.assertNumQueries(0):
+            self.assertEqual(profile.student_class.name, 'CE-3')
+            self.assertEqual(profile.department.code, 'CE')
+            self.assertIs(user.student_profile, profile)
+            self.assertEqual(profile.user.username, 'student1')
+
+    def test_other_roles_and_missing_profiles_are_redirected(self):
+        url = reverse('students:timetable')
+        response = self.client.get(url)
+        self.assertRedirects(response, f"{reverse('accounts:login')}?next={url}", fetch_redirect_response=False)
+
+        for user, message in ((self.teacher, "You don't have permission"), (self.orphan, 'Student profile not found')):
+            self.client.force_login(user)
+            response = self.client.get(url)
+            self.assertRedirects(response, reverse('accounts:login'), fetch_redirect_response=False)
+            self.assertIn(message, str(list(get_messages(response.wsgi_request))[-1]))
+
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(reverse('administration:dashboard')).status_code, 302)
@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import BackgroundJob
 
-# Register your models here.
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'progress_done', 'progress_total', 'attempts', 'worker', 'created_at']
+    list_filter = ['kind', 'status']
+    readonly_fields = ['started_at', 'heartbeat_at', 'finished_at', 'created_at']
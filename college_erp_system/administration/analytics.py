@@ -0,0 +1,80 @@
+"""
+Time-bucketed series for the administration analytics.
+
+A series is one GROUP BY over a truncated date column; buckets with no rows are
+filled in with zero on the Python side so every series covers its whole range.
+"""
+from datetime import date, datetime, timedelta
+
+from django.db.models import Count
+from django.db.models.functions import TruncMonth, TruncWeek
+
+GRANULARITIES = {
+    'month': TruncMonth,
+    'week': TruncWeek,
+}
+
+
+def bucket_start(day, granularity):
+    """First day of the month, or the Monday of the week, containing `day`"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def buckets(date_from, date_to, granularity):
+    """Every bucket start from the one containing `date_from` to the one containing `date_to`"""
+    current = bucket_start(date_from, granularity)
+    last = bucket_start(date_to, granularity)
+    starts = []
+    while current <= last:
+        starts.append(current)
+        if granularity == 'week':
+            current += timedelta(days=7)
+        elif current.month == 12:
+            current = current.replace(year=current.year + 1, month=1)
+        else:
+            current = current.replace(month=current.month + 1)
+    return starts
+
+
+def time_series(queryset, date_field, date_from, date_to, granularity='month', value=None):
+    """
+    Aggregate `queryset` per month or week of `date_field` between two dates (inclusive).
+
+    `value` is the aggregate computed per bucket (a row count by default). Returns a
+    list of `{'period': date, 'value': ...}` with one entry per bucket, oldest first.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unsupported granularity: {granularity}")
+
+    field = queryset.model._meta.get_field(date_field)
+    lookup = f'{date_field}__date__range' if field.get_internal_type() == 'DateTimeField' else f'{date_field}__range'
+
+    rows = queryset.filter(**{lookup: (date_from, date_to)}).annotate(
+        period=GRANULARITIES[granularity](date_field)
+    ).values('period').annotate(
+        value=value if value is not None else Count('pk')
+    ).order_by('period')
+
+    totals = {}
+    for row in rows:
+        period = row['period']
+        if isinstance(period, datetime):
+            period = period.date()
+        totals[period] = row['value']
+
+    return [
+        {'period': start, 'value': totals.get(start) or 0}
+        for start in buckets(date_from, date_to, granularity)
+    ]
+
+
+def default_range(today, granularity, count=12):
+    """The last `count` buckets up to and including the one containing `today`"""
+    last = bucket_start(today, granularity)
+    if granularity == 'week':
+        return last - timedelta(weeks=count - 1), today
+    month_index = last.year * 12 + last.month - 1 - (count - 1)
+    return date(month_index // 12, month_index % 12 + 1, 1), today
+
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AdministrationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'administration'
+
+    def ready(self):
+        from .signals import connect_dashboard_stats_signals
+        connect_dashboard_stats_signals()
+
+        # Register the background job tasks
+        from . import tasks
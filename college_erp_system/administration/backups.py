@@ -0,0 +1,178 @@
+"""
+Online SQLite backups.
+
+The database is copied with SQLite's backup API a few pages at a time over a
+connection of its own, so writers only wait for one step rather than the whole
+copy. A write from another connection restarts that copy, so after
+BACKUP_MAX_RESTARTS restarts or BACKUP_STEPPED_DEADLINE seconds it is abandoned
+for a single `VACUUM INTO`, which reads one consistent snapshot. The snapshot is checked with PRAGMA integrity_check, gzipped to a
+timestamped file in BACKUP_DIR, and the oldest archives beyond BACKUP_KEEP are
+removed.
+"""
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+BACKUP_PREFIX = 'db_'
+BACKUP_SUFFIX = '.sqlite3.gz'
+
+# Pause between backup steps so queued writers get the database
+BACKUP_STEP_SLEEP = 0.05
+
+# Give up when the source stays locked for this many seconds in a row
+BACKUP_BUSY_TIMEOUT = 30
+
+# Limits of the stepped copy before falling back to VACUUM INTO
+BACKUP_MAX_RESTARTS = 5
+BACKUP_STEPPED_DEADLINE = 300  # seconds
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class BackupError(Exception):
+    """A backup could not be written or failed verification"""
+
+
+class _SteppedCopyAbandoned(Exception):
+    """The stepped copy kept restarting or ran past its deadline"""
+
+
+def check_integrity(path):
+    """Run PRAGMA integrity_check on an SQLite file; raises BackupError unless it reports ok"""
+    try:
+        snapshot = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            problems = [row[0] for row in snapshot.execute('PRAGMA integrity_check')]
+        finally:
+            snapshot.close()
+    except sqlite3.DatabaseError as e:
+        raise BackupError(f'{path.name} is not a readable SQLite database: {e}')
+    if problems != ['ok']:
+        raise BackupError(f'{path.name} failed integrity check: {"; ".join(problems[:5])}')
+
+
+def list_backups(backup_dir=None):
+    """Backup archives in `backup_dir`, oldest first"""
+    backup_dir = Path(backup_dir or settings.BACKUP_DIR)
+    if not backup_dir.is_dir():
+        return []
+    return sorted(backup_dir.glob(f'{BACKUP_PREFIX}*{BACKUP_SUFFIX}'))
+
+
+def apply_retention(backup_dir=None, keep=None):
+    """Delete all but the newest `keep` archives; returns the deleted paths"""
+    keep = settings.BACKUP_KEEP if keep is None else keep
+    expired = list_backups(backup_dir)[:-keep] if keep > 0 else []
+    for path in expired:
+        path.unlink()
+    return expired
+
+
+def vacuum_into(source, snapshot):
+    """Write a consistent copy of `source` to `snapshot` in one statement; returns its page count"""
+    # VACUUM INTO needs a missing or empty target
+    snapshot.unlink(missing_ok=True)
+    source.execute('VACUUM INTO ?', (str(snapshot),))
+    copy = sqlite3.connect(snapshot)
+    try:
+        return copy.execute('PRAGMA page_count').fetchone()[0]
+    finally:
+        copy.close()
+
+
+def create_backup(backup_dir=None, pages=None, keep=None, progress=None):
+    """
+    Snapshot the default database into a verified, gzipped archive in `backup_dir`.
+
+    `pages` is the number of pages copied per backup step; `progress(copied, total)`
+    is called after each step. Returns a dict describing the archive.
+    """
+    if connection.vendor != 'sqlite':
+        raise BackupError('Online backups are only supported for the SQLite database')
+
+    backup_dir = Path(backup_dir or settings.BACKUP_DIR)
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    pages = pages or settings.BACKUP_PAGES_PER_STEP
+    # Microseconds, so two backups started in the same second do not overwrite each other
+    archive = backup_dir / f"{BACKUP_PREFIX}{timezone.now().strftime('%Y%m%d_%H%M%S_%f')}{BACKUP_SUFFIX}"
+
+    busy_since = None
+    deadline = time.monotonic() + BACKUP_STEPPED_DEADLINE
+    copied = restarts = 0
+
+    def step(status, remaining, total):
+        nonlocal busy_since, copied, restarts
+        if status in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED):
+            busy_since = busy_since or time.monotonic()
+            if time.monotonic() - busy_since > BACKUP_BUSY_TIMEOUT:
+                raise BackupError(f'Database stayed locked for {BACKUP_BUSY_TIMEOUT}s; backup abandoned')
+            return
+        busy_since = None
+        # No more pages copied than last step: a write restarted the copy from the start
+        if total - remaining <= copied:
+            restarts += 1
+        copied = total - remaining
+        if restarts > BACKUP_MAX_RESTARTS or time.monotonic() > deadline:
+            raise _SteppedCopyAbandoned
+        if progress:
+            progress(copied, total)
+
+    fd, snapshot_name = tempfile.mkstemp(suffix='.sqlite3', dir=backup_dir)
+    os.close(fd)
+    snapshot = Path(snapshot_name)
+    partial = archive.with_name(archive.name + '.part')
+    try:
+        # Copy page by page; other connections can write in between steps
+        source = sqlite3.connect(connection.settings_dict['NAME'], uri=True)
+        try:
+            destination = sqlite3.connect(snapshot)
+            try:
+                source.backup(destination, pages=pages, progress=step, sleep=BACKUP_STEP_SLEEP)
+                page_count = destination.execute('PRAGMA page_count').fetchone()[0]
+            finally:
+                destination.close()
+        except _SteppedCopyAbandoned:
+            page_count = vacuum_into(source, snapshot)
+            if progress:
+                progress(page_count, page_count)
+        finally:
+            source.close()
+
+        check_integrity(snapshot)
+
+        # Compress in fixed-size chunks, then move the finished archive into place
+        with open(snapshot, 'rb') as data, gzip.open(partial, 'wb') as output:
+            shutil.copyfileobj(data, output, COPY_BUFFER_SIZE)
+        os.replace(partial, archive)
+    finally:
+        snapshot.unlink(missing_ok=True)
+        partial.unlink(missing_ok=True)
+
+    expired = apply_retention(backup_dir, keep)
+    return {
+        'file': archive.name,
+        'bytes': archive.stat().st_size,
+        'pages': page_count,
+        'expired': [path.name for path in expired],
+    }
+
+
+def verify_backup(archive):
+    """Decompress an archive to a temporary file and run the integrity check on it"""
+    archive = Path(archive)
+    with tempfile.TemporaryDirectory() as workdir:
+        restored = Path(workdir) / archive.name.removesuffix('.gz')
+        try:
+            with gzip.open(archive, 'rb') as source, open(restored, 'wb') as output:
+                shutil.copyfileobj(source, output, COPY_BUFFER_SIZE)
+        except (OSError, EOFError) as e:
+            raise BackupError(f'{archive.name} could not be decompressed: {e}')
+        check_integrity(restored)
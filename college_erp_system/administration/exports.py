@@ -0,0 +1,405 @@
+"""
+Streaming exports.
+
+An exporter projects one model onto a fixed list of columns with values_list()
+and reads it with a chunked iterator(); a writer turns those rows into CSV,
+NDJSON or XLSX bytes as they arrive. Neither side keeps more than a chunk of
+rows in memory, so a download costs the same memory at 1k rows and at 1M.
+"""
+import csv
+import json
+import re
+import zipfile
+from datetime import date
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.db.models import Q, Sum, Value
+from django.db.models.functions import Concat, Trim
+from django.http import StreamingHttpResponse
+
+from students.models import Student
+from teachers.models import Teacher
+from academics.models import Attendance, Exam, Result, Fee, DailyFeeCollection
+from academics.rollups import monthly_fee_collections, fee_collection_breakdown
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+# Writers ---------------------------------------------------------------------
+
+class Echo:
+    """File-like object whose write() hands the encoded line straight back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def write_csv(headers, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_ndjson(keys, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(keys, row)), default=str) + '\n'
+
+
+class _ChunkSink:
+    """Unseekable file for zipfile: collects written bytes until the generator drains them"""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Export" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+# Characters XML 1.0 does not allow, even escaped
+_XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+XLSX_FLUSH_BYTES = 64 * 1024
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return f'<c t="n"><v>{value}</v></c>'
+    text = _XML_ILLEGAL.sub('', str(value))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def write_xlsx(headers, rows):
+    """
+    A single-sheet workbook written row by row into a deflated zip stream.
+
+    Cells use inline strings rather than a shared-strings table, so nothing has to be
+    collected before the sheet is complete; the zip is drained every XLSX_FLUSH_BYTES.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        yield sink.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(f'<row r="1">{"".join(_xlsx_cell(v) for v in headers)}</row>'.encode())
+            for number, row in enumerate(rows, start=2):
+                sheet.write(f'<row r="{number}">{"".join(_xlsx_cell(v) for v in row)}</row>'.encode())
+                if sink.size >= XLSX_FLUSH_BYTES:
+                    yield sink.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+
+# Format name -> (writer, content type, file extension, header row of keys instead of labels)
+WRITERS = {
+    'csv': (write_csv, 'text/csv', 'csv', False),
+    'ndjson': (write_ndjson, 'application/x-ndjson', 'ndjson', True),
+    'xlsx': (write_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx', False),
+}
+
+
+# Exporters -------------------------------------------------------------------
+
+class Exporter:
+    """
+    One exportable dataset.
+
+    `columns` is a list of `(key, header, field)`; `field` is a values_list() path or an
+    annotation from `queryset`. `formatters` maps a key to a function applied to that
+    column's value. `filters` maps a GET parameter to `(lookup, parse)`.
+    """
+
+    def __init__(self, name, queryset, columns, formatters=None, filters=None, ordering=('pk',)):
+        self.name = name
+        self.get_queryset = queryset
+        self.columns = columns
+        self.formatters = formatters or {}
+        self.filters = filters or {}
+        self.ordering = ordering
+
+    def parse_filters(self, params):
+        """Lookups for the recognised, non-empty parameters; raises ValueError on a malformed value"""
+        lookups = {}
+        for param, (lookup, parse) in self.filters.items():
+            if params.get(param):
+                lookups[lookup] = parse(params[param])
+        return lookups
+
+    def rows(self, lookups, chunk_size=EXPORT_CHUNK_SIZE):
+        fields = [field for _, _, field in self.columns]
+        formatters = [self.formatters.get(key) for key, _, _ in self.columns]
+        queryset = self.get_queryset().filter(**lookups).order_by(*self.ordering).values_list(*fields)
+        for values in queryset.iterator(chunk_size=chunk_size):
+            yield [fmt(value) if fmt else value for fmt, value in zip(formatters, values)]
+
+
+EXPORTERS = {}
+
+
+def register_exporter(exporter):
+    EXPORTERS[exporter.name] = exporter
+    return exporter
+
+
+def stream_export(exporter, format_type, lookups, filename):
+    """StreamingHttpResponse writing every row of `exporter` (narrowed by `lookups`) in `format_type`"""
+    writer, content_type, extension, use_keys = WRITERS[format_type]
+    header = [key if use_keys else label for key, label, _ in exporter.columns]
+    response = StreamingHttpResponse(writer(header, exporter.rows(lookups)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    return response
+
+
+def _full_name(prefix):
+    return Trim(Concat(f'{prefix}first_name', Value(' '), f'{prefix}last_name'))
+
+
+def _display(choices):
+    names = dict(choices)
+    return lambda value: names.get(value, value)
+
+
+def _active(value):
+    return 'Active' if value else 'Inactive'
+
+
+register_exporter(Exporter(
+    'students',
+    lambda: Student.objects.filter(is_active=True).annotate(full_name=_full_name('user__')),
+    [
+        ('roll_number', 'Roll Number', 'roll_number'),
+        ('name', 'Name', 'full_name'),
+        ('department', 'Department', 'department__name'),
+        ('class', 'Class', 'student_class__name'),
+        ('admission_date', 'Admission Date', 'admission_date'),
+        ('status', 'Status', 'is_active'),
+    ],
+    formatters={'class': lambda value: value or 'N/A', 'status': _active},
+    filters={
+        'department': ('department_id', int),
+        'semester': ('student_class__semester', int),
+    },
+    ordering=('roll_number',),
+))
+
+register_exporter(Exporter(
+    'teachers',
+    lambda: Teacher.objects.filter(is_active=True).annotate(full_name=_full_name('user__')),
+    [
+        ('employee_id', 'Employee ID', 'employee_id'),
+        ('name', 'Name', 'full_name'),
+        ('department', 'Department', 'department__name'),
+        ('designation', 'Designation', 'designation'),
+        ('joining_date', 'Joining Date', 'joining_date'),
+        ('status', 'Status', 'is_active'),
+    ],
+    formatters={'status': _active},
+    filters={'department': ('department_id', int)},
+    ordering=('employee_id',),
+))
+
+register_exporter(Exporter(
+    'fees',
+    lambda: Fee.objects.annotate(full_name=_full_name('student__')),
+    [
+        ('student', 'Student', 'full_name'),
+        ('roll_number', 'Roll Number', 'student__student_profile__roll_number'),
+        ('fee_type', 'Fee Type', 'fee_type'),
+        ('amount', 'Amount', 'amount'),
+        ('due_date', 'Due Date', 'due_date'),
+        ('status', 'Status', 'payment_status'),
+        ('academic_year', 'Academic Year', 'academic_year'),
+    ],
+    formatters={
+        'fee_type': _display(Fee.FEE_TYPE_CHOICES),
+        'status': _display(Fee.PAYMENT_STATUS_CHOICES),
+    },
+    filters={
+        'academic_year': ('academic_year', str),
+        'status': ('payment_status', str),
+        'department': ('student__student_profile__department_id', int),
+        'semester': ('semester', int),
+    },
+))
+
+register_exporter(Exporter(
+    'attendance',
+    lambda: Attendance.objects.annotate(full_name=_full_name('student__')),
+    [
+        ('date', 'Date', 'date'),
+        ('roll_number', 'Roll Number', 'student__student_profile__roll_number'),
+        ('student', 'Student', 'full_name'),
+        ('subject_code', 'Subject Code', 'subject__course__code'),
+        ('subject', 'Subject', 'subject__course__name'),
+        ('class', 'Class', 'subject__class_assigned__name'),
+        ('status', 'Status', 'is_present'),
+        ('remarks', 'Remarks', 'remarks'),
+    ],
+    formatters={'status': lambda value: 'Present' if value else 'Absent'},
+    filters={
+        'from_date': ('date__gte', date.fromisoformat),
+        'to_date': ('date__lte', date.fromisoformat),
+        'department': ('subject__class_assigned__department_id', int),
+        'semester': ('subject__class_assigned__semester', int),
+    },
+    ordering=('date', 'pk'),
+))
+
+register_exporter(Exporter(
+    'results',
+    lambda: Result.objects.annotate(full_name=_full_name('student__')),
+    [
+        ('exam', 'Exam', 'exam__name'),
+        ('exam_type', 'Exam Type', 'exam__exam_type'),
+        ('exam_date', 'Exam Date', 'exam__date'),
+        ('roll_number', 'Roll Number', 'student__student_profile__roll_number'),
+        ('student', 'Student', 'full_name'),
+        ('subject_code', 'Subject Code', 'exam__subject__course__code'),
+        ('marks_obtained', 'Marks Obtained', 'marks_obtained'),
+        ('total_marks', 'Total Marks', 'exam__total_marks'),
+        ('grade', 'Grade', 'grade'),
+        ('published', 'Published', 'is_published'),
+    ],
+    formatters={
+        'exam_type': _display(Exam.EXAM_TYPE_CHOICES),
+        'exam_date': lambda value: value.date() if value else value,
+        'published': lambda value: 'Yes' if value else 'No',
+    },
+    filters={
+        'from_date': ('exam__date__date__gte', date.fromisoformat),
+        'to_date': ('exam__date__date__lte', date.fromisoformat),
+        'department': ('exam__subject__class_assigned__department_id', int),
+        'semester': ('exam__subject__class_assigned__semester', int),
+    },
+))
+
+
+# Financial reports -----------------------------------------------------------
+
+def stream_csv(filename, rows):
+    """StreamingHttpResponse that writes each row of the `rows` iterable as one CSV line"""
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse((writer.writerow(row) for row in rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def financial_report_rows(report_type, academic_year, today):
+    """
+    CSV rows (header first) for one financial_reports type.
+
+    Summary and monthly rows come from a few grouped queries; defaulter rows are read
+    with values() and iterator(), with the roll number joined in the same query.
+    """
+    fees = Fee.objects.filter(academic_year=academic_year)
+    fee_type_names = dict(Fee.FEE_TYPE_CHOICES)
+
+    if report_type == 'summary':
+        summary = fees.aggregate(
+            total_fees=Sum('amount'),
+            collected=Sum('amount', filter=Q(payment_status='paid')),
+            pending=Sum('amount', filter=Q(payment_status__in=['pending', 'partial'])),
+            overdue=Sum('amount', filter=Q(payment_status='overdue'))
+        )
+        yield ['Metric', 'Amount']
+        yield ['Total Fees', summary['total_fees'] or 0]
+        yield ['Collected', summary['collected'] or 0]
+        yield ['Pending', summary['pending'] or 0]
+        yield ['Overdue', summary['overdue'] or 0]
+
+        yield []
+        yield ['Fee Type', 'Total Amount', 'Collected', 'Collection %']
+        for item in fees.values('fee_type').annotate(
+            total=Sum('amount'),
+            collected=Sum('amount', filter=Q(payment_status='paid'))
+        ).order_by('fee_type'):
+            percentage = round((item['collected'] or 0) / item['total'] * 100, 1) if item['total'] else 0
+            yield [fee_type_names.get(item['fee_type'], item['fee_type']), item['total'], item['collected'] or 0, percentage]
+
+        _, by_method = fee_collection_breakdown(DailyFeeCollection.objects.filter(academic_year=academic_year))
+        yield []
+        yield ['Payment Method', 'Payments', 'Amount Received']
+        for method in by_method:
+            yield [method['name'], method['count'], method['amount']]
+
+    elif report_type == 'defaulters':
+        yield ['Student Name', 'Roll Number', 'Fee Type', 'Amount', 'Due Date', 'Days Overdue']
+        defaulters = fees.filter(
+            payment_status__in=['pending', 'overdue'],
+            due_date__lt=today
+        ).order_by('due_date').values_list(
+            'student__first_name', 'student__last_name', 'student__student_profile__roll_number',
+            'fee_type', 'amount', 'due_date'
+        )
+        for first_name, last_name, roll_number, fee_type, amount, due_date in defaulters.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield [
+                f"{first_name} {last_name}".strip(),
+                roll_number or '',
+                fee_type_names.get(fee_type, fee_type),
+                amount,
+                due_date,
+                (today - due_date).days
+            ]
+
+    elif report_type == 'monthly':
+        yield ['Month', 'Amount Collected']
+        for row in monthly_fee_collections(DailyFeeCollection.objects.filter(academic_year=academic_year)):
+            yield [row['month'], row['amount']]
@@ -0,0 +1,164 @@
+"""
+Database-backed background jobs.
+
+Views call `enqueue()` and return straight away; `manage.py run_jobs` claims queued
+rows and runs the registered task for each one in a thread or process pool. Tasks
+report progress through `report_progress()`, which the job status endpoint reads.
+No broker is involved: the BackgroundJob table is the queue.
+"""
+import traceback
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BackgroundJob
+
+# Task name -> function(job, **params) returning a JSON-serialisable result
+TASKS = {}
+
+# Kinds whose job fails instead of being requeued when its worker is lost
+SINGLE_ATTEMPT = set()
+
+# Times a job is handed to a worker before a lost worker counts as a failure
+MAX_ATTEMPTS = 3
+
+
+def task(name, retry=True):
+    """
+    Register a function as the task run for jobs of kind `name`.
+
+    A job whose worker dies is run again from the start, so only idempotent tasks
+    should keep `retry`; the others fail and are left for an admin to check.
+    """
+    def register(func):
+        TASKS[name] = func
+        if not retry:
+            SINGLE_ATTEMPT.add(name)
+        return func
+    return register
+
+
+def enqueue(kind, created_by=None, **params):
+    """Queue a job for a registered task; `params` must be JSON-serialisable"""
+    if kind not in TASKS:
+        raise LookupError(f"No task registered as '{kind}'")
+    return BackgroundJob.objects.create(kind=kind, params=params, created_by=created_by)
+
+
+def report_progress(job, done=None, total=None, message=None):
+    """Record progress (and a heartbeat) for a running job"""
+    fields = {'heartbeat_at': timezone.now()}
+    if done is not None:
+        fields['progress_done'] = done
+    if total is not None:
+        fields['progress_total'] = total
+    if message is not None:
+        fields['message'] = message[:255]
+    BackgroundJob.objects.filter(pk=job.pk).update(**fields)
+    for name, value in fields.items():
+        setattr(job, name, value)
+
+
+def claim_next_job(worker):
+    """
+    Mark the oldest queued job as running for `worker` and return it, or None.
+
+    The claim is a conditional UPDATE on status='queued', so two workers racing for
+    the same row cannot both win it.
+    """
+    for _ in range(5):
+        job_id = BackgroundJob.objects.filter(status='queued').order_by(
+            'created_at', 'id'
+        ).values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+
+        now = timezone.now()
+        claimed = BackgroundJob.objects.filter(pk=job_id, status='queued').update(
+            status='running',
+            worker=worker,
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return BackgroundJob.objects.get(pk=job_id)
+    return None
+
+
+def run_job(job):
+    """Run a claimed job's task and store its result or traceback"""
+    try:
+        func = TASKS.get(job.kind)
+        if func is None:
+            raise LookupError(f"No task registered as '{job.kind}'")
+        result = func(job, **job.params)
+    except Exception:
+        BackgroundJob.objects.filter(pk=job.pk).update(
+            status='failed',
+            error=traceback.format_exc(),
+            finished_at=timezone.now(),
+        )
+    else:
+        BackgroundJob.objects.filter(pk=job.pk).update(
+            status='succeeded',
+            result=result,
+            finished_at=timezone.now(),
+        )
+
+
+def run_pooled_job(job_id):
+    """Pool entry point: run a claimed job by id, then drop this thread's or process's connection"""
+    try:
+        run_job(BackgroundJob.objects.get(pk=job_id))
+    finally:
+        connection.close()
+
+
+def heartbeat(worker):
+    """Refresh the heartbeat of every job `worker` is running"""
+    return BackgroundJob.objects.filter(status='running', worker=worker).update(heartbeat_at=timezone.now())
+
+
+def recover_stale_jobs(stale_after):
+    """
+    Requeue running jobs whose worker stopped sending heartbeats `stale_after` seconds ago,
+    or fail them once they have used up MAX_ATTEMPTS or cannot be retried safely.
+    Returns (requeued, failed).
+    """
+    stale = BackgroundJob.objects.filter(
+        status='running',
+        heartbeat_at__lt=timezone.now() - timedelta(seconds=stale_after)
+    )
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status='failed',
+        error='Worker stopped responding',
+        finished_at=timezone.now(),
+    )
+    failed += stale.filter(kind__in=SINGLE_ATTEMPT).update(
+        status='failed',
+        error='Worker stopped responding; not retried, check whether the task completed',
+        finished_at=timezone.now(),
+    )
+    requeued = stale.filter(attempts__lt=MAX_ATTEMPTS).update(status='queued', worker='')
+    return requeued, failed
+
+
+def job_status(job):
+    """JSON-ready view of a job for the polling endpoint"""
+    return {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'percent': job.percent,
+        'progress_done': job.progress_done,
+        'progress_total': job.progress_total,
+        'message': job.message,
+        'result': job.result,
+        'error': job.error.strip().splitlines()[-1] if job.error else '',
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
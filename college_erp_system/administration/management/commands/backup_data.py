@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from administration.backups import BackupError, create_backup, list_backups, verify_backup
+
+
+class Command(BaseCommand):
+    help = 'Write a verified, gzipped online backup of the SQLite database and prune old archives'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Directory for the archives (default: BACKUP_DIR)')
+        parser.add_argument(
+            '--keep',
+            type=int,
+            help=f'Archives to keep after this backup (default: BACKUP_KEEP, currently {settings.BACKUP_KEEP})'
+        )
+        parser.add_argument(
+            '--pages',
+            type=int,
+            help='Pages copied per backup step; smaller steps block writers for less time (default: BACKUP_PAGES_PER_STEP)'
+        )
+        parser.add_argument(
+            '--verify',
+            nargs='?',
+            const='latest',
+            metavar='ARCHIVE',
+            help='Only check an existing archive (the newest one if no path is given) with PRAGMA integrity_check'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options['verify']:
+                archive = options['verify']
+                if archive == 'latest':
+                    archives = list_backups(options['dir'])
+                    if not archives:
+                        raise CommandError('No backups to verify')
+                    archive = archives[-1]
+                verify_backup(archive)
+                self.stdout.write(self.style.SUCCESS(f'{archive}: integrity check ok'))
+                return
+
+            backup = create_backup(options['dir'], pages=options['pages'], keep=options['keep'])
+        except BackupError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Backup written: {backup['file']} ({backup['pages']} pages, {backup['bytes']} bytes compressed)"
+        ))
+        for name in backup['expired']:
+            self.stdout.write(f'Removed expired backup {name}')
@@ -0,0 +1,104 @@
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from administration.exports import EXPORTERS, WRITERS
+
+
+def synthetic_attendance_rows(count):
+    """Rows shaped like the attendance exporter's output, generated without touching the database"""
+    start = date(2025, 7, 1)
+    for i in range(count):
+        yield [
+            start + timedelta(days=i % 180),
+            f'CE{i % 5000:05d}',
+            f'Student {i % 5000}',
+            f'CS{i % 40:03d}',
+            f'Course {i % 40}',
+            f'CE-{i % 8}A',
+            'Present' if i % 7 else 'Absent',
+            '',
+        ]
+
+
+class Command(BaseCommand):
+    help = 'Measure throughput and memory of the streaming export writers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Synthetic rows to write (default 1,000,000)')
+        parser.add_argument(
+            '--format',
+            choices=sorted(WRITERS) + ['all'],
+            default='all',
+            help='Writer to benchmark (default: all of them)'
+        )
+        parser.add_argument(
+            '--type',
+            choices=sorted(EXPORTERS),
+            help='Stream this exporter from the database instead of synthetic rows'
+        )
+
+    def handle(self, *args, **options):
+        formats = sorted(WRITERS) if options['format'] == 'all' else [options['format']]
+        exporter = EXPORTERS.get(options['type']) if options['type'] else EXPORTERS['attendance']
+        header = [label for _, label, _ in exporter.columns]
+
+        for format_type in formats:
+            if options['type']:
+                rows = exporter.rows({})
+                planned = None
+            else:
+                if options['rows'] < 1:
+                    raise CommandError('--rows must be positive')
+                rows = synthetic_attendance_rows(options['rows'])
+                planned = options['rows']
+            self.run(format_type, header, rows, planned)
+
+    def run(self, format_type, header, rows, planned):
+        writer = WRITERS[format_type][0]
+        checkpoint = max((planned or 100_000) // 10, 1)
+        counted = _Counter(rows)
+
+        self.stdout.write(f'\n{format_type}: rows, seconds, MiB written, traced KiB (current / peak)')
+        tracemalloc.start()
+        started = time.perf_counter()
+        written = 0
+        next_report = checkpoint
+        for chunk in writer(header, counted):
+            written += len(chunk)
+            if counted.count >= next_report:
+                self.report(counted.count, started, written)
+                next_report += checkpoint
+        self.report(counted.count, started, written)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{format_type}: {counted.count:,} rows in {time.perf_counter() - started:.1f}s, '
+            f'peak traced memory {peak / 1024:.0f} KiB'
+        ))
+
+    def report(self, count, started, written):
+        current, peak = tracemalloc.get_traced_memory()
+        self.stdout.write(
+            f'  {count:>10,}  {time.perf_counter() - started:>7.1f}  {written / 2 ** 20:>9.1f}'
+            f'  {current / 1024:>8.0f} / {peak / 1024:.0f}'
+        )
+
+
+class _Counter:
+    """Iterator wrapper that counts the rows handed to a writer"""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = next(self.rows)
+        self.count += 1
+        return row
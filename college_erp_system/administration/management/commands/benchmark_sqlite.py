@@ -0,0 +1,116 @@
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from college_erp.sqlite import pragma_statements
+
+# Plain sqlite3 defaults, as the project ran before the connection profile
+DEFAULT_PROFILE = {'pragmas': {}, 'begin': 'BEGIN'}
+
+SEED_ROWS = 1000
+
+
+def tuned_profile():
+    return {'pragmas': settings.SQLITE_PRAGMAS, 'begin': 'BEGIN IMMEDIATE'}
+
+
+def open_connection(path, profile):
+    db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    for statement in pragma_statements(profile['pragmas']):
+        db.execute(statement)
+    return db
+
+
+class Command(BaseCommand):
+    help = 'Compare lock errors and throughput of concurrent writers under the default and tuned SQLite profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Writer threads (default 8)')
+        parser.add_argument('--readers', type=int, default=4, help='Reader threads (default 4)')
+        parser.add_argument(
+            '--transactions',
+            type=int,
+            default=200,
+            help='Transactions per writer, each a read followed by writes like marking attendance (default 200)'
+        )
+        parser.add_argument('--profile', choices=['default', 'tuned', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        profiles = {'default': DEFAULT_PROFILE, 'tuned': tuned_profile()}
+        names = list(profiles) if options['profile'] == 'both' else [options['profile']]
+
+        self.stdout.write(
+            f"{options['writers']} writer(s) x {options['transactions']} transactions, {options['readers']} reader(s)"
+        )
+        for name in names:
+            with tempfile.TemporaryDirectory() as workdir:
+                result = self.run_profile(Path(workdir) / 'bench.sqlite3', profiles[name], options)
+            style = self.style.SUCCESS if not result['errors'] else self.style.WARNING
+            self.stdout.write(style(
+                f"{name:>8}: {result['committed']} committed, {result['errors']} 'database is locked' errors, "
+                f"{result['committed'] / result['elapsed']:.0f} writes/s, "
+                f"{result['reads'] / result['elapsed']:.0f} reads/s ({result['elapsed']:.2f}s)"
+            ))
+
+    def run_profile(self, path, profile, options):
+        db = open_connection(path, profile)
+        db.execute('CREATE TABLE fee (id INTEGER PRIMARY KEY, paid INTEGER NOT NULL)')
+        db.execute('CREATE TABLE payment (id INTEGER PRIMARY KEY, fee_id INTEGER, amount INTEGER)')
+        db.executemany('INSERT INTO fee (id, paid) VALUES (?, 0)', [(i,) for i in range(SEED_ROWS)])
+        db.close()
+
+        counts = {'committed': 0, 'errors': 0, 'reads': 0}
+        lock = threading.Lock()
+        writers_done = threading.Event()
+
+        def writer(offset):
+            conn = open_connection(path, profile)
+            committed = errors = 0
+            for i in range(options['transactions']):
+                fee_id = (offset * options['transactions'] + i) % SEED_ROWS
+                try:
+                    conn.execute(profile['begin'])
+                    paid = conn.execute('SELECT paid FROM fee WHERE id = ?', (fee_id,)).fetchone()[0]
+                    conn.execute('INSERT INTO payment (fee_id, amount) VALUES (?, 100)', (fee_id,))
+                    conn.execute('UPDATE fee SET paid = ? WHERE id = ?', (paid + 100, fee_id))
+                    conn.execute('COMMIT')
+                    committed += 1
+                except sqlite3.OperationalError:
+                    errors += 1
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+            conn.close()
+            with lock:
+                counts['committed'] += committed
+                counts['errors'] += errors
+
+        def reader():
+            conn = open_connection(path, profile)
+            reads = 0
+            while not writers_done.is_set():
+                try:
+                    conn.execute('SELECT COUNT(*), SUM(paid) FROM fee').fetchone()
+                    reads += 1
+                except sqlite3.OperationalError:
+                    pass
+            conn.close()
+            with lock:
+                counts['reads'] += reads
+
+        writers = [threading.Thread(target=writer, args=(n,)) for n in range(options['writers'])]
+        readers = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        started = time.perf_counter()
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        counts['elapsed'] = time.perf_counter() - started
+        writers_done.set()
+        for thread in readers:
+            thread.join()
+        return counts
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from college_erp.sqlite import optimize_database
+
+
+class Command(BaseCommand):
+    help = 'Refresh SQLite query planner statistics (PRAGMA optimize) and checkpoint the WAL'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('optimize_db only applies to the SQLite database')
+
+        optimize_database(connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+            if journal_mode == 'wal':
+                # Fold the write-ahead log back into the database file and truncate it
+                cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                busy, log_pages, checkpointed = cursor.fetchone()
+                self.stdout.write(f'WAL checkpoint: {checkpointed}/{log_pages} pages (busy={busy})')
+
+        self.stdout.write(self.style.SUCCESS(f'Database optimized (journal mode: {journal_mode})'))
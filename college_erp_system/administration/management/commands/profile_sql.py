@@ -0,0 +1,124 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.test import Client
+from django.urls import URLPattern, URLResolver, get_resolver
+
+from college_erp.profiling import QueryRecorder, SqlProfile, compare_reports, view_name
+
+# Namespaces crawled by default, and GET endpoints left out of the crawl
+CRAWLED_NAMESPACES = {'accounts', 'students', 'teachers', 'administration'}
+SKIPPED_VIEWS = {'accounts:logout', 'accounts:login'}
+
+User = get_user_model()
+
+
+def crawlable_urls(patterns=None, prefix='', namespace=None):
+    """(view name, path) of every URL in the crawled namespaces that takes no arguments"""
+    urls = []
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        route = str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace in CRAWLED_NAMESPACES and '<' not in route:
+                urls += crawlable_urls(pattern.url_patterns, prefix + route, pattern.namespace)
+        elif isinstance(pattern, URLPattern) and namespace and pattern.name and '<' not in route:
+            name = f'{namespace}:{pattern.name}'
+            if name not in SKIPPED_VIEWS:
+                urls.append((name, '/' + prefix + route))
+    return urls
+
+
+class Command(BaseCommand):
+    help = 'Request views as each kind of user and report per-view query counts, DB time and probable N+1 queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            default=[],
+            help='Username to request views as; repeatable (default: the first admin, teacher and student)'
+        )
+        parser.add_argument(
+            '--url',
+            action='append',
+            default=[],
+            help='Path to request, query string allowed; repeatable (default: every view without URL arguments)'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=int,
+            default=settings.SQL_PROFILING_NPLUSONE_THRESHOLD,
+            help='Flag a query repeated more than this many times in one request (default %(default)s)'
+        )
+        parser.add_argument('--output', default=settings.SQL_PROFILING_REPORT, help='JSON report path')
+        parser.add_argument('--compare', metavar='OLD_REPORT', help='Report of a previous release to compare with')
+
+    def handle(self, *args, **options):
+        users = self.users(options['user'])
+        paths = options['url'] or [path for _, path in crawlable_urls()]
+        profile = SqlProfile(options['threshold'])
+
+        # GET views may still write (read markers, sessions); keep none of it
+        with transaction.atomic():
+            for user in users:
+                self.crawl(user, paths, profile)
+            transaction.set_rollback(True)
+
+        report = profile.report()
+        for view, entry in report['views'].items():
+            style = self.style.WARNING if entry['n_plus_one'] else self.style.SUCCESS
+            self.stdout.write(style(
+                f"{view}: {entry['max_queries']} queries, {entry['db_time_ms']:.1f} ms"
+                + (f", {len(entry['n_plus_one'])} probable N+1" if entry['n_plus_one'] else '')
+            ))
+            for flagged in entry['n_plus_one']:
+                self.stdout.write(f"    {flagged['count']}x {flagged['fingerprint'][:160]}")
+        profile.write(options['output'])
+        self.stdout.write(f"Report written to {options['output']}")
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                regressions = compare_reports(json.load(f), report)
+            for line in regressions:
+                self.stdout.write(self.style.WARNING(line))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}"))
+
+    def users(self, usernames):
+        if usernames:
+            users = list(User.objects.filter(username__in=usernames))
+            missing = set(usernames) - {user.username for user in users}
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+            return users
+        users = [
+            User.objects.filter(role).order_by('pk').first()
+            for role in (Q(user_type='admin') | Q(is_superuser=True), Q(user_type='teacher'), Q(user_type='student'))
+        ]
+        users = [user for user in users if user]
+        if not users:
+            raise CommandError('No users to request views as; pass --user')
+        return users
+
+    def crawl(self, user, paths, profile):
+        # A host the site accepts; 'localhost' is allowed in DEBUG with no ALLOWED_HOSTS
+        host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+        client = Client(HTTP_HOST=host)
+        client.force_login(user)
+        for path in paths:
+            try:
+                # A savepoint per request, so a failing view leaves the crawl usable
+                with transaction.atomic(), QueryRecorder() as recorder:
+                    response = client.get(path)
+                    if getattr(response, 'streaming', False):
+                        b''.join(response.streaming_content)
+            except Exception as e:
+                self.stderr.write(f'{path} as {user.username}: {e.__class__.__name__}: {e}')
+                continue
+            # Redirects are role checks bouncing this user; only pages they can see count
+            if response.status_code == 200:
+                profile.add(view_name(response.wsgi_request), recorder)
@@ -0,0 +1,94 @@
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from administration.jobs import claim_next_job, heartbeat, recover_stale_jobs, run_pooled_job
+from college_erp.sqlite import optimize_if_due
+
+
+def _init_process():
+    """Set up Django in pool processes that were spawned rather than forked"""
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (notices, fee assignment, reports, backups) in a worker pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Jobs run at the same time (default 4)')
+        parser.add_argument(
+            '--pool',
+            choices=['thread', 'process'],
+            default='thread',
+            help='Run jobs in threads (default) or in separate processes for CPU-heavy work'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait for new jobs when the queue is empty (default 2)'
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=300,
+            help='Requeue running jobs with no heartbeat for this many seconds (default 300)'
+        )
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+
+        if options['pool'] == 'process':
+            # Forked children must not share the parent's database connection
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_process)
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+
+        self.stdout.write(f'Worker {worker_id} running {workers} {options["pool"]} slot(s)')
+        running = {}
+        try:
+            while True:
+                requeued, failed = recover_stale_jobs(options['stale_after'])
+                if requeued or failed:
+                    self.stdout.write(self.style.WARNING(
+                        f'Recovered stale jobs: {requeued} requeued, {failed} failed'
+                    ))
+                heartbeat(worker_id)
+                optimize_if_due()
+
+                # Fill the free slots with the oldest queued jobs
+                while len(running) < workers:
+                    job = claim_next_job(worker_id)
+                    if job is None:
+                        break
+                    self.stdout.write(f'Started job #{job.pk} ({job.kind})')
+                    running[pool.submit(run_pooled_job, job.pk)] = job
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    job.refresh_from_db(fields=['status'])
+                    style = self.style.SUCCESS if job.status == 'succeeded' else self.style.ERROR
+                    self.stdout.write(style(f'Finished job #{job.pk} ({job.kind}): {job.status}'))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING(
+                f'Stopping; waiting for {len(running)} running job(s) to finish'
+            ))
+        finally:
+            pool.shutdown(wait=True)
+
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker_id} stopped'))
@@ -1,3 +1,52 @@
 from django.db import models
+from django.conf import settings
 
-# Create your models here.
+
+class BackgroundJob(models.Model):
+    """A long-running admin operation, queued by a view and executed by `manage.py run_jobs`"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)  # name of a task registered in administration.jobs
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='background_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Workers claim the oldest queued job; stale-job recovery scans running ones
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} ({self.get_status_display()})"
+
+    @property
+    def percent(self):
+        if self.status == 'succeeded':
+            return 100
+        if not self.progress_total:
+            return 0
+        return min(round(self.progress_done / self.progress_total * 100), 100)
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+
+from students.models import Student
+from teachers.models import Teacher
+from academics.models import Department, Course, Class, Exam, Fee, Attendance
+from .stats import invalidate_dashboard_stats
+
+# Models counted by the dashboard statistics block
+DASHBOARD_STATS_MODELS = [Student, Teacher, Fee, Attendance, Department, Course, Class, Exam]
+
+
+def connect_dashboard_stats_signals():
+    for model in DASHBOARD_STATS_MODELS:
+        dispatch_uid = f'dashboard_stats_{model._meta.label_lower}'
+        post_save.connect(invalidate_dashboard_stats, sender=model, dispatch_uid=f'{dispatch_uid}_save')
+        post_delete.connect(invalidate_dashboard_stats, sender=model, dispatch_uid=f'{dispatch_uid}_delete')
@@ -0,0 +1,165 @@
+"""
+Background tasks for the heavy admin operations.
+
+Each task receives its BackgroundJob and the keyword arguments it was enqueued
+with, and returns a small JSON-serialisable result for the job status endpoint.
+"""
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import User
+from students.models import Student
+from students.notices import publish_notification
+from teachers.models import Teacher
+from academics.models import Department, Fee
+from .backups import create_backup
+from .exports import EXPORTERS, WRITERS
+from .jobs import task, report_progress
+from .stats import invalidate_dashboard_stats
+
+FEE_BATCH_SIZE = 500
+REPORT_PROGRESS_EVERY = 10000
+
+
+def deliver_notice(created_by, *, title, message, notice_type='general', recipient_type='all', target_id=None,
+                   is_urgent=False, send_email=False):
+    """Publish one notice to the audience chosen in the notice modal; returns (recipient count, audience)"""
+    notice = {
+        'title': title,
+        'message': message,
+        'notification_type': notice_type,
+        'is_urgent': is_urgent,
+        'send_email': send_email,
+        'created_by': created_by,
+    }
+
+    # Each notice is stored once and addressed to its audience
+    if recipient_type == 'all':
+        _, recipients = publish_notification(target_audience='all', **notice)
+        description = "Everyone (Students & Teachers)"
+    elif recipient_type == 'all_students':
+        _, recipients = publish_notification(target_audience='all_students', **notice)
+        description = "All Students"
+    elif recipient_type == 'all_teachers':
+        _, recipients = publish_notification(target_audience='all_teachers', **notice)
+        description = "All Teachers"
+    elif recipient_type == 'department':
+        dept = Department.objects.get(id=target_id)
+        _, recipients = publish_notification(target_audience='department', target_department=dept, **notice)
+        description = f"Department: {dept.name}"
+    elif recipient_type == 'specific_student':
+        student = Student.objects.select_related('user').get(id=target_id)
+        _, recipients = publish_notification(target_audience='individual_student', target_student=student, **notice)
+        description = f"Student: {student.user.get_full_name()} ({student.roll_number})"
+    elif recipient_type == 'specific_teacher':
+        teacher = Teacher.objects.select_related('user').get(id=target_id)
+        _, recipients = publish_notification(target_audience='individual_teacher', target_teacher=teacher, **notice)
+        description = f"Teacher: {teacher.user.get_full_name()} ({teacher.employee_id})"
+    else:
+        raise ValueError(f"Unknown recipient type '{recipient_type}'")
+    return recipients, description
+
+
+@task('send_notice', retry=False)
+def send_notice_task(job, **notice):
+    """Publish a whole-college notice (not retried: a rerun would publish twice)"""
+    recipients, description = deliver_notice(job.created_by, **notice)
+    report_progress(job, done=recipients, total=recipients, message=f"Sent to {description}")
+    return {'recipients': recipients, 'target': description}
+
+
+@task('assign_fees')
+def assign_fees_task(job, *, student_ids, fee_type, amount, due_date, academic_year, semester):
+    """
+    Create one fee per selected student in batches, each batch notified with one notice.
+
+    A batch's fees and notice commit together, and students who already have this
+    fee (type, academic year, semester) are skipped, so a job rerun after its
+    worker died picks up where it stopped without duplicates.
+    """
+    amount = Decimal(amount)
+    user_ids = list(
+        User.objects.filter(id__in=student_ids, user_type='student').order_by('id').values_list('id', flat=True)
+    )
+    report_progress(job, done=0, total=len(user_ids), message="Assigning fees")
+    notice = {
+        'title': f"New Fee Assignment: {dict(Fee.FEE_TYPE_CHOICES).get(fee_type, fee_type)}",
+        'message': f"A new fee of ₹{amount} has been assigned to you for {academic_year}. Due date: {due_date}",
+        'notification_type': 'fee',
+        'created_by': job.created_by,
+    }
+
+    created = 0
+    for start in range(0, len(user_ids), FEE_BATCH_SIZE):
+        batch = user_ids[start:start + FEE_BATCH_SIZE]
+        with transaction.atomic():
+            assigned = set(Fee.objects.filter(
+                student_id__in=batch, fee_type=fee_type, academic_year=academic_year, semester=semester
+            ).values_list('student_id', flat=True))
+            new_ids = [user_id for user_id in batch if user_id not in assigned]
+            Fee.objects.bulk_create([
+                Fee(
+                    student_id=user_id,
+                    fee_type=fee_type,
+                    amount=amount,
+                    due_date=due_date,
+                    academic_year=academic_year,
+                    semester=semester,
+                    payment_status='pending'
+                )
+                for user_id in new_ids
+            ])
+            if new_ids:
+                publish_notification(recipient_ids=new_ids, **notice)
+        created += len(new_ids)
+        report_progress(job, done=start + len(batch))
+
+    # bulk_create sends no post_save, so drop the cached admin statistics here
+    invalidate_dashboard_stats()
+
+    report_progress(job, message=f"Assigned fees to {created} students")
+    return {'created': created}
+
+
+@task('generate_report')
+def generate_report_task(job, *, report_type, format_type='csv', filters=None):
+    """Write a full export to REPORTS_DIR for download through the job's download link"""
+    exporter = EXPORTERS[report_type]
+    writer, _, extension, use_keys = WRITERS[format_type]
+    lookups = exporter.parse_filters(filters or {})
+
+    reports_dir = Path(settings.REPORTS_DIR)
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    filename = f"{report_type}_{timezone.now().strftime('%Y%m%d_%H%M%S')}_job{job.pk}.{extension}"
+
+    total = exporter.get_queryset().filter(**lookups).count()
+    report_progress(job, done=0, total=total, message=f"Writing {filename}")
+
+    def counted(rows):
+        for done, row in enumerate(rows, start=1):
+            if done % REPORT_PROGRESS_EVERY == 0:
+                report_progress(job, done=done)
+            yield row
+
+    header = [key if use_keys else label for key, label, _ in exporter.columns]
+    with open(reports_dir / filename, 'wb') as output:
+        for chunk in writer(header, counted(exporter.rows(lookups))):
+            output.write(chunk.encode() if isinstance(chunk, str) else chunk)
+
+    report_progress(job, done=total, message=f"Report ready: {filename}")
+    return {'file': filename, 'rows': total}
+
+
+@task('backup_data')
+def backup_data_task(job):
+    """Write a verified, compressed online backup of the database to BACKUP_DIR"""
+    def step(copied, total):
+        report_progress(job, done=copied, total=total)
+
+    backup = create_backup(progress=step)
+    report_progress(job, message=f"Backup written: {backup['file']}")
+    return backup
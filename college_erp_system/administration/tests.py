@@ -1,3 +1,581 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import zipfile
+from unittest import mock
+from datetime import date, timedelta
+from pathlib import Path
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.http import StreamingHttpResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from academics.models import Department, Class, Course, Subject, Attendance, Fee
+from students.models import Student, Notification
+from tests_utils import create_student
+from teachers.models import Teacher
+from college_erp.profiling import QueryRecorder, fingerprint, process_report_path
+from college_erp.routers import ReplicaRouter, read_from_replica, use_replica
+from college_erp.sqlite import optimize_if_due
+from .analytics import time_series
+from .backups import BackupError, create_backup, list_backups, verify_backup
+from .jobs import MAX_ATTEMPTS, claim_next_job, enqueue, recover_stale_jobs, run_job
+from .models import BackgroundJob
+from .stats import DASHBOARD_STATS_CACHE_KEY, dashboard_stats
+
+
+class SearchRecipientsTests(TestCase):
+    """Typeahead endpoint behind the notice modal"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', user_type='admin', is_staff=True)
+        department = Department.objects.create(name='Computer Engineering', code='CE')
+        student_class = Class.objects.create(
+            name='CE-1', department=department, semester=1, section='A', academic_year='2025-2026'
+        )
+        for i, (first, last) in enumerate([('John', 'Smith'), ('Joan', 'Doe'), ('Mary', 'Johnson')]):
+            user = User.objects.create_user(f'student{i}', user_type='student', first_name=first, last_name=last)
+            create_student(user, student_class, f'CE{i:03d}', f'ADM{i:03d}')
+        user = User.objects.create_user('teacher', user_type='teacher', first_name='Jonas', last_name='Brown')
+        Teacher.objects.create(
+            user=user, employee_id='EMP001', department=department, designation='Lecturer',
+            qualification='master', employment_type='permanent', joining_date=date(2020, 7, 1)
+        )
+
+    def search(self, **params):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('administration:search_recipients'), params)
+        self.assertEqual(response.status_code, 200)
+        return [(r['type'], r['name']) for r in response.json()['results']]
+
+    def test_prefix_matches_students_and_teachers(self):
+        self.assertEqual(self.search(q='jo'), [
+            ('student', 'Joan Doe'), ('student', 'John Smith'), ('student', 'Mary Johnson'), ('teacher', 'Jonas Brown')
+        ])
+        self.assertEqual(self.search(q='john sm'), [('student', 'John Smith')])
+        self.assertEqual(self.search(q='EMP'), [('teacher', 'Jonas Brown')])
+        self.assertEqual(self.search(q='ohn'), [])
+
+    def test_type_limit_and_minimum_length(self):
+        self.assertEqual(self.search(q='jo', type='teacher'), [('teacher', 'Jonas Brown')])
+        self.assertEqual(len(self.search(q='jo', type='student', limit=2)), 2)
+        self.assertEqual(self.search(q='j'), [])
+
+
+class DashboardStatsTests(TestCase):
+    """Cached statistics block of the admin dashboard"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.departments = [
+            Department.objects.create(name='Computer Engineering', code='CE'),
+            Department.objects.create(name='Mechanical Engineering', code='ME'),
+        ]
+        cls.student_class = Class.objects.create(
+            name='CE-1', department=cls.departments[0], semester=1, section='A', academic_year='2025-2026'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def add_student(self, index, department):
+        user = User.objects.create_user(f'student{index}', user_type='student')
+        return create_student(user, self.student_class, f'R{index:03d}', f'ADM{index:03d}', department=department)
+
+    def test_department_breakdown_and_cache_hit(self):
+        for i in range(3):
+            self.add_student(i, self.departments[i % 2])
+
+        stats = dashboard_stats()
+        self.assertEqual(
+            [(row['dept'].code, row['student_count'], row['percentage']) for row in stats['department_stats']],
+            [('CE', 2, 66.7), ('ME', 1, 33.3)]
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(dashboard_stats(), stats)
+        self.assertEqual(len(queries), 0)
+
+    def test_saving_a_counted_model_invalidates(self):
+        self.assertEqual(dashboard_stats()['total_students'], 0)
+        student = self.add_student(0, self.departments[0])
+        self.assertEqual(dashboard_stats()['total_students'], 1)
+        student.delete()
+        self.assertEqual(dashboard_stats()['total_students'], 0)
+
+    def test_block_cached_before_commit_is_dropped_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_student(0, self.departments[0])
+            # What a concurrent request would cache while the write is uncommitted
+            cache.set(DASHBOARD_STATS_CACHE_KEY, {'total_students': 0})
+        self.assertEqual(dashboard_stats()['total_students'], 1)
+
+
+class AnalyticsTests(TestCase):
+    """Time-bucketed series and the analytics endpoint"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', user_type='admin', is_staff=True)
+        department = Department.objects.create(name='Computer Engineering', code='CE')
+        student_class = Class.objects.create(
+            name='CE-1', department=department, semester=1, section='A', academic_year='2025-2026'
+        )
+        for i, admitted in enumerate([date(2025, 1, 31), date(2025, 2, 1), date(2025, 3, 31), date(2025, 3, 3)]):
+            user = User.objects.create_user(f'student{i}', user_type='student')
+            create_student(user, student_class, f'R{i:03d}', f'ADM{i:03d}', admission_date=admitted)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_months_are_calendar_months_and_zero_filled(self):
+        series = time_series(Student.objects.all(), 'admission_date', date(2024, 12, 15), date(2025, 4, 30))
+        self.assertEqual([(p['period'], p['value']) for p in series], [
+            (date(2024, 12, 1), 0), (date(2025, 1, 1), 1), (date(2025, 2, 1), 1),
+            (date(2025, 3, 1), 2), (date(2025, 4, 1), 0),
+        ])
+
+    def test_weeks_start_on_monday(self):
+        series = time_series(Student.objects.all(), 'admission_date', date(2025, 3, 3), date(2025, 3, 31), 'week')
+        self.assertEqual([p['value'] for p in series], [1, 0, 0, 0, 1])
+        self.assertEqual(series[0]['period'], date(2025, 3, 3))
+
+    # Load the user on both requests so only the analytics queries differ
+    @override_settings(AUTH_USER_CACHE_TTL=0)
+    def test_endpoint_costs_three_queries_then_hits_the_cache(self):
+        self.client.force_login(self.admin)
+        url = reverse('administration:analytics')
+        params = {'from_date': '2025-01-01', 'to_date': '2025-03-31'}
+
+        with CaptureQueriesContext(connection) as cold:
+            response = self.client.get(url, params)
+        with CaptureQueriesContext(connection) as warm:
+            self.assertEqual(self.client.get(url, params).json(), response.json())
+        self.assertEqual(len(cold) - len(warm), 3)
+        self.assertEqual([p['students'] for p in response.json()['enrollment']], [1, 1, 2])
+
+        self.assertEqual(self.client.get(url, {'granularity': 'year'}).status_code, 400)
+
+    def test_attendance_trend_rejects_malformed_filters(self):
+        self.client.force_login(self.admin)
+        url = reverse('administration:attendance_trend')
+        for params in ({'from_date': '2025-13-01'}, {'to_date': 'yesterday'}, {'department': 'CE'}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400, params)
+        response = self.client.get(url, {'from_date': '2025-08-01', 'to_date': '2025-08-31', 'granularity': 'week'})
+        self.assertEqual(response.json(), {'granularity': 'week', 'series': []})
+
+
+class FinancialReportExportTests(TestCase):
+    """Streaming CSV downloads of financial_reports"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', user_type='admin', is_staff=True)
+        cls.department = Department.objects.create(name='Computer Engineering', code='CE')
+        cls.student_class = Class.objects.create(
+            name='CE-1', department=cls.department, semester=1, section='A', academic_year='2025-2026'
+        )
+
+    def add_defaulters(self, count, start=0):
+        for i in range(start, start + count):
+            user = User.objects.create_user(f'student{i}', user_type='student', first_name='Student', last_name=str(i))
+            create_student(user, self.student_class, f'R{i:03d}', f'ADM{i:03d}')
+            Fee.objects.create(
+                student=user, fee_type='tuition', amount=1000, due_date=date(2025, 8, 1),
+                academic_year='2025-2026', semester=1, payment_status='overdue'
+            )
+
+    def export(self, report_type):
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('administration:financial_reports'),
+                {'type': report_type, 'academic_year': '2025-2026', 'export': 'csv'}
+            )
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(response.streaming)
+        return lines, len(queries)
+
+    def test_defaulters_stream_with_constant_queries(self):
+        self.add_defaulters(2)
+        small, small_queries = self.export('defaulters')
+        self.add_defaulters(20, start=2)
+        large, large_queries = self.export('defaulters')
+
+        self.assertEqual(len(small), 3)
+        self.assertEqual(len(large), 23)
+        self.assertTrue(large[1].startswith('Student 0,R000,Tuition Fee,1000.00,2025-08-01,'))
+        self.assertEqual(small_queries, large_queries)
+
+    def test_every_report_type_exports(self):
+        self.add_defaulters(1)
+        summary = self.export('summary')[0]
+        self.assertEqual(summary[0], 'Metric,Amount')
+        self.assertTrue(summary[1].startswith('Total Fees,1000'))
+        monthly = self.export('monthly')[0]
+        self.assertEqual((monthly[0], len(monthly)), ('Month,Amount Collected', 13))
+
+
+class ExportDataTests(TestCase):
+    """Streaming export engine behind export_data"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', user_type='admin', is_staff=True)
+        cls.departments = []
+        subjects = []
+        for code, semester in (('CE', 1), ('ME', 3)):
+            department = Department.objects.create(name=f'{code} Engineering', code=code)
+            student_class = Class.objects.create(
+                name=f'{code}-{semester}', department=department, semester=semester, section='A', academic_year='2025-2026'
+            )
+            course = Course.objects.create(name=f'{code} Course', code=f'{code}101', department=department, semester=semester, credits=3)
+            subjects.append(Subject.objects.create(course=course, class_assigned=student_class))
+            cls.departments.append(department)
+        cls.subjects = subjects
+
+    def add_attendance(self, count, start=0):
+        for i in range(start, start + count):
+            subject = self.subjects[i % 2]
+            user = User.objects.create_user(f'student{i}', user_type='student', first_name='Student', last_name=str(i))
+            create_student(user, subject.class_assigned, f'R{i:03d}', f'ADM{i:03d}')
+            Attendance.objects.create(student=user, subject=subject, date=date(2025, 8, 1 + i % 5), is_present=i % 3 > 0)
+
+    def export(self, **params):
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('administration:export_data'), params)
+            body = b''.join(response.streaming_content) if response.streaming else b''
+        return response, body, len(queries)
+
+    def test_attendance_filters_and_constant_queries(self):
+        self.add_attendance(4)
+        _, small, small_queries = self.export(type='attendance')
+        self.add_attendance(30, start=4)
+        _, large, large_queries = self.export(type='attendance')
+        self.assertEqual((len(small.splitlines()), len(large.splitlines())), (5, 35))
+        self.assertEqual(small_queries, large_queries)
+
+        _, body, _ = self.export(type='attendance', semester=3, from_date='2025-08-02', to_date='2025-08-03')
+        rows = body.decode().splitlines()[1:]
+        self.assertTrue(rows)
+        self.assertTrue(all(',ME101,' in row and row[:10] in ('2025-08-02', '2025-08-03') for row in rows))
+
+    def test_ndjson_and_xlsx(self):
+        self.add_attendance(3)
+        response, body, _ = self.export(type='attendance', format='ndjson', department=self.departments[0].id)
+        records = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([r['roll_number'] for r in records], ['R000', 'R002'])
+        self.assertEqual(records[0]['status'], 'Absent')
+
+        _, body, _ = self.export(type='students', format='xlsx')
+        sheet = zipfile.ZipFile(io.BytesIO(body)).read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row '), 4)
+        self.assertIn('Student 2', sheet)
+
+    def test_unknown_type_or_bad_filter_redirects(self):
+        self.assertEqual(self.export(type='grades')[0].status_code, 302)
+        self.assertEqual(self.export(type='attendance', from_date='01/08/2025')[0].status_code, 302)
+
+
+class BackgroundJobTests(TestCase):
+    """Admin operations queued by the views and run by the job worker"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', user_type='admin', is_staff=True)
+        cls.department = Department.objects.create(name='Computer Engineering', code='CE')
+        student_class = Class.objects.create(
+            name='CE-1', department=cls.department, semester=1, section='A', academic_year='2025-2026'
+        )
+        cls.students = []
+        for i in range(3):
+            user = User.objects.create_user(f'student{i}', user_type='student', first_name='Student', last_name=str(i))
+            create_student(user, student_class, f'CE{i:03d}', f'ADM{i:03d}')
+            cls.students.append(user)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def run_next(self):
+        job = claim_next_job('test-worker')
+        run_job(job)
+        job.refresh_from_db()
+        return job
+
+    def test_department_notice_is_sent_inline(self):
+        response = self.client.post(reverse('administration:send_notice'), {
+            'title': 'Holiday', 'message': 'College closed', 'recipient_type': 'department',
+            'department_id': self.department.id,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(BackgroundJob.objects.exists())
+        self.assertEqual(Notification.objects.get().target_department, self.department)
+
+        response = self.client.post(reverse('administration:send_notice'), {
+            'title': 'Holiday', 'message': 'College closed', 'recipient_type': 'department', 'department_id': 999,
+        }, follow=True)
+        self.assertIn('no longer exists', str(list(response.context['messages'])))
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_whole_college_notice_is_queued_then_published(self):
+        response = self.client.post(reverse('administration:send_notice'), {
+            'title': 'Holiday', 'message': 'College closed', 'recipient_type': 'all_students',
+        }, follow=True)
+        self.assertIn('run_jobs worker', str(list(response.context['messages'])))
+        self.assertFalse(Notification.objects.exists())
+
+        job = self.run_next()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual(job.result, {'recipients': 3, 'target': 'All Students'})
+        self.assertEqual(job.created_by, self.admin)
+        self.assertEqual(Notification.objects.get().target_audience, 'all_students')
+
+    def test_bulk_assign_fees_progress_and_status_endpoint(self):
+        self.client.post(reverse('administration:bulk_assign_fees'), {
+            'student_ids': [u.id for u in self.students], 'fee_type': 'tuition', 'amount': '1500.00',
+            'due_date': '2025-09-30', 'academic_year': '2025-2026', 'semester': '1',
+        })
+        job = self.run_next()
+        self.assertEqual((job.progress_done, job.progress_total), (3, 3))
+        self.assertEqual(Fee.objects.filter(amount='1500.00', payment_status='pending').count(), 3)
+
+        data = self.client.get(reverse('administration:job_status', args=[job.id])).json()
+        self.assertEqual((data['status'], data['percent'], data['result']), ('succeeded', 100, {'created': 3}))
+
+    def test_rerun_jobs_do_not_duplicate_writes(self):
+        params = {'student_ids': [u.id for u in self.students], 'fee_type': 'tuition', 'amount': '1500.00',
+                  'due_date': '2025-09-30', 'academic_year': '2025-2026', 'semester': 1}
+        # A worker died after the first student's fee was committed
+        Fee.objects.create(student=self.students[0], fee_type='tuition', amount='1500.00', due_date='2025-09-30',
+                           academic_year='2025-2026', semester=1)
+        enqueue('assign_fees', created_by=self.admin, **params)
+        self.assertEqual(self.run_next().result, {'created': 2})
+        self.assertEqual(Fee.objects.count(), 3)
+
+        # Notices are not idempotent, so a lost send_notice job fails instead of running again
+        enqueue('send_notice', title='Hi', message='There')
+        job = claim_next_job('worker-1')
+        BackgroundJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=10))
+        self.assertEqual(recover_stale_jobs(60), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+    def test_failure_is_recorded(self):
+        job = enqueue('send_notice', title='Hi', message='There', recipient_type='department', target_id=999)
+        job = self.run_next()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('DoesNotExist', job.error)
+
+        data = self.client.get(reverse('administration:job_status', args=[job.id])).json()
+        self.assertIn('does not exist', data['error'])
+
+    def test_generate_report_download(self):
+        with tempfile.TemporaryDirectory() as reports_dir, override_settings(REPORTS_DIR=reports_dir):
+            self.client.post(reverse('administration:quick_actions'), {
+                'action': 'generate_report', 'report_type': 'students', 'department': self.department.id,
+            })
+            job = self.run_next()
+            self.assertEqual(job.result['rows'], 3)
+
+            response = self.client.get(reverse('administration:job_download', args=[job.id]))
+            body = b''.join(response.streaming_content).decode()
+            response.close()
+        self.assertEqual(len(body.splitlines()), 4)
+        self.assertIn('CE002', body)
+
+    def test_claim_is_exclusive_and_stale_jobs_are_recovered(self):
+        enqueue('backup_data')
+        job = claim_next_job('worker-1')
+        self.assertIsNone(claim_next_job('worker-2'))
+
+        BackgroundJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=10))
+        self.assertEqual(recover_stale_jobs(60), (1, 0))
+        self.assertEqual(claim_next_job('worker-2').pk, job.pk)
+
+        BackgroundJob.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() - timedelta(minutes=10), attempts=MAX_ATTEMPTS
+        )
+        self.assertEqual(recover_stale_jobs(60), (0, 1))
+
+
+class BackupTests(TransactionTestCase):
+    """Online, compressed database backups (committed data, read over a separate connection)"""
+
+    def setUp(self):
+        self.backup_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.backup_dir)
+
+    def test_snapshot_is_compressed_and_restorable(self):
+        User.objects.create_user('backed-up', user_type='admin')
+        steps = []
+        backup = create_backup(self.backup_dir, pages=2, keep=5, progress=lambda done, total: steps.append(done))
+
+        self.assertEqual([p.name for p in self.backup_dir.iterdir()], [backup['file']])
+        self.assertGreater(len(steps), 1)
+        self.assertEqual(steps[-1], backup['pages'])
+
+        restored = self.backup_dir / 'restored.sqlite3'
+        restored.write_bytes(gzip.decompress((self.backup_dir / backup['file']).read_bytes()))
+        db = sqlite3.connect(restored)
+        usernames = [row[0] for row in db.execute('SELECT username FROM accounts_user')]
+        db.close()
+        restored.unlink()
+        self.assertEqual(usernames, ['backed-up'])
+
+    def test_overdue_stepped_copy_falls_back_to_vacuum_into(self):
+        User.objects.create_user('backed-up', user_type='admin')
+        steps = []
+        with mock.patch('administration.backups.BACKUP_STEPPED_DEADLINE', -1):
+            first = create_backup(self.backup_dir, pages=2, keep=5, progress=lambda done, total: steps.append(done))
+        second = create_backup(self.backup_dir, pages=2, keep=5)
+
+        self.assertEqual(steps, [first['pages']])
+        verify_backup(self.backup_dir / first['file'])
+        # Archives made within the same second keep distinct names
+        self.assertNotEqual(first['file'], second['file'])
+        self.assertEqual(len(list_backups(self.backup_dir)), 2)
+
+    def test_retention_and_verify(self):
+        for day in range(1, 4):
+            (self.backup_dir / f'db_2025010{day}_000000.sqlite3.gz').write_bytes(gzip.compress(b'not a database'))
+        call_command('backup_data', dir=str(self.backup_dir), keep=2, stdout=io.StringIO())
+
+        archives = list_backups(self.backup_dir)
+        self.assertEqual(len(archives), 2)
+        self.assertEqual(archives[0].name, 'db_20250103_000000.sqlite3.gz')
+        verify_backup(archives[1])
+        with self.assertRaises(BackupError):
+            verify_backup(archives[0])
+
+
+class SqliteProfileTests(TransactionTestCase):
+    """PRAGMAs applied to every SQLite connection (outside a test transaction, like a real request)"""
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_connection_profile(self):
+        self.assertEqual(self.pragma('busy_timeout'), settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('temp_store'), 2)  # MEMORY
+        self.assertEqual(self.pragma('cache_size'), settings.SQLITE_PRAGMAS['cache_size'])
+
+    def test_optimize_runs_once_per_interval(self):
+        connection.ensure_connection()
+        with override_settings(SQLITE_OPTIMIZE_INTERVAL=0):
+            self.assertTrue(optimize_if_due())
+            with transaction.atomic():
+                self.assertFalse(optimize_if_due())
+        with override_settings(SQLITE_OPTIMIZE_INTERVAL=3600):
+            self.assertFalse(optimize_if_due())
+
+
+class ReplicaRouterTests(TestCase):
+    """Analytics reads go to the replica alias when one is configured"""
+
+    def test_reads_inside_use_replica_go_to_replica(self):
+        router = ReplicaRouter()
+        with mock.patch.dict(connections.settings, {'replica': connections.settings['default']}):
+            self.assertIsNone(router.db_for_read(User))
+            with use_replica():
+                self.assertEqual(router.db_for_read(User), 'replica')
+                self.assertEqual(router.db_for_write(User), 'default')
+
+            streamed = read_from_replica(lambda request: StreamingHttpResponse(
+                router.db_for_read(User) for _ in range(2)
+            ))(None)
+            self.assertEqual(b''.join(streamed.streaming_content), b'replicareplica')
+            self.assertIsNone(router.db_for_read(User))
+
+    def test_falls_back_to_default_without_replica(self):
+        self.assertNotIn('replica', connections.settings)
+        with use_replica():
+            self.assertEqual(User.objects.all().db, 'default')
+            self.assertEqual(User.objects.count(), 0)
+
+
+
+class SqlProfilingTests(TestCase):
+    """Per-view query fingerprints, N+1 flags and comparable reports"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Computer Engineering', code='CE')
+        cls.teacher = User.objects.create_user('teacher1', user_type='teacher')
+        for n in range(4):
+            Class.objects.create(name=f'CE-{n}', department=department, semester=n + 1, section='A',
+                                 academic_year='2025-2026', class_teacher=cls.teacher)
+
+    def test_fingerprints_ignore_literals(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 12 AND name = 'O''Brien'"),
+            fingerprint('SELECT * FROM t WHERE id = 7 AND name = %s'),
+        )
+        self.assertEqual(fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s)'), 'SELECT * FROM t WHERE id IN (...)')
+
+        with QueryRecorder() as recorder:
+            for n in range(3):
+                list(Department.objects.filter(id=n))
+        self.assertEqual(recorder.count, 3)
+        self.assertEqual(len(recorder.repeated(2)), 1)
+        self.assertEqual(recorder.repeated(3), {})
+
+    def test_command_flags_query_in_a_loop_and_compares_reports(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            output = Path(workdir) / 'profile.json'
+            out = io.StringIO()
+            call_command('profile_sql', user=['teacher1'], url=[reverse('teachers:my_classes')], threshold=2,
+                         output=str(output), stdout=out)
+            report = json.loads(output.read_text())
+            entry = report['views']['teachers:my_classes']
+            self.assertEqual(entry['requests'], 1)
+            # One student count and one subject count per managed class
+            self.assertEqual(sorted(flagged['count'] for flagged in entry['n_plus_one']), [4, 4])
+            self.assertIn('probable N+1', out.getvalue())
+
+            old = Path(workdir) / 'old.json'
+            entry.update(max_queries=entry['max_queries'] - 8, n_plus_one=[])
+            old.write_text(json.dumps(report))
+            out = io.StringIO()
+            call_command('profile_sql', user=['teacher1'], url=[reverse('teachers:my_classes')], threshold=2,
+                         output=str(output), compare=str(old), stdout=out)
+            self.assertIn('teachers:my_classes: new N+1 (4x)', out.getvalue())
+
+    def test_middleware_is_opt_in_and_writes_a_report_per_process(self):
+        self.client.force_login(self.teacher)
+        url = reverse('teachers:my_classes')
+        with tempfile.TemporaryDirectory() as workdir:
+            path = str(Path(workdir) / 'profile.json')
+            report = Path(process_report_path(path))
+            self.assertEqual(report.name, f'profile.{os.getpid()}.json')
+            with override_settings(SQL_PROFILING_REPORT=path, SQL_PROFILING_FLUSH_EVERY=2):
+                self.client.get(url)
+                self.assertFalse(report.exists())
+                with override_settings(SQL_PROFILING=True), mock.patch('atexit.register') as register:
+                    self.client.handler.load_middleware()
+                    self.client.get(url)
+                    self.assertFalse(report.exists())
+                    self.client.get(url)
+                    self.assertEqual(json.loads(report.read_text())['views']['teachers:my_classes']['requests'], 2)
+
+                    # The exit hook writes whatever arrived since the last flush
+                    self.client.get(url)
+                    flush, = register.call_args.args
+                    flush()
+            self.assertEqual(json.loads(report.read_text())['views']['teachers:my_classes']['requests'], 3)
@@ -8,6 +8,7 @@ urlpatterns = [
     path('analytics/', views.get_dashboard_analytics, name='analytics'),
     path('notifications/send/', views.send_notification, name='send_notification'),
     path('notice/send/', views.send_notice, name='send_notice'),
+    path('notice/recipients/', views.search_recipients_api, name='search_recipients'),
     path('reports/', views.system_reports, name='reports'),
     path('users/', views.manage_users, name='users'),
     path('get-user/<int:user_id>/', views.get_user_data, name='get_user_data'),
@@ -17,7 +18,10 @@ urlpatterns = [
     path('department/<int:dept_id>/', views.department_details, name='department_details'),
     path('quick-actions/', views.quick_actions, name='quick_actions'),
     path('export/', views.export_data, name='export_data'),
+    path('jobs/<int:job_id>/', views.job_status_api, name='job_status'),
+    path('jobs/<int:job_id>/download/', views.job_download, name='job_download'),
     path('attendance/', views.attendance_overview, name='attendance_overview'),
+    path('attendance/trend/', views.attendance_trend_api, name='attendance_trend'),
     path('financial/', views.financial_dashboard, name='financial_dashboard'),
     path('academic-performance/', views.academic_performance, name='academic_performance'),
     
@@ -1,155 +1,148 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.db.models import Count, Avg, Sum, Q, F
 from django.utils import timezone
-from django.http import JsonResponse, HttpResponse
-from datetime import datetime, timedelta
+from django.http import JsonResponse, FileResponse, Http404
+from django.urls import reverse
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from datetime import date, datetime, timedelta
 from decimal import Decimal
-import csv
+from pathlib import Path
 
 from students.models import Student, Notification
+from students.notices import publish_notification
 from teachers.models import Teacher
 from academics.models import (
     Department, Course, Class, Subject, Attendance, 
-    Exam, Result, Fee, Timetable
+    Exam, Result, Fee, Timetable, PaymentMethod, DailyFeeCollection
 )
+from academics.rollups import (
+    daily_attendance_totals, attendance_trend, record_fee_collection,
+    monthly_fee_collections, fee_collection_breakdown
+)
+from college_erp.routers import read_from_replica
+from academics.reference import departments, active_payment_methods
+from accounts.decorators import role_required
+from .stats import dashboard_stats
+from .analytics import GRANULARITIES, buckets, default_range, time_series
+from .exports import EXPORTERS, WRITERS, stream_export, stream_csv, financial_report_rows
+from .jobs import enqueue, job_status
+from .tasks import deliver_notice
+from .models import BackgroundJob
+
+# Typeahead recipient search
+RECIPIENT_SEARCH_MIN_LENGTH = 2
+RECIPIENT_SEARCH_LIMIT = 10
+RECIPIENT_SEARCH_MAX = 25
+
+# Longest series get_dashboard_analytics will build in one request
+ANALYTICS_MAX_BUCKETS = 260
 
+# Form field holding the picked target for each targeted notice
+NOTICE_TARGET_FIELDS = {
+    'department': 'department_id',
+    'specific_student': 'student_id',
+    'specific_teacher': 'teacher_id',
+}
 
-def is_admin_user(user):
-    """Check if user is admin/staff"""
-    return user.is_authenticated and (user.is_staff or user.is_superuser or user.is_admin)
 
+def _job_queued_message(request, job, what):
+    """Tell the admin a background job was queued and where to follow it"""
+    status_url = reverse('administration:job_status', args=[job.pk])
+    messages.success(request, f'✅ {what} queued as job #{job.pk}. Track progress at {status_url}')
 
-@login_required
-@user_passes_test(is_admin_user)
+
+@role_required('admin')
 def dashboard(request):
     """Administration dashboard with comprehensive statistics"""
-    context = {}
-    
-    # Basic Statistics
-    context['total_students'] = Student.objects.filter(is_active=True).count()
-    context['total_teachers'] = Teacher.objects.filter(is_active=True).count()
-    context['total_departments'] = Department.objects.count()
-    context['total_courses'] = Course.objects.count()
-    context['total_classes'] = Class.objects.count()
-    
-    # Attendance Analytics
-    one_week_ago = timezone.now().date() - timedelta(days=7)
-    weekly_attendance = Attendance.objects.filter(
-        date__gte=one_week_ago,
-        date__lte=timezone.now().date()
-    ).aggregate(
-        avg_attendance=Avg('is_present')
-    )
-    
-    attendance_percentage = 0
-    if weekly_attendance['avg_attendance']:
-        attendance_percentage = round(weekly_attendance['avg_attendance'] * 100, 1)
-    context['attendance_percentage'] = attendance_percentage
-    
-    # Upcoming Exams (Next 7 days)
-    next_week = timezone.now() + timedelta(days=7)
-    context['upcoming_exams'] = Exam.objects.filter(
-        date__gte=timezone.now(),
-        date__lte=next_week
-    ).count()
-    
-    # Pending Fees Statistics
-    pending_fees = Fee.objects.filter(
-        payment_status__in=['pending', 'partial', 'overdue']
-    ).aggregate(
-        count=Count('id'),
-        total_amount=Sum('amount')
-    )
-    
-    context['pending_fees_count'] = pending_fees['count'] or 0
-    context['pending_fees_amount'] = pending_fees['total_amount'] or Decimal('0.00')
+    # Counts, fee and attendance figures and the department breakdown (cached)
+    context = dict(dashboard_stats())
     
     # Recent Notifications (Last 7 days)
     context['recent_notifications'] = Notification.objects.filter(
         created_at__gte=timezone.now() - timedelta(days=7)
     ).order_by('-created_at')[:5]
     
-    # Department Statistics
-    department_stats = []
-    total_students_count = context['total_students']
-    
-    for dept in Department.objects.all():
-        dept_student_count = Student.objects.filter(
-            department=dept,
-            is_active=True
-        ).count()
-        
-        percentage = 0
-        if total_students_count > 0:
-            percentage = round((dept_student_count / total_students_count) * 100, 1)
-        
-        department_stats.append({
-            'dept': dept,
-            'student_count': dept_student_count,
-            'percentage': percentage
-        })
-    
-    context['department_stats'] = department_stats
-    
-    # Add data for notice modal
-    context['all_students'] = Student.objects.filter(is_active=True).select_related('user', 'department').order_by('user__first_name')
-    context['all_teachers'] = Teacher.objects.filter(is_active=True).select_related('user', 'department').order_by('user__first_name')
+    # The notice modal looks up individual recipients through search_recipients_api
     
     return render(request, 'administration/dashboard.html', context)
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
+@read_from_replica
 def get_dashboard_analytics(request):
-    """API endpoint for dashboard analytics data"""
-    
-    # Monthly student enrollment data
-    monthly_data = []
-    for i in range(12):
-        month_start = timezone.now().replace(day=1) - timedelta(days=30*i)
-        month_end = month_start.replace(month=month_start.month % 12 + 1, day=1) - timedelta(days=1)
+    """
+    API endpoint for dashboard analytics data.
+
+    Enrollment is bucketed by month or week over `from_date`..`to_date` (the last 12
+    buckets by default). The whole payload is three queries and is cached per
+    (range, granularity).
+    """
+    granularity = request.GET.get('granularity', 'month')
+    if granularity not in GRANULARITIES:
+        return JsonResponse({'error': 'granularity must be "month" or "week"'}, status=400)
+    
+    date_from, date_to = default_range(timezone.now().date(), granularity)
+    try:
+        if request.GET.get('from_date'):
+            date_from = date.fromisoformat(request.GET['from_date'])
+        if request.GET.get('to_date'):
+            date_to = date.fromisoformat(request.GET['to_date'])
+    except ValueError:
+        return JsonResponse({'error': 'from_date and to_date must be YYYY-MM-DD'}, status=400)
+    
+    if date_from > date_to:
+        return JsonResponse({'error': 'from_date must not be after to_date'}, status=400)
+    if len(buckets(date_from, date_to, granularity)) > ANALYTICS_MAX_BUCKETS:
+        return JsonResponse({'error': f'at most {ANALYTICS_MAX_BUCKETS} buckets per request'}, status=400)
+    
+    cache_key = f'administration:analytics:{date_from}:{date_to}:{granularity}'
+    payload = cache.get(cache_key)
+    if payload is None:
+        # Student enrollment per bucket
+        enrollment = time_series(Student.objects.all(), 'admission_date', date_from, date_to, granularity)
         
-        student_count = Student.objects.filter(
-            admission_date__gte=month_start,
-            admission_date__lte=month_end
-        ).count()
+        # Department wise performance (published results, one grouped query)
+        dept_performance = Department.objects.annotate(
+            avg_performance=Avg(
+                'student__user__exam_results__marks_obtained',
+                filter=Q(student__user__exam_results__is_published=True)
+            )
+        ).values('name', 'avg_performance').order_by('name')
         
-        monthly_data.append({
-            'month': month_start.strftime('%B %Y'),
-            'students': student_count
-        })
-    
-    # Department wise performance
-    dept_performance = []
-    for dept in Department.objects.all():
-        # Calculate average marks for the department
-        avg_marks = Result.objects.filter(
-            student__student_profile__department=dept,
-            is_published=True
-        ).aggregate(avg_marks=Avg('marks_obtained'))
+        # Fee collection status
+        fee_status = Fee.objects.values('payment_status').annotate(
+            count=Count('id'),
+            total=Sum('amount')
+        ).order_by('payment_status')
         
-        dept_performance.append({
-            'department': dept.name,
-            'avg_performance': avg_marks['avg_marks'] or 0
-        })
-    
-    # Fee collection status
-    fee_status = Fee.objects.values('payment_status').annotate(
-        count=Count('id'),
-        total=Sum('amount')
-    )
+        payload = {
+            'granularity': granularity,
+            'from_date': date_from.isoformat(),
+            'to_date': date_to.isoformat(),
+            'enrollment': [
+                {
+                    'period': point['period'].isoformat(),
+                    'label': point['period'].strftime('%B %Y' if granularity == 'month' else 'Week of %b %d, %Y'),
+                    'students': point['value'],
+                }
+                for point in enrollment
+            ],
+            'department_performance': [
+                {'department': row['name'], 'avg_performance': row['avg_performance'] or 0}
+                for row in dept_performance
+            ],
+            'fee_status': list(fee_status),
+        }
+        cache.set(cache_key, payload, settings.ANALYTICS_CACHE_TTL)
     
-    return JsonResponse({
-        'monthly_enrollment': monthly_data,
-        'department_performance': dept_performance,
-        'fee_status': list(fee_status)
-    })
+    return JsonResponse(payload)
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
 def send_notification(request):
     """Send broadcast notifications"""
     if request.method == 'POST':
@@ -159,234 +152,93 @@ def send_notification(request):
         target_audience = request.POST.get('target_audience', 'all')
         is_urgent = request.POST.get('is_urgent') == 'on'
         
-        # Create notification
-        notification = Notification.objects.create(
-            title=title,
-            message=message,
-            notification_type=notification_type,
-            target_audience=target_audience,
-            is_urgent=is_urgent,
-            created_by=request.user
-        )
-        
         # Handle specific targeting
+        targets = {}
         if target_audience == 'class':
             class_id = request.POST.get('target_class')
             if class_id:
-                notification.target_class_id = class_id
-                notification.save()
+                targets['target_class'] = get_object_or_404(Class, id=class_id)
         
         elif target_audience == 'department':
             dept_id = request.POST.get('target_department')
             if dept_id:
-                notification.target_department_id = dept_id
-                notification.save()
+                targets['target_department'] = get_object_or_404(Department, id=dept_id)
         
         elif target_audience == 'individual':
+            target_audience = 'individual_student'
             student_id = request.POST.get('target_student')
             if student_id:
-                notification.target_student_id = student_id
-                notification.save()
+                targets['target_student'] = get_object_or_404(Student, id=student_id)
+        
+        # Stored once; readers are matched by audience
+        publish_notification(
+            title=title,
+            message=message,
+            notification_type=notification_type,
+            target_audience=target_audience,
+            is_urgent=is_urgent,
+            created_by=request.user,
+            **targets
+        )
         
         return redirect('administration:dashboard')
     
     # GET request - show form
     context = {
-        'departments': Department.objects.all(),
+        'departments': departments(),
         'classes': Class.objects.all(),
         'students': Student.objects.filter(is_active=True).select_related('user'),
     }
     return render(request, 'administration/send_notification.html', context)
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
 def send_notice(request):
-    """Send notice to students/teachers (individual or bulk)"""
+    """Send a notice to a department or one person now, or queue a whole-college notice for the job worker"""
     if request.method == 'POST':
-        try:
-            from accounts.models import User
-            
-            title = request.POST.get('title', '').strip()
-            message = request.POST.get('message', '').strip()
-            notice_type = request.POST.get('notice_type', 'general')
-            recipient_type = request.POST.get('recipient_type', '')
-            is_urgent = 'is_urgent' in request.POST
-            send_email = 'send_email' in request.POST
-            
-            if not title or not message:
-                messages.error(request, '❌ Title and message are required!')
-                return redirect('administration:dashboard')
-            
-            notifications_created = 0
-            recipient_description = ""
-            
-            # Determine recipients based on type and create notifications
-            if recipient_type == 'all':
-                # All students
-                students = Student.objects.filter(is_active=True)
-                for student in students:
-                    Notification.objects.create(
-                        title=title,
-                        message=message,
-                        notification_type=notice_type,
-                        target_audience='all_students',
-                        target_student=student,
-                        is_urgent=is_urgent,
-                        send_email=send_email,
-                        created_by=request.user
-                    )
-                    notifications_created += 1
-                
-                # All teachers
-                teachers = Teacher.objects.filter(is_active=True)
-                for teacher in teachers:
-                    Notification.objects.create(
-                        title=title,
-                        message=message,
-                        notification_type=notice_type,
-                        target_audience='all_teachers',
-                        target_teacher=teacher,
-                        is_urgent=is_urgent,
-                        send_email=send_email,
-                        created_by=request.user
-                    )
-                    notifications_created += 1
-                    
-                recipient_description = "Everyone (Students & Teachers)"
-                
-            elif recipient_type == 'all_students':
-                # All students
-                students = Student.objects.filter(is_active=True)
-                for student in students:
-                    Notification.objects.create(
-                        title=title,
-                        message=message,
-                        notification_type=notice_type,
-                        target_audience='all_students',
-                        target_student=student,
-                        is_urgent=is_urgent,
-                        send_email=send_email,
-                        created_by=request.user
-                    )
-                    notifications_created += 1
-                    
-                recipient_description = "All Students"
-                
-            elif recipient_type == 'all_teachers':
-                # All teachers
-                teachers = Teacher.objects.filter(is_active=True)
-                for teacher in teachers:
-                    Notification.objects.create(
-                        title=title,
-                        message=message,
-                        notification_type=notice_type,
-                        target_audience='all_teachers',
-                        target_teacher=teacher,
-                        is_urgent=is_urgent,
-                        send_email=send_email,
-                        created_by=request.user
-                    )
-                    notifications_created += 1
-                    
-                recipient_description = "All Teachers"
-                
-            elif recipient_type == 'department':
-                # Specific department
-                dept_id = request.POST.get('department_id')
-                if dept_id:
-                    dept = Department.objects.get(id=dept_id)
-                    
-                    # Students in this department
-                    students = Student.objects.filter(department=dept, is_active=True)
-                    for student in students:
-                        Notification.objects.create(
-                            title=title,
-                            message=message,
-                            notification_type=notice_type,
-                            target_audience='department',
-                            target_department=dept,
-                            target_student=student,
-                            is_urgent=is_urgent,
-                            send_email=send_email,
-                            created_by=request.user
-                        )
-                        notifications_created += 1
-                    
-                    # Teachers in this department
-                    teachers = Teacher.objects.filter(department=dept, is_active=True)
-                    for teacher in teachers:
-                        Notification.objects.create(
-                            title=title,
-                            message=message,
-                            notification_type=notice_type,
-                            target_audience='department',
-                            target_department=dept,
-                            target_teacher=teacher,
-                            is_urgent=is_urgent,
-                            send_email=send_email,
-                            created_by=request.user
-                        )
-                        notifications_created += 1
-                        
-                    recipient_description = f"Department: {dept.name}"
-                    
-            elif recipient_type == 'specific_student':
-                # Specific student
-                student_id = request.POST.get('student_id')
-                if student_id:
-                    student = Student.objects.get(id=student_id)
-                    Notification.objects.create(
-                        title=title,
-                        message=message,
-                        notification_type=notice_type,
-                        target_audience='individual_student',
-                        target_student=student,
-                        is_urgent=is_urgent,
-                        send_email=send_email,
-                        created_by=request.user
-                    )
-                    notifications_created += 1
-                    recipient_description = f"Student: {student.user.get_full_name()} ({student.roll_number})"
-                    
-            elif recipient_type == 'specific_teacher':
-                # Specific teacher
-                teacher_id = request.POST.get('teacher_id')
-                if teacher_id:
-                    teacher = Teacher.objects.get(id=teacher_id)
-                    Notification.objects.create(
-                        title=title,
-                        message=message,
-                        notification_type=notice_type,
-                        target_audience='individual_teacher',
-                        target_teacher=teacher,
-                        is_urgent=is_urgent,
-                        send_email=send_email,
-                        created_by=request.user
-                    )
-                    notifications_created += 1
-                    recipient_description = f"Teacher: {teacher.user.get_full_name()} ({teacher.employee_id})"
-            
-            if notifications_created == 0:
-                messages.error(request, '❌ No recipients selected!')
-                return redirect('administration:dashboard')
-            
-            # Success message
-            urgency_text = "🚨 Urgent " if is_urgent else ""
-            messages.success(
-                request, 
-                f'✅ {urgency_text}Notice sent successfully to {notifications_created} recipient(s)! '
-                f'Target: {recipient_description}'
-            )
-            
-        except Exception as e:
-            messages.error(request, f'❌ Error sending notice: {str(e)}')
+        title = request.POST.get('title', '').strip()
+        message = request.POST.get('message', '').strip()
+        recipient_type = request.POST.get('recipient_type', '')
+        
+        if not title or not message:
+            messages.error(request, '❌ Title and message are required!')
+            return redirect('administration:dashboard')
+        
+        # Department and individual notices need the picked target
+        target_field = NOTICE_TARGET_FIELDS.get(recipient_type)
+        target_id = request.POST.get(target_field) if target_field else None
+        if recipient_type not in ('all', 'all_students', 'all_teachers') and not target_id:
+            messages.error(request, '❌ No recipients selected!')
+            return redirect('administration:dashboard')
+        
+        notice = {
+            'title': title,
+            'message': message,
+            'notice_type': request.POST.get('notice_type', 'general'),
+            'recipient_type': recipient_type,
+            'target_id': target_id,
+            'is_urgent': 'is_urgent' in request.POST,
+            'send_email': 'send_email' in request.POST,
+        }
+        if recipient_type in NOTICE_TARGET_FIELDS:
+            # One department or person: a single insert, so it is sent right away
+            try:
+                recipients, description = deliver_notice(request.user, **notice)
+            except (ObjectDoesNotExist, ValueError):
+                messages.error(request, '❌ The selected recipient no longer exists.')
+            else:
+                messages.success(request, f'✅ Notice sent to {description} ({recipients} recipient(s)).')
+        else:
+            # Whole-college notices bump every user's unread counter; leave that to the worker
+            job = enqueue('send_notice', created_by=request.user, **notice)
+            _job_queued_message(request, job, 'Notice')
+            messages.warning(request, '⚠️ The notice reaches users only once a run_jobs worker picks up the job.')
     
     return redirect('administration:dashboard')
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
+@read_from_replica
 def system_reports(request):
     """Generate various system reports"""
     report_type = request.GET.get('type', 'overview')
@@ -428,7 +280,7 @@ def system_reports(request):
     elif report_type == 'academic':
         # Academic performance report
         academic_data = []
-        for dept in Department.objects.all():
+        for dept in departments():
             dept_results = Result.objects.filter(
                 student__student_profile__department=dept,
                 is_published=True
@@ -449,8 +301,7 @@ def system_reports(request):
     return render(request, 'administration/reports.html', context)
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
 def manage_users(request):
     """Manage students and teachers with advanced filtering"""
     user_type = request.GET.get('type', 'all')
@@ -465,7 +316,7 @@ def manage_users(request):
         'department_filter': department_filter,
         'status_filter': status_filter,
         'sort_by': sort_by,
-        'departments': Department.objects.all().order_by('name')
+        'departments': departments()
     }
     
     # ALL USERS VIEW
@@ -578,8 +429,7 @@ def manage_users(request):
     return render(request, 'administration/manage_users.html', context)
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
 def department_details(request, dept_id):
     """Detailed view of a specific department"""
     
@@ -623,8 +473,7 @@ def department_details(request, dept_id):
     return render(request, 'administration/department_details.html', context)
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
 def quick_actions(request):
     """Handle quick administrative actions"""
     action = request.POST.get('action')
@@ -635,159 +484,151 @@ def quick_actions(request):
         title = request.POST.get('title')
         message = request.POST.get('message')
         
-        # Create notifications for selected users
-        for target_id in target_ids:
-            Notification.objects.create(
+        # Store the notification once, delivered to the selected students
+        if target_ids:
+            publish_notification(
                 title=title,
                 message=message,
-                target_audience='individual',
-                target_student_id=target_id,
-                created_by=request.user
+                created_by=request.user,
+                recipient_ids=Student.objects.filter(id__in=target_ids).values_list('user_id', flat=True)
             )
     
     elif action == 'generate_report':
-        # Generate and download reports
-        report_type = request.POST.get('report_type')
-        # Implementation for report generation
-        pass
+        # Write the export to REPORTS_DIR in the background; the job links to the file
+        report_type = request.POST.get('report_type', 'students')
+        format_type = request.POST.get('format', 'csv')
+        exporter = EXPORTERS.get(report_type)
+        if exporter is None or format_type not in WRITERS:
+            messages.error(request, f'Unsupported report: {report_type} as {format_type}')
+            return redirect('administration:dashboard')
+        
+        filters = {param: request.POST[param] for param in exporter.filters if request.POST.get(param)}
+        try:
+            exporter.parse_filters(filters)
+        except ValueError:
+            messages.error(request, 'Invalid report filter. Dates must be YYYY-MM-DD and ids must be numbers.')
+            return redirect('administration:dashboard')
+        
+        job = enqueue('generate_report', created_by=request.user,
+                      report_type=report_type, format_type=format_type, filters=filters)
+        _job_queued_message(request, job, 'Report')
     
     elif action == 'backup_data':
-        # Trigger data backup
-        # Implementation for data backup
-        pass
+        # Snapshot the database in the background
+        job = enqueue('backup_data', created_by=request.user)
+        _job_queued_message(request, job, 'Backup')
     
     return redirect('administration:dashboard')
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
 def export_data(request):
-    """Export various data to CSV/Excel formats"""
-    
+    """
+    Stream an export of students, teachers, fees, attendance or results.
+
+    `format` is csv, ndjson or xlsx; the remaining GET parameters are the exporter's
+    filters (department, semester, from_date/to_date, ...).
+    """
     export_type = request.GET.get('type', 'students')
     format_type = request.GET.get('format', 'csv')
     
-    if format_type == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{export_type}_{timezone.now().strftime("%Y%m%d")}.csv"'
-        
-        writer = csv.writer(response)
-        
-        if export_type == 'students':
-            writer.writerow(['Roll Number', 'Name', 'Department', 'Class', 'Admission Date', 'Status'])
-            
-            students = Student.objects.filter(is_active=True).select_related(
-                'user', 'department', 'student_class'
-            )
-            
-            for student in students:
-                writer.writerow([
-                    student.roll_number,
-                    student.user.get_full_name(),
-                    student.department.name,
-                    student.student_class.name if student.student_class else 'N/A',
-                    student.admission_date,
-                    'Active' if student.is_active else 'Inactive'
-                ])
-        
-        elif export_type == 'teachers':
-            writer.writerow(['Employee ID', 'Name', 'Department', 'Designation', 'Joining Date', 'Status'])
-            
-            teachers = Teacher.objects.filter(is_active=True).select_related(
-                'user', 'department'
-            )
-            
-            for teacher in teachers:
-                writer.writerow([
-                    teacher.employee_id,
-                    teacher.user.get_full_name(),
-                    teacher.department.name,
-                    teacher.designation,
-                    teacher.joining_date,
-                    'Active' if teacher.is_active else 'Inactive'
-                ])
-        
-        elif export_type == 'fees':
-            writer.writerow(['Student', 'Fee Type', 'Amount', 'Due Date', 'Status', 'Academic Year'])
-            
-            fees = Fee.objects.all().select_related('student')
-            
-            for fee in fees:
-                writer.writerow([
-                    fee.student.get_full_name(),
-                    fee.get_fee_type_display(),
-                    fee.amount,
-                    fee.due_date,
-                    fee.get_payment_status_display(),
-                    fee.academic_year
-                ])
-        
-        return response
+    exporter = EXPORTERS.get(export_type)
+    if exporter is None or format_type not in WRITERS:
+        messages.error(request, f'Unsupported export: {export_type} as {format_type}')
+        return redirect('administration:dashboard')
     
-    return redirect('administration:dashboard')
+    try:
+        lookups = exporter.parse_filters(request.GET)
+    except ValueError:
+        messages.error(request, 'Invalid export filter. Dates must be YYYY-MM-DD and ids must be numbers.')
+        return redirect('administration:dashboard')
+    
+    return stream_export(exporter, format_type, lookups, f'{export_type}_{timezone.now().strftime("%Y%m%d")}')
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
+@read_from_replica
 def attendance_overview(request):
     """Comprehensive attendance overview"""
     date_from = request.GET.get('from_date', (timezone.now() - timedelta(days=7)).strftime('%Y-%m-%d'))
     date_to = request.GET.get('to_date', timezone.now().strftime('%Y-%m-%d'))
     department_id = request.GET.get('department')
     
-    # Filter criteria
-    filters = {
-        'date__range': [date_from, date_to]
-    }
-    
-    if department_id:
-        filters['subject__class_assigned__department_id'] = department_id
-    
-    # Attendance statistics
-    attendance_records = Attendance.objects.filter(**filters)
+    # Attendance statistics from the daily rollup
+    rollups = daily_attendance_totals(date_from, date_to, department_id)
     
-    total_records = attendance_records.count()
-    present_records = attendance_records.filter(is_present=True).count()
+    totals = rollups.aggregate(
+        total=Sum('total_count'),
+        present=Sum('present_count')
+    )
+    total_records = totals['total'] or 0
+    present_records = totals['present'] or 0
     
     overall_percentage = 0
     if total_records > 0:
         overall_percentage = round((present_records / total_records) * 100, 2)
     
     # Class-wise attendance
-    class_attendance = attendance_records.values(
-        'subject__class_assigned__name',
-        'subject__class_assigned__department__name'
+    class_attendance = rollups.values(
+        'class_assigned__name',
+        'department__name'
     ).annotate(
-        total=Count('id'),
-        present=Count('id', filter=Q(is_present=True))
-    ).order_by('subject__class_assigned__name')
+        total=Sum('total_count'),
+        present=Sum('present_count')
+    ).order_by('class_assigned__name')
     
     # Subject-wise attendance
-    subject_attendance = attendance_records.values(
+    subject_attendance = rollups.values(
         'subject__course__name',
         'subject__course__code'
     ).annotate(
-        total=Count('id'),
-        present=Count('id', filter=Q(is_present=True))
+        total=Sum('total_count'),
+        present=Sum('present_count')
     ).order_by('subject__course__name')
     
     context = {
         'date_from': date_from,
         'date_to': date_to,
         'selected_department': department_id,
-        'departments': Department.objects.all(),
+        'departments': departments(),
         'overall_percentage': overall_percentage,
         'total_records': total_records,
         'present_records': present_records,
         'class_attendance': class_attendance,
-        'subject_attendance': subject_attendance
+        'subject_attendance': subject_attendance,
     }
     
     return render(request, 'administration/attendance_overview.html', context)
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
+def attendance_trend_api(request):
+    """API endpoint for the daily/weekly attendance trend series"""
+    department_id = request.GET.get('department')
+    granularity = request.GET.get('granularity', 'day')
+    
+    if granularity not in ('day', 'week'):
+        return JsonResponse({'error': 'granularity must be "day" or "week"'}, status=400)
+    
+    date_to = timezone.now().date()
+    date_from = date_to - timedelta(days=30)
+    try:
+        if request.GET.get('from_date'):
+            date_from = date.fromisoformat(request.GET['from_date'])
+        if request.GET.get('to_date'):
+            date_to = date.fromisoformat(request.GET['to_date'])
+    except ValueError:
+        return JsonResponse({'error': 'from_date and to_date must be YYYY-MM-DD'}, status=400)
+    if department_id and not department_id.isdigit():
+        return JsonResponse({'error': 'department must be a department id'}, status=400)
+    
+    return JsonResponse({
+        'granularity': granularity,
+        'series': attendance_trend(date_from, date_to, granularity, department_id),
+    })
+
+
+@role_required('admin')
 def financial_dashboard(request):
     """Financial overview and fee management"""
     current_year = timezone.now().year
@@ -803,20 +644,18 @@ def financial_dashboard(request):
         overdue_fees=Sum('amount', filter=Q(payment_status='overdue'))
     )
     
-    # Monthly collection data
-    monthly_collections = []
-    for month in range(1, 13):
-        month_data = Fee.objects.filter(
-            payment_date__year=current_year,
-            payment_date__month=month,
-            payment_status='paid'
-        ).aggregate(total=Sum('amount'))
-        
-        monthly_collections.append({
-            'month': month,
-            'month_name': timezone.datetime(current_year, month, 1).strftime('%B'),
-            'amount': month_data['total'] or 0
-        })
+    # Monthly collection data (from the daily fee-collection rollup)
+    monthly_collections = [
+        dict(row, month_name=date(current_year, row['month'], 1).strftime('%B'))
+        for row in monthly_fee_collections(
+            DailyFeeCollection.objects.filter(date__range=[date(current_year, 1, 1), date(current_year, 12, 31)])
+        )
+    ]
+    
+    # Payments received this academic year by fee type and by payment method
+    collections_by_type, collections_by_method = fee_collection_breakdown(
+        DailyFeeCollection.objects.filter(academic_year=academic_year)
+    )
     
     # Fee type breakdown
     fee_type_breakdown = Fee.objects.filter(
@@ -837,6 +676,8 @@ def financial_dashboard(request):
         'fee_stats': fee_stats,
         'monthly_collections': monthly_collections,
         'fee_type_breakdown': fee_type_breakdown,
+        'collections_by_type': collections_by_type,
+        'collections_by_method': collections_by_method,
         'defaulters': defaulters,
         'collection_percentage': round((fee_stats['collected_fees'] or 0) / (fee_stats['total_fees'] or 1) * 100, 2)
     }
@@ -844,8 +685,8 @@ def financial_dashboard(request):
     return render(request, 'administration/financial_dashboard.html', context)
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
+@read_from_replica
 def academic_performance(request):
     """Academic performance analytics"""
     semester = request.GET.get('semester')
@@ -903,7 +744,7 @@ def academic_performance(request):
     context = {
         'selected_semester': semester,
         'selected_department': department_id,
-        'departments': Department.objects.all(),
+        'departments': departments(),
         'semesters': range(1, 9),
         'performance_stats': performance_stats,
         'pass_percentage': pass_percentage,
@@ -915,8 +756,7 @@ def academic_performance(request):
     return render(request, 'administration/academic_performance.html', context)
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
 def add_student(request):
     """Add new student"""
     if request.method == 'POST':
@@ -980,8 +820,7 @@ def add_student(request):
     return redirect('administration:dashboard')
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
 def add_teacher(request):
     """Add new teacher"""
     if request.method == 'POST':
@@ -1049,8 +888,7 @@ def add_teacher(request):
     return redirect('administration:dashboard')
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
 def get_user_data(request, user_id):
     """Get user data for editing"""
     try:
@@ -1102,8 +940,7 @@ def get_user_data(request, user_id):
         return JsonResponse({'error': str(e)}, status=500)
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
 def edit_user(request):
     """Edit user profile"""
     if request.method == 'POST':
@@ -1173,8 +1010,7 @@ def edit_user(request):
 
 # ===== FINANCIAL MANAGEMENT VIEWS =====
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
 def fee_management(request):
     """Manage fees, set up fee structures, and track payments"""
     from academics.models import PaymentMethod, Transaction, FeeStructure
@@ -1215,10 +1051,7 @@ def fee_management(request):
     total_overdue_amount = overdue_fees.aggregate(total=Sum('amount'))['total'] or Decimal('0')
     
     # Payment methods
-    payment_methods = PaymentMethod.objects.filter(is_active=True)
-    
-    # Departments for bulk assignment
-    departments = Department.objects.all()
+    payment_methods = active_payment_methods()
     
     context = {
         'fees': fees[:100],  # Pagination
@@ -1229,13 +1062,12 @@ def fee_management(request):
         'payment_status': payment_status,
         'academic_year': academic_year,
         'student_search': student_search,
-        'departments': departments,
+        'departments': departments(),
     }
     return render(request, 'administration/fee_management.html', context)
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
 def manage_payment_methods(request):
     """Manage available payment methods for students"""
     from academics.models import PaymentMethod
@@ -1279,8 +1111,7 @@ def manage_payment_methods(request):
     return render(request, 'administration/payment_methods.html', context)
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
 def fee_structure_management(request):
     """Manage fee structures for courses and semesters"""
     from academics.models import FeeStructure
@@ -1329,8 +1160,7 @@ def fee_structure_management(request):
     return render(request, 'administration/fee_structure_management.html', context)
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
 def transaction_history(request):
     """View transaction history and payment records"""
     from academics.models import Transaction
@@ -1385,8 +1215,7 @@ def transaction_history(request):
     return render(request, 'administration/transaction_history.html', context)
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
 def student_fee_details(request, student_id):
     """View complete fee details for a specific student"""
     from accounts.models import User
@@ -1443,8 +1272,7 @@ def student_fee_details(request, student_id):
     return render(request, 'administration/student_fee_details.html', context)
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
 def process_payment(request):
     """Admin manual payment processing"""
     if request.method == 'POST':
@@ -1461,30 +1289,34 @@ def process_payment(request):
             fee = Fee.objects.get(id=fee_id)
             payment_method = PaymentMethod.objects.get(id=payment_method_id) if payment_method_id else None
             
-            # Create transaction
-            transaction_id = f"TXN-{uuid.uuid4().hex[:12].upper()}"
-            transaction = Transaction.objects.create(
-                fee=fee,
-                payment_method=payment_method,
-                amount=amount,
-                status='completed',
-                transaction_id=transaction_id,
-                reference_number=reference_number,
-                notes=notes,
-                processed_by=request.user,
-                completed_at=timezone.now()
-            )
-            
-            # Update fee status if full payment
-            if amount >= fee.amount:
-                fee.payment_status = 'paid'
-                fee.payment_date = timezone.now().date()
-                fee.transaction_id = transaction_id
-                fee.payment_method = payment_method.get_method_type_display() if payment_method else 'Manual'
-            elif amount > 0:
-                fee.payment_status = 'partial'
-            
-            fee.save()
+            with transaction.atomic():
+                # Create transaction
+                transaction_id = f"TXN-{uuid.uuid4().hex[:12].upper()}"
+                payment = Transaction.objects.create(
+                    fee=fee,
+                    payment_method=payment_method,
+                    amount=amount,
+                    status='completed',
+                    transaction_id=transaction_id,
+                    reference_number=reference_number,
+                    notes=notes,
+                    processed_by=request.user,
+                    completed_at=timezone.now()
+                )
+                
+                # Update fee status if full payment
+                if amount >= fee.amount:
+                    fee.payment_status = 'paid'
+                    fee.payment_date = timezone.now().date()
+                    fee.transaction_id = transaction_id
+                    fee.payment_method = payment_method.get_method_type_display() if payment_method else 'Manual'
+                elif amount > 0:
+                    fee.payment_status = 'partial'
+                
+                fee.save()
+                
+                # Add the payment to the daily collection rollup
+                record_fee_collection(payment)
             
             messages.success(request, f'✅ Payment of ₹{amount} processed successfully! Transaction ID: {transaction_id}')
         except Fee.DoesNotExist:
@@ -1497,64 +1329,43 @@ def process_payment(request):
     return redirect('administration:fee_management')
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
 def bulk_assign_fees(request):
     """Bulk assign fees to multiple students"""
     from academics.models import FeeStructure
-    from accounts.models import User
     
     if request.method == 'POST':
         student_ids = request.POST.getlist('student_ids')
-        fee_type = request.POST.get('fee_type')
-        amount = Decimal(request.POST.get('amount', 0))
-        due_date = request.POST.get('due_date')
-        academic_year = request.POST.get('academic_year')
-        semester = request.POST.get('semester')
         
         try:
-            students = User.objects.filter(id__in=student_ids, user_type='student')
-            
-            created_count = 0
-            for student_user in students:
-                fee = Fee.objects.create(
-                    student=student_user,
-                    fee_type=fee_type,
-                    amount=amount,
-                    due_date=due_date,
-                    academic_year=academic_year,
-                    semester=semester,
-                    payment_status='pending'
-                )
-                
-                # Create notification for student
-                Notification.objects.create(
-                    title=f"New Fee Assignment: {fee.get_fee_type_display()}",
-                    message=f"A new fee of ₹{amount} has been assigned to you for {academic_year}. Due date: {due_date}",
-                    notification_type='fee',
-                    target_audience='individual_student',
-                    target_student=student_user.student_profile,
-                    is_urgent=False,
-                    created_by=request.user
-                )
-                created_count += 1
-            
-            messages.success(request, f"✅ Fees assigned successfully to {created_count} students!")
-        except Exception as e:
-            messages.error(request, f"Error assigning fees: {str(e)}")
+            amount = Decimal(request.POST.get('amount', 0))
+        except ArithmeticError:
+            messages.error(request, "Error assigning fees: invalid amount")
+            return redirect('administration:fee_management')
+        
+        # Creating the fees and notifying every student runs in the job worker
+        job = enqueue(
+            'assign_fees',
+            created_by=request.user,
+            student_ids=[int(pk) for pk in student_ids if pk.isdigit()],
+            fee_type=request.POST.get('fee_type'),
+            amount=str(amount),
+            due_date=request.POST.get('due_date'),
+            academic_year=request.POST.get('academic_year'),
+            semester=request.POST.get('semester'),
+        )
+        _job_queued_message(request, job, f'Fee assignment for {len(student_ids)} students')
         
         return redirect('administration:fee_management')
     
     # GET request - return departments for the form
-    departments = Department.objects.all()
     context = {
-        'departments': departments,
+        'departments': departments(),
     }
     return render(request, 'administration/fee_management.html', context)
 
 
-@login_required
-@user_passes_test(is_admin_user)
+@role_required('admin')
 def search_students_api(request):
     """API endpoint for student search"""
     from accounts.models import User
@@ -1592,14 +1403,92 @@ def search_students_api(request):
     return JsonResponse({'results': data})
 
 
-@login_required
-@user_passes_test(is_admin_user)
+def _name_prefix_filter(terms):
+    """Every term must start the user's first or last name, so "jo sm" finds John Smith"""
+    condition = Q()
+    for term in terms:
+        condition &= Q(user__first_name__istartswith=term) | Q(user__last_name__istartswith=term)
+    return condition
+
+
+@role_required('admin')
+def search_recipients_api(request):
+    """
+    Typeahead search for notice recipients.
+
+    `q` is matched as a prefix of names, usernames, roll numbers and employee ids;
+    `type` limits results to students or teachers and `limit` caps each list.
+    Only the requested rows are read, so the response size does not follow headcount.
+    """
+    search_query = request.GET.get('q', '').strip()
+    recipient_type = request.GET.get('type', 'all')
+    try:
+        limit = min(max(int(request.GET.get('limit', RECIPIENT_SEARCH_LIMIT)), 1), RECIPIENT_SEARCH_MAX)
+    except ValueError:
+        limit = RECIPIENT_SEARCH_LIMIT
+
+    if len(search_query) < RECIPIENT_SEARCH_MIN_LENGTH:
+        return JsonResponse({'results': []})
+
+    terms = search_query.split()[:3]
+    results = []
+
+    if recipient_type in ('all', 'student'):
+        students = Student.objects.filter(is_active=True).filter(
+            _name_prefix_filter(terms) |
+            Q(user__username__istartswith=search_query) |
+            Q(roll_number__istartswith=search_query)
+        ).values(
+            'id', 'roll_number', 'user__first_name', 'user__last_name', 'department__code'
+        ).order_by('user__first_name', 'user__last_name')[:limit]
+        results += [
+            {
+                'type': 'student',
+                'id': s['id'],
+                'name': f"{s['user__first_name']} {s['user__last_name']}".strip(),
+                'code': s['roll_number'],
+                'department': s['department__code'],
+            }
+            for s in students
+        ]
+
+    if recipient_type in ('all', 'teacher'):
+        teachers = Teacher.objects.filter(is_active=True).filter(
+            _name_prefix_filter(terms) |
+            Q(user__username__istartswith=search_query) |
+            Q(employee_id__istartswith=search_query)
+        ).values(
+            'id', 'employee_id', 'user__first_name', 'user__last_name', 'department__code'
+        ).order_by('user__first_name', 'user__last_name')[:limit]
+        results += [
+            {
+                'type': 'teacher',
+                'id': t['id'],
+                'name': f"{t['user__first_name']} {t['user__last_name']}".strip(),
+                'code': t['employee_id'],
+                'department': t['department__code'],
+            }
+            for t in teachers
+        ]
+
+    return JsonResponse({'results': results})
+
+
+@role_required('admin')
+@read_from_replica
 def financial_reports(request):
     """Generate comprehensive financial reports"""
     report_type = request.GET.get('type', 'summary')
     academic_year = request.GET.get('academic_year', f"{timezone.now().year}-{timezone.now().year + 1}")
     export_format = request.GET.get('export', '')
     
+    # Export to CSV if requested (streamed, for every report type)
+    if export_format == 'csv':
+        return stream_csv(
+            f'financial_report_{report_type}_{timezone.now().strftime("%Y%m%d")}.csv',
+            financial_report_rows(report_type, academic_year, timezone.now().date())
+        )
+    
     # Base data
     fees = Fee.objects.filter(academic_year=academic_year)
     
@@ -1627,49 +1516,43 @@ def financial_reports(request):
             else:
                 item['collection_percentage'] = 0
         context['collection_by_type'] = fee_by_type
+        _, context['collection_by_method'] = fee_collection_breakdown(
+            DailyFeeCollection.objects.filter(academic_year=academic_year)
+        )
     
     elif report_type == 'defaulters':
         # Student defaulters list
         defaulter_fees = fees.filter(
             payment_status__in=['pending', 'overdue'],
             due_date__lt=timezone.now().date()
-        ).select_related('student').order_by('due_date')
+        ).select_related('student__student_profile').order_by('due_date')
         
         context['defaulters'] = defaulter_fees
     
     elif report_type == 'monthly':
-        # Monthly collection trend
-        monthly = []
-        for month in range(1, 13):
-            month_fees = fees.filter(
-                payment_date__month=month,
-                payment_status='paid'
-            ).aggregate(total=Sum('amount'))
-            monthly.append({
-                'month': month,
-                'amount': month_fees['total'] or 0
-            })
-        context['monthly_data'] = monthly
-    
-    # Export to CSV if requested
-    if export_format == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="financial_report_{report_type}_{timezone.now().strftime("%Y%m%d")}.csv"'
-        writer = csv.writer(response)
-        
-        if report_type == 'defaulters':
-            writer.writerow(['Student Name', 'Roll Number', 'Fee Type', 'Amount', 'Due Date', 'Days Overdue'])
-            for fee in context['defaulters']:
-                days_overdue = (timezone.now().date() - fee.due_date).days
-                writer.writerow([
-                    fee.student.get_full_name(),
-                    fee.student.student_profile.roll_number,
-                    fee.get_fee_type_display(),
-                    fee.amount,
-                    fee.due_date,
-                    days_overdue
-                ])
-        
-        return response
+        # Monthly collection trend (from the daily fee-collection rollup)
+        context['monthly_data'] = monthly_fee_collections(
+            DailyFeeCollection.objects.filter(academic_year=academic_year)
+        )
     
     return render(request, 'administration/financial_reports.html', context)
+
+
+@role_required('admin')
+def job_status_api(request, job_id):
+    """Polling endpoint for a background job's status and progress"""
+    job = get_object_or_404(BackgroundJob, id=job_id)
+    return JsonResponse(job_status(job))
+
+
+@role_required('admin')
+def job_download(request, job_id):
+    """Download the file written by a finished generate_report job"""
+    job = get_object_or_404(BackgroundJob, id=job_id, kind='generate_report', status='succeeded')
+    
+    reports_dir = Path(settings.REPORTS_DIR).resolve()
+    path = (reports_dir / (job.result or {}).get('file', '')).resolve()
+    if path.parent != reports_dir or not path.is_file():
+        raise Http404("Report file not found")
+    
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
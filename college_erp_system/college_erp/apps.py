@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class CollegeErpConfig(AppConfig):
+    """Project-wide wiring that belongs to no single app"""
+    name = 'college_erp'
+
+    def ready(self):
+        # PRAGMAs for every SQLite connection, periodic PRAGMA optimize
+        from .sqlite import connect_sqlite_profile
+        connect_sqlite_profile()
@@ -1,13 +1,16 @@
 """
 Context processors to make certain data available to all templates
 """
-from academics.models import Department
+from django.utils.functional import SimpleLazyObject
+
+from academics.reference import departments
 
 def global_context(request):
     """
     Add global context data available to all templates
     """
     context = {
-        'all_departments': Department.objects.all().order_by('name'),
+        # Lazy, so pages that never list departments skip even the version check
+        'all_departments': SimpleLazyObject(departments),
     }
     return context
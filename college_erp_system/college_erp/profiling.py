@@ -0,0 +1,214 @@
+"""
+SQL profiling per view.
+
+`QueryRecorder` hooks every configured database connection with an execute
+wrapper and records each statement's fingerprint and time. SQL literals, numbers
+and IN lists are normalised away, so the same query in a loop keeps one
+fingerprint, and a fingerprint executed more than SQL_PROFILING_NPLUSONE_THRESHOLD
+times in one request is flagged as a probable N+1.
+
+`SqlProfilingMiddleware` (enabled with SQL_PROFILING) profiles live requests in
+memory and rewrites its process's own report every SQL_PROFILING_FLUSH_EVERY
+requests and at exit. The report is SQL_PROFILING_REPORT with the pid before the
+extension (sql_profile.<pid>.json), so workers do not overwrite each other. The
+profile_sql command crawls views and writes the same report. Reports are sorted
+JSON so two releases can be compared with `profile_sql --compare` or a plain diff.
+"""
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SAVEPOINT = re.compile(r'"s\d+_x\d+"')
+_IN_LIST = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,)*\s*(?:%s|\?)\s*\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+# Statements Django issues around transactions; repeats of these are not N+1s
+_TRANSACTION_PREFIXES = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE SAVEPOINT', 'PRAGMA')
+
+
+def fingerprint(sql):
+    """The statement with literals, numbers and IN lists replaced by placeholders"""
+    sql = _SAVEPOINT.sub('"?"', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """Context manager recording the statements run on every connection while active"""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.fingerprints = Counter()
+        self.samples = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - started
+            self.count += 1
+            key = fingerprint(sql)
+            self.fingerprints[key] += 1
+            self.samples.setdefault(key, sql)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc):
+        self._stack.close()
+        return False
+
+    def repeated(self, threshold):
+        """Fingerprints run more than `threshold` times: probable N+1 queries"""
+        return {
+            key: count for key, count in self.fingerprints.items()
+            if count > threshold and not key.upper().startswith(_TRANSACTION_PREFIXES)
+        }
+
+
+class SqlProfile:
+    """Per-view totals of recorded requests"""
+
+    def __init__(self, threshold=None):
+        self.threshold = settings.SQL_PROFILING_NPLUSONE_THRESHOLD if threshold is None else threshold
+        self.views = {}
+        self._lock = threading.Lock()
+
+    def add(self, view, recorder):
+        with self._lock:
+            entry = self.views.setdefault(view, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'db_time_ms': 0.0,
+                'fingerprints': {}, 'n_plus_one': {},
+            })
+            entry['requests'] += 1
+            entry['queries'] += recorder.count
+            entry['max_queries'] = max(entry['max_queries'], recorder.count)
+            entry['db_time_ms'] += recorder.time * 1000
+            # Fingerprints keep their highest count in a single request
+            for key, count in recorder.fingerprints.items():
+                entry['fingerprints'][key] = max(entry['fingerprints'].get(key, 0), count)
+            for key, count in recorder.repeated(self.threshold).items():
+                flagged = entry['n_plus_one'].setdefault(key, {'count': 0, 'example': recorder.samples[key]})
+                flagged['count'] = max(flagged['count'], count)
+
+    def report(self):
+        with self._lock:
+            views = {}
+            for view, entry in sorted(self.views.items()):
+                views[view] = dict(
+                    entry,
+                    db_time_ms=round(entry['db_time_ms'], 2),
+                    avg_queries=round(entry['queries'] / entry['requests'], 2),
+                    n_plus_one=[
+                        {'fingerprint': key, **flagged}
+                        for key, flagged in sorted(entry['n_plus_one'].items(), key=lambda item: -item[1]['count'])
+                    ],
+                )
+        return {'generated_at': timezone.now().isoformat(), 'threshold': self.threshold, 'views': views}
+
+    def write(self, path):
+        """Write the report atomically, so readers never see half a file"""
+        partial = f'{path}.{os.getpid()}.{threading.get_ident()}.part'
+        with open(partial, 'w') as f:
+            json.dump(self.report(), f, indent=2, sort_keys=True)
+        os.replace(partial, path)
+
+
+def process_report_path(path):
+    """`path` with this process's id before the extension"""
+    root, ext = os.path.splitext(path)
+    return f'{root}.{os.getpid()}{ext}'
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+def compare_reports(old, new):
+    """Lines describing views whose query counts grew or that gained N+1 fingerprints"""
+    lines = []
+    old_views = old.get('views', {})
+    for view, entry in sorted(new.get('views', {}).items()):
+        before = old_views.get(view)
+        if before is None:
+            lines.append(f"{view}: new view, {entry['max_queries']} queries")
+            continue
+        if entry['max_queries'] > before['max_queries']:
+            lines.append(f"{view}: {before['max_queries']} -> {entry['max_queries']} queries")
+        known = {flagged['fingerprint'] for flagged in before.get('n_plus_one', [])}
+        for flagged in entry['n_plus_one']:
+            if flagged['fingerprint'] not in known:
+                lines.append(f"{view}: new N+1 ({flagged['count']}x) {flagged['fingerprint']}")
+    return lines
+
+
+class SqlProfilingMiddleware:
+    """Profile every request's queries when SQL_PROFILING is on; meant for development and staging"""
+
+    def __init__(self, get_response):
+        if not settings.SQL_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.profile = SqlProfile()
+        self.flush_every = max(settings.SQL_PROFILING_FLUSH_EVERY, 1)
+        self.path = process_report_path(settings.SQL_PROFILING_REPORT)
+        self._pending = 0
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with recorder:
+            response = self.get_response(request)
+        if getattr(response, 'streaming', False):
+            # Streamed bodies run their queries after the view returns
+            response.streaming_content = self._record_stream(request, recorder, response.streaming_content)
+        else:
+            self.record(request, recorder)
+        return response
+
+    def _record_stream(self, request, recorder, content):
+        try:
+            with recorder:
+                yield from content
+        finally:
+            self.record(request, recorder)
+
+    def record(self, request, recorder):
+        self.profile.add(view_name(request), recorder)
+        with self._lock:
+            self._pending += 1
+            due = self._pending >= self.flush_every
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write the report if requests were recorded since the last write"""
+        with self._lock:
+            if not self._pending:
+                return
+            self._pending = 0
+            self.profile.write(self.path)
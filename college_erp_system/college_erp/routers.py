@@ -0,0 +1,86 @@
+"""
+Read/write routing for the analytics pages.
+
+Code run under `use_replica()` reads from the `replica` database alias when one is
+configured (see SQLITE_REPLICA_PATH in settings) and from `default` otherwise.
+Writes and migrations always go to `default`.
+"""
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+from functools import wraps
+
+from django.db import connections
+
+REPLICA_ALIAS = 'replica'
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in connections.settings
+
+
+class use_replica(ContextDecorator):
+    """Send reads in this block (or decorated function) to the replica, if there is one"""
+
+    def __enter__(self):
+        self._token = _read_alias.set(REPLICA_ALIAS)
+        return self
+
+    def __exit__(self, *exc):
+        _read_alias.reset(self._token)
+        return False
+
+    def _recreate_cm(self):
+        # A fresh instance per decorated call, so concurrent requests don't share a token
+        return type(self)()
+
+
+def read_from_replica(view):
+    """
+    View decorator: run the view, and any streamed response body, under use_replica().
+
+    Streaming responses are consumed after the view returns, so their iterator is
+    wrapped to keep reading from the replica.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with use_replica():
+            response = view(request, *args, **kwargs)
+        if getattr(response, 'streaming', False):
+            response.streaming_content = _iterate_on_replica(response.streaming_content)
+        return response
+    return wrapper
+
+
+_DONE = object()
+
+
+def _iterate_on_replica(iterable):
+    iterator = iter(iterable)
+    while True:
+        with use_replica():
+            chunk = next(iterator, _DONE)
+        if chunk is _DONE:
+            return
+        yield chunk
+
+
+class ReplicaRouter:
+    """Route reads to the replica inside use_replica(); everything else to default"""
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias and replica_configured():
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of default, so objects from either may be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -43,6 +43,8 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
+    # Project-wide signal wiring (college_erp/apps.py)
+    'college_erp',
     'accounts',
     'students',
     'teachers',
@@ -51,13 +53,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Records per-view SQL when SQL_PROFILING is on; first, so it sees every query
+    'college_erp.profiling.SqlProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     # WhiteNoise middleware will serve static files in production
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # AuthenticationMiddleware with a per-process cache of the user row
+    'accounts.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -90,9 +95,103 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Reuse connections across requests; checked before reuse
+        'CONN_MAX_AGE': config('CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock at BEGIN so a transaction never fails upgrading a read lock
+            'transaction_mode': config('SQLITE_TRANSACTION_MODE', default='IMMEDIATE'),
+        },
+    }
+}
+
+# Optional read-only copy of the database (e.g. a restored backup) for the analytics
+# pages; without it they read from default
+SQLITE_REPLICA_PATH = config('SQLITE_REPLICA_PATH', default='')
+if SQLITE_REPLICA_PATH:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{SQLITE_REPLICA_PATH}?mode=ro',
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'CONN_HEALTH_CHECKS': True,
+        'READ_ONLY': True,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['college_erp.routers.ReplicaRouter']
+
+# PRAGMAs applied to every new SQLite connection (see college_erp/sqlite.py).
+# journal_mode is stored in the database file itself, so with DEBUG on it defaults
+# to 'delete' and the committed development db.sqlite3 is left as it is. Deployments
+# (DEBUG off) default to WAL; writes then sit in db.sqlite3-wal until a checkpoint
+# (`python manage.py optimize_db`).
+SQLITE_PRAGMAS = {
+    'journal_mode': config('SQLITE_JOURNAL_MODE', default='delete' if DEBUG else 'wal'),
+    'synchronous': config('SQLITE_SYNCHRONOUS', default='normal'),
+    'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int),  # milliseconds
+    'mmap_size': config('SQLITE_MMAP_SIZE', default=128 * 1024 * 1024, cast=int),  # bytes
+    'cache_size': config('SQLITE_CACHE_SIZE', default=-20000, cast=int),  # negative: KiB
+    'temp_store': config('SQLITE_TEMP_STORE', default='memory'),
+}
+
+# Seconds between PRAGMA optimize runs on a process's long-lived connection
+SQLITE_OPTIMIZE_INTERVAL = config('SQLITE_OPTIMIZE_INTERVAL', default=3600, cast=int)
+
+
+# Cache
+# LocMemCache is per process; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend so that invalidations reach every worker.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='college-erp'),
     }
 }
 
+# Upper bound, in seconds, on how long the admin dashboard statistics stay cached
+DASHBOARD_STATS_TTL = config('DASHBOARD_STATS_TTL', default=300, cast=int)
+
+# Seconds a get_dashboard_analytics payload is cached per (range, granularity)
+ANALYTICS_CACHE_TTL = config('ANALYTICS_CACHE_TTL', default=600, cast=int)
+
+# Seconds a worker keeps the departments, time slots and payment methods tables
+# (academics/reference.py). Edits reload them at once in the editing worker and,
+# with a shared CACHE_BACKEND, in every worker; with LocMemCache other workers
+# pick them up only after this long.
+REFERENCE_CACHE_TTL = config('REFERENCE_CACHE_TTL', default=300, cast=int)
+
+# Seconds a class or teacher timetable grid stays cached. Edits invalidate grids
+# through a version key in the default cache, which only reaches every worker when
+# that cache is shared; with LocMemCache this is how long other workers can show
+# an old timetable, so raise it only with a shared CACHE_BACKEND.
+TIMETABLE_CACHE_TTL = config('TIMETABLE_CACHE_TTL', default=300, cast=int)
+
+# Sessions: 'db', 'cached_db' (database behind SESSION_CACHE_ALIAS; like CACHES it
+# needs a shared backend with several worker processes) or 'signed_cookies' (no
+# server-side storage, so a stolen cookie cannot be revoked before it expires)
+SESSION_MODE = config('SESSION_MODE', default='db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_MODE]
+SESSION_CACHE_ALIAS = config('SESSION_CACHE_ALIAS', default='default')
+
+# Seconds each worker reuses an authenticated user row; 0 (the default) disables
+# it. While an entry lives, a password change or deactivation made through another
+# worker does not end the session in this one, so opt in only if that is acceptable.
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=0, cast=int)
+
+# SQL profiling (development/staging): per-view query counts, DB time and query
+# fingerprints written to SQL_PROFILING_REPORT (by profile_sql; the middleware
+# writes one file per process, sql_profile.<pid>.json, every
+# SQL_PROFILING_FLUSH_EVERY requests and at exit); a fingerprint run more than
+# SQL_PROFILING_NPLUSONE_THRESHOLD times in one request is flagged as an N+1
+SQL_PROFILING = config('SQL_PROFILING', default=False, cast=bool)
+SQL_PROFILING_NPLUSONE_THRESHOLD = config('SQL_PROFILING_NPLUSONE_THRESHOLD', default=5, cast=int)
+SQL_PROFILING_REPORT = config('SQL_PROFILING_REPORT', default=str(BASE_DIR / 'sql_profile.json'))
+SQL_PROFILING_FLUSH_EVERY = config('SQL_PROFILING_FLUSH_EVERY', default=50, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -141,6 +240,16 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Files written by background jobs (generated reports, database backups). Both
+# hold personal data: keep them outside MEDIA_ROOT, which is served without
+# permission checks; reports are downloaded through job_download instead.
+REPORTS_DIR = config('REPORTS_DIR', default=str(BASE_DIR / 'reports'))
+BACKUP_DIR = config('BACKUP_DIR', default=str(BASE_DIR / 'backups'))
+
+# Online database backups: archives kept in BACKUP_DIR, pages copied per backup step
+BACKUP_KEEP = config('BACKUP_KEEP', default=14, cast=int)
+BACKUP_PAGES_PER_STEP = config('BACKUP_PAGES_PER_STEP', default=1024, cast=int)
+
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
 
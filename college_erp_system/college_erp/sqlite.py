@@ -0,0 +1,60 @@
+"""
+SQLite connection profile.
+
+Every new SQLite connection gets the PRAGMAs in settings.SQLITE_PRAGMAS (WAL,
+synchronous=NORMAL, a busy timeout, mmap and page cache sizes, in-memory temp
+tables). Long-lived connections (CONN_MAX_AGE) also run PRAGMA optimize every
+SQLITE_OPTIMIZE_INTERVAL seconds so the query planner statistics stay current.
+"""
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connection as default_connection
+from django.db.backends.signals import connection_created
+
+_last_optimize = time.monotonic()
+
+
+def pragma_statements(pragmas):
+    """`PRAGMA name = value` statements for a {name: value} profile"""
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+def apply_sqlite_profile(sender, connection, **kwargs):
+    """connection_created receiver: configure a fresh SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = dict(settings.SQLITE_PRAGMAS)
+    if connection.settings_dict.get('READ_ONLY'):
+        # The journal mode belongs to the database file; a read-only replica must not change it
+        pragmas.pop('journal_mode', None)
+        pragmas['query_only'] = 1
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(pragmas):
+            cursor.execute(statement)
+
+
+def optimize_database(connection=default_connection):
+    """Let SQLite refresh the statistics of tables whose queries would benefit"""
+    global _last_optimize
+    _last_optimize = time.monotonic()
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA optimize')
+
+
+def optimize_if_due(**kwargs):
+    """Run PRAGMA optimize on this process's open connection once the interval has passed"""
+    if time.monotonic() - _last_optimize < settings.SQLITE_OPTIMIZE_INTERVAL:
+        return False
+    # Only reuse a connection that is already open and not in the middle of a transaction
+    if (default_connection.vendor != 'sqlite' or default_connection.connection is None
+            or default_connection.in_atomic_block):
+        return False
+    optimize_database(default_connection)
+    return True
+
+
+def connect_sqlite_profile():
+    connection_created.connect(apply_sqlite_profile, dispatch_uid='college_erp.sqlite.profile')
+    request_finished.connect(optimize_if_due, dispatch_uid='college_erp.sqlite.optimize')
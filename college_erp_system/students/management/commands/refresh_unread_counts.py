@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from students.notices import refresh_expired_counts
+
+
+class Command(BaseCommand):
+    help = "Recount the unread badge of students whose notifications expired recently; run it from cron"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=24,
+            help='Recount for notifications that expired in the last HOURS hours (default %(default)s)'
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options['hours'])
+        recounted = refresh_expired_counts(since)
+        self.stdout.write(self.style.SUCCESS(f'Recounted unread notifications for {recounted} student(s)'))
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0008_dailyattendancerollup'),
+        ('students', '0002_notification_send_email_notification_target_teacher_and_more'),
+        ('teachers', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='coalesce_key',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('coalesce_key', ''), _negated=True), fields=('coalesce_key',), name='unique_notification_coalesce_key'),
+        ),
+    ]
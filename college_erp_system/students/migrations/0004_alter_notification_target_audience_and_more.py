@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0003_notification_coalesce_key_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='target_audience',
+            field=models.CharField(choices=[('all', 'All'), ('all_students', 'All Students'), ('all_teachers', 'All Teachers'), ('class', 'Specific Class'), ('department', 'Specific Department'), ('individual_student', 'Individual Student'), ('individual_teacher', 'Individual Teacher'), ('recipients', 'Selected Recipients')], default='all', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='NotificationRecipient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipients', to='students.notification')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='received_notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('notification', 'user')},
+            },
+        ),
+    ]
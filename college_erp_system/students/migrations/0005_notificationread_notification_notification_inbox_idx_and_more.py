@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0008_dailyattendancerollup'),
+        ('students', '0004_alter_notification_target_audience_and_more'),
+        ('teachers', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationRead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['-created_at', '-id'], name='notification_inbox_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificationread',
+            name='notification',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reads', to='students.notification'),
+        ),
+        migrations.AddField(
+            model_name='notificationread',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_notifications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='notificationread',
+            unique_together={('user', 'notification')},
+        ),
+    ]
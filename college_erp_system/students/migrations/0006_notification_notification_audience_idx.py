@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0009_attendance_attendance_marker_date_idx_and_more'),
+        ('students', '0005_notificationread_notification_notification_inbox_idx_and_more'),
+        ('teachers', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['target_audience', 'created_at'], name='notification_audience_idx'),
+        ),
+    ]
@@ -59,6 +59,7 @@ class Notification(models.Model):
             ('department', 'Specific Department'),
             ('individual_student', 'Individual Student'),
             ('individual_teacher', 'Individual Teacher'),
+            ('recipients', 'Selected Recipients'),
         ],
         default='all'
     )
@@ -95,11 +96,57 @@ class Notification(models.Model):
         on_delete=models.CASCADE,
         related_name='created_notifications'
     )
+    # Set for system notifications that later events update in place instead of duplicating
+    # (e.g. "attendance:<subject id>:<date>"); blank for ordinary notices
+    coalesce_key = models.CharField(max_length=100, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='notification_inbox_idx'),
+            # Audience-filtered feeds (teacher dashboard, department pages), newest first
+            models.Index(fields=['target_audience', 'created_at'], name='notification_audience_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['coalesce_key'],
+                condition=~models.Q(coalesce_key=''),
+                name='unique_notification_coalesce_key',
+            ),
+        ]
     
     def __str__(self):
         return self.title
+
+class NotificationRecipient(models.Model):
+    """One row per user for notifications addressed to an explicit list of people (target_audience='recipients')"""
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='recipients')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='received_notifications'
+    )
+    
+    class Meta:
+        unique_together = ['notification', 'user']
+    
+    def __str__(self):
+        return f"{self.notification.title} -> {self.user.username}"
+
+class NotificationRead(models.Model):
+    """Marks a notification as read by a user"""
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='reads')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='read_notifications'
+    )
+    read_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['user', 'notification']
+    
+    def __str__(self):
+        return f"{self.user.username} read {self.notification.title}"
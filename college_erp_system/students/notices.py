@@ -0,0 +1,238 @@
+"""
+Publishing notifications and reading the student inbox.
+
+Every notice is stored once and addressed to an audience; read state lives in
+NotificationRead and the unread count is kept on the user row: bumped when a
+notice is published, recounted by mark_read, and recounted for the students of
+expired notices by the refresh_unread_counts command.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q, F, Exists, OuterRef
+from django.utils import timezone
+
+from accounts.middleware import clear_user_cache
+from teachers.models import Teacher
+from .models import Student, Notification, NotificationRecipient, NotificationRead
+
+INBOX_PAGE_SIZE = 20
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+@transaction.atomic
+def publish_notification(*, title, message, created_by, notification_type='general', target_audience='all',
+                         target_class=None, target_department=None, target_student=None, target_teacher=None,
+                         recipient_ids=None, is_urgent=False, send_email=False, chunk_size=1000):
+    """
+    Create a single Notification for an audience and return `(notification, recipient_count)`.
+
+    Audience notices ('all', 'all_students', 'class', 'department', individual targets) are
+    matched to readers at read time. Passing `recipient_ids` (user ids) addresses the notice to
+    that explicit list instead; one NotificationRecipient row per user is written with
+    `bulk_create` in chunks of `chunk_size`.
+    """
+    if recipient_ids is not None:
+        target_audience = 'recipients'
+
+    notification = Notification.objects.create(
+        title=title,
+        message=message,
+        notification_type=notification_type,
+        target_audience=target_audience,
+        target_class=target_class,
+        target_department=target_department,
+        target_student=target_student,
+        target_teacher=target_teacher,
+        is_urgent=is_urgent,
+        send_email=send_email,
+        created_by=created_by
+    )
+
+    if recipient_ids is None:
+        count_as_unread(notification)
+        return notification, audience_size(notification)
+
+    delivered = 0
+    batch = []
+    for user_id in dict.fromkeys(recipient_ids):
+        batch.append(NotificationRecipient(notification=notification, user_id=user_id))
+        if len(batch) >= chunk_size:
+            NotificationRecipient.objects.bulk_create(batch, ignore_conflicts=True)
+            delivered += len(batch)
+            batch = []
+    if batch:
+        NotificationRecipient.objects.bulk_create(batch, ignore_conflicts=True)
+        delivered += len(batch)
+
+    count_as_unread(notification)
+    return notification, delivered
+
+
+def addressed_students(notification):
+    """Active students a notification is addressed to"""
+    students = Student.objects.filter(is_active=True)
+    audience = notification.target_audience
+
+    if audience in ('all', 'all_students'):
+        return students
+    if audience == 'class':
+        return students.filter(student_class=notification.target_class_id)
+    if audience == 'department':
+        return students.filter(department=notification.target_department_id)
+    if audience == 'individual_student':
+        return students.filter(id=notification.target_student_id)
+    if audience == 'recipients':
+        return students.filter(user__in=notification.recipients.values('user_id'))
+    return students.none()
+
+
+def addressed_teachers(notification):
+    """Active teachers a notification is addressed to"""
+    teachers = Teacher.objects.filter(is_active=True)
+    audience = notification.target_audience
+
+    if audience in ('all', 'all_teachers'):
+        return teachers
+    if audience == 'department':
+        return teachers.filter(department=notification.target_department_id)
+    if audience == 'individual_teacher':
+        return teachers.filter(id=notification.target_teacher_id)
+    if audience == 'recipients':
+        return teachers.filter(user__in=notification.recipients.values('user_id'))
+    return teachers.none()
+
+
+def audience_size(notification):
+    """Number of active people a notification is addressed to"""
+    if notification.target_audience == 'recipients':
+        return notification.recipients.count()
+    return addressed_students(notification).count() + addressed_teachers(notification).count()
+
+
+def count_as_unread(notification):
+    """Bump the unread counter of every student the notification reaches, in one UPDATE"""
+    get_user_model().objects.filter(
+        id__in=addressed_students(notification).values('user_id')
+    ).update(unread_notifications=F('unread_notifications') + 1)
+    # .update() sends no signal, so drop this process's cached user rows by hand; again on
+    # commit, in case a request re-cached a row before the new counts were visible
+    clear_user_cache()
+    transaction.on_commit(clear_user_cache)
+
+
+def student_notifications(student, now=None):
+    """Unexpired notifications visible to a student"""
+    now = now or timezone.now()
+    return Notification.objects.filter(
+        Q(target_audience='all') |
+        Q(target_audience='all_students') |
+        Q(target_audience='class', target_class=student.student_class) |
+        Q(target_audience='department', target_department=student.department) |
+        Q(target_audience='individual_student', target_student=student) |
+        Q(id__in=NotificationRecipient.objects.filter(user=student.user_id).values('notification_id'))
+    ).filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=now)
+    )
+
+
+def teacher_notifications(teacher_user, now=None):
+    """
+    Unexpired notifications visible to a teacher.
+
+    Department and individual targets are matched through the teacher profile in
+    subqueries, so the profile does not have to be loaded first.
+    """
+    now = now or timezone.now()
+    profile = Teacher.objects.filter(user=teacher_user)
+    return Notification.objects.filter(
+        Q(target_audience='all') |
+        Q(target_audience='all_teachers') |
+        Q(target_audience='department', target_department__in=profile.values('department_id')) |
+        Q(target_audience='individual_teacher', target_teacher__in=profile.values('id')) |
+        Q(id__in=NotificationRecipient.objects.filter(user=teacher_user).values('notification_id'))
+    ).filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=now)
+    )
+
+
+def encode_cursor(notification):
+    """Opaque `<created_at microseconds>.<id>` position after which the next page starts"""
+    micros = (notification.created_at - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}.{notification.id}"
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; returns None for a missing or malformed cursor"""
+    try:
+        micros, pk = cursor.split('.')
+        return _EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def inbox_page(student, cursor=None, page_size=INBOX_PAGE_SIZE):
+    """
+    One page of a student's inbox, newest first, and the cursor for the following page.
+
+    Pages are addressed by their (created_at, id) position rather than an offset, so
+    fetching an old page costs the same as fetching the first one.
+    """
+    notifications = student_notifications(student).annotate(
+        is_read=Exists(NotificationRead.objects.filter(notification=OuterRef('pk'), user=student.user_id))
+    ).order_by('-created_at', '-id')
+
+    position = decode_cursor(cursor)
+    if position:
+        created_at, pk = position
+        notifications = notifications.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+
+    page = list(notifications[:page_size + 1])
+    next_cursor = encode_cursor(page[page_size - 1]) if len(page) > page_size else None
+    return page[:page_size], next_cursor
+
+
+def refresh_unread_count(student, user):
+    """Recount a student's unread, unexpired notifications and store it on the user row"""
+    unread = student_notifications(student).exclude(
+        id__in=NotificationRead.objects.filter(user=user).values('notification_id')
+    ).count()
+    # Compare against the stored row, not `user`, which may be a cached copy
+    if get_user_model().objects.filter(pk=user.pk).exclude(unread_notifications=unread).update(
+            unread_notifications=unread):
+        clear_user_cache(instance=user)
+    user.unread_notifications = unread
+    return unread
+
+
+def refresh_expired_counts(since, now=None):
+    """Recount the students who had not read a notification that expired after `since`; returns how many"""
+    now = now or timezone.now()
+    user_ids = set()
+    for notification in Notification.objects.filter(expires_at__gt=since, expires_at__lte=now):
+        user_ids.update(addressed_students(notification).exclude(
+            user__in=NotificationRead.objects.filter(notification=notification).values('user_id')
+        ).values_list('user_id', flat=True))
+
+    for student in Student.objects.filter(user__in=user_ids).select_related('user').iterator():
+        refresh_unread_count(student, student.user)
+    return len(user_ids)
+
+
+def mark_read(student, user, notification_ids=None):
+    """Mark the given notifications (all visible ones by default) as read and refresh the counter"""
+    visible = student_notifications(student).exclude(
+        id__in=NotificationRead.objects.filter(user=user).values('notification_id')
+    )
+    if notification_ids is not None:
+        visible = visible.filter(id__in=notification_ids)
+
+    NotificationRead.objects.bulk_create(
+        [NotificationRead(notification_id=pk, user=user) for pk in visible.values_list('id', flat=True)],
+        ignore_conflicts=True
+    )
+    return refresh_unread_count(student, user)
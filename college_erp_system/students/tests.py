@@ -1,3 +1,189 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from academics.models import Department, Class
+from accounts.models import User
+from tests_utils import create_student
+from .models import Notification, NotificationRecipient
+from .notices import (
+    INBOX_PAGE_SIZE, publish_notification, audience_size, mark_read, inbox_page, encode_cursor, decode_cursor
+)
+
+
+class UnreadCounterTests(TestCase):
+    """Unread badge kept on the user row"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Computer Engineering', code='CE')
+        student_class = Class.objects.create(name='CE-3', department=department, semester=3, section='A',
+                                             academic_year='2025-2026')
+        cls.user = User.objects.create_user('student1', user_type='student')
+        cls.student = create_student(cls.user, student_class, 'CE001', 'ADM001')
+        cls.admin = User.objects.create_user('admin1', user_type='admin')
+
+    def unread(self):
+        return User.objects.get(pk=self.user.pk).unread_notifications
+
+    def test_inbox_page_does_not_recount(self):
+        publish_notification(title='Exam', message='Starts Monday', created_by=self.admin,
+                             target_audience='all_students')
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('students:notifications'))
+        self.assertEqual(response.context['unread_count'], 1)
+        self.assertFalse([query['sql'] for query in queries if 'COUNT(' in query['sql']])
+
+        self.client.post(reverse('students:mark_notifications_read'))
+        self.assertEqual(self.unread(), 0)
+
+    def test_expired_notifications_leave_the_badge(self):
+        read, unread = [
+            publish_notification(title=title, message='Starts Monday', created_by=self.admin,
+                                 target_audience='all_students')[0]
+            for title in ('Read', 'Unread')
+        ]
+        mark_read(self.student, self.user, [read.pk])
+        publish_notification(title='Current', message='Starts Monday', created_by=self.admin,
+                             target_audience='all_students')
+        self.assertEqual(self.unread(), 2)
+
+        Notification.objects.filter(pk__in=[read.pk, unread.pk]).update(
+            expires_at=timezone.now() - timedelta(hours=1)
+        )
+        out = StringIO()
+        call_command('refresh_unread_counts', stdout=out)
+        self.assertIn('for 1 student(s)', out.getvalue())
+        self.assertEqual(self.unread(), 1)
+
+
+class PublishNotificationTests(TestCase):
+    """One Notification per notice, addressed to an audience or an explicit recipient list"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Computer Engineering', code='CE')
+        classes = [
+            Class.objects.create(name=f'CE-{section}', department=department, semester=3, section=section,
+                                 academic_year='2025-2026')
+            for section in 'AB'
+        ]
+        cls.users = [User.objects.create_user(f'student{n}', user_type='student') for n in range(4)]
+        cls.students = [
+            create_student(user, classes[n // 2], f'CE{n:03d}', f'ADM{n:03d}') for n, user in enumerate(cls.users)
+        ]
+        cls.class_a = classes[0]
+        cls.admin = User.objects.create_user('admin1', user_type='admin', is_staff=True)
+
+    def unread(self):
+        return list(User.objects.filter(pk__in=[user.pk for user in self.users]).order_by('username')
+                    .values_list('unread_notifications', flat=True))
+
+    def inserts(self, queries):
+        return [query for query in queries
+                if query['sql'].startswith('INSERT') and 'INTO "students_notificationrecipient"' in query['sql']]
+
+    def test_audience_notice_is_one_row_without_recipients(self):
+        notification, count = publish_notification(title='Holiday', message='-', created_by=self.admin)
+        self.assertEqual((Notification.objects.count(), NotificationRecipient.objects.count()), (1, 0))
+        self.assertEqual(count, 4)
+        self.assertEqual(audience_size(notification), 4)
+        self.assertEqual(self.unread(), [1, 1, 1, 1])
+
+    def test_unread_counter_bumps_only_addressed_students(self):
+        publish_notification(title='Lab', message='-', created_by=self.admin, target_audience='class',
+                             target_class=self.class_a)
+        self.assertEqual(self.unread(), [1, 1, 0, 0])
+
+    def test_recipients_are_deduplicated_and_written_in_chunks(self):
+        ids = [user.pk for user in self.users[:3]]
+        with CaptureQueriesContext(connection) as queries:
+            notification, delivered = publish_notification(
+                title='Fees', message='-', created_by=self.admin, recipient_ids=ids + ids[:2], chunk_size=2
+            )
+        self.assertEqual(notification.target_audience, 'recipients')
+        self.assertEqual(delivered, 3)
+        self.assertEqual(len(self.inserts(queries)), 2)
+        self.assertEqual(sorted(notification.recipients.values_list('user_id', flat=True)), ids)
+        self.assertEqual(audience_size(notification), 3)
+        self.assertEqual(self.unread(), [1, 1, 1, 0])
+
+        # Exactly chunk_size recipients take a single INSERT
+        with CaptureQueriesContext(connection) as queries:
+            publish_notification(title='Fees', message='-', created_by=self.admin, recipient_ids=ids, chunk_size=3)
+        self.assertEqual(len(self.inserts(queries)), 1)
+
+    def test_quick_action_bulk_notification(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('administration:quick_actions'), {
+            'action': 'bulk_notification', 'title': 'Meeting', 'message': '-',
+            'target_ids[]': [self.students[1].pk, self.students[3].pk],
+        })
+        self.assertRedirects(response, reverse('administration:dashboard'), fetch_redirect_response=False)
+        notification = Notification.objects.get()
+        self.assertEqual((notification.title, notification.target_audience), ('Meeting', 'recipients'))
+        self.assertEqual(sorted(notification.recipients.values_list('user_id', flat=True)),
+                         [self.users[1].pk, self.users[3].pk])
+        self.assertEqual(self.unread(), [0, 1, 0, 1])
+
+
+class InboxPageTests(TestCase):
+    """Keyset pagination of the student inbox"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Computer Engineering', code='CE')
+        student_class = Class.objects.create(name='CE-3', department=department, semester=3, section='A',
+                                             academic_year='2025-2026')
+        cls.student = create_student(User.objects.create_user('student1', user_type='student'),
+                                     student_class, 'CE001', 'ADM001')
+        admin = User.objects.create_user('admin1', user_type='admin')
+        start = timezone.now() - timedelta(days=1)
+        for n in range(INBOX_PAGE_SIZE * 2 + 5):
+            notice = Notification.objects.create(title=f'Notice {n}', message='-', created_by=admin,
+                                                 target_audience='all_students')
+            # Pairs of notices share a timestamp, so ties fall back to the id
+            Notification.objects.filter(pk=notice.pk).update(created_at=start + timedelta(minutes=n // 2))
+        cls.newest_first = list(
+            Notification.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+    def test_pages_follow_created_at_then_id(self):
+        seen, cursor, pages = [], None, 0
+        while True:
+            page, cursor = inbox_page(self.student, cursor)
+            seen += [notification.id for notification in page]
+            pages += 1
+            if cursor is None:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, self.newest_first)
+
+    def test_cursor_round_trips_and_malformed_ones_restart(self):
+        first, cursor = inbox_page(self.student)
+        last = first[-1]
+        self.assertEqual(cursor, encode_cursor(last))
+        self.assertEqual(decode_cursor(cursor), (last.created_at, last.id))
+
+        for malformed in ('', 'abc', '1.2.3', 'x.1', None):
+            self.assertIsNone(decode_cursor(malformed))
+            page, _ = inbox_page(self.student, malformed)
+            self.assertEqual([n.id for n in page], [n.id for n in first])
 
-# Create your tests here.
+    def test_deep_page_costs_the_same_as_the_first(self):
+        _, cursor = inbox_page(self.student)
+        _, cursor = inbox_page(self.student, cursor)
+        with self.assertNumQueries(1):
+            first, _ = inbox_page(self.student)
+        with self.assertNumQueries(1):
+            last, next_cursor = inbox_page(self.student, cursor)
+        self.assertEqual(len(first), INBOX_PAGE_SIZE)
+        self.assertEqual([n.id for n in last], self.newest_first[-5:])
+        self.assertIsNone(next_cursor)
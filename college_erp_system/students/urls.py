@@ -13,5 +13,6 @@ urlpatterns = [
     path('fees/<int:fee_id>/receipt/', views.fee_receipt, name='fee_receipt'),
     path('fees/<int:fee_id>/download/', views.download_fee_receipt, name='download_fee_receipt'),
     path('notifications/', views.notifications, name='notifications'),
+    path('notifications/read/', views.mark_notifications_read, name='mark_notifications_read'),
     path('academic-calendar/', views.academic_calendar, name='academic_calendar'),
 ]
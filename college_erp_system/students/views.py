@@ -1,33 +1,33 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Avg, F
-from django.db import models
+from django.db.models import Q, Avg, F, Sum
+from django.db import models, transaction
 from django.utils import timezone
 from datetime import datetime, timedelta
 from decimal import Decimal
 
 from academics.models import (
-    Timetable, Attendance, Exam, Result, Fee, Subject, Course, AcademicCalendar
+    Attendance, AttendanceSummary, Exam, Result, Fee, Subject, Course, AcademicCalendar
 )
+from academics.reference import active_payment_methods
+from academics.rollups import record_fee_collection
+from academics.timetables import class_timetable_grid
+from accounts.decorators import role_required
 from .models import Student, Notification
+from .notices import student_notifications, inbox_page, mark_read
 
-@login_required
+@role_required('student')
 def dashboard(request):
     """Student dashboard with overview"""
-    if not request.user.is_student:
-        messages.error(request, "You don't have permission to access this page.")
-        return redirect('accounts:login')
+    student = request.profile
     
-    try:
-        student = request.user.student_profile
-    except Student.DoesNotExist:
-        messages.error(request, "Student profile not found. Please contact administrator.")
-        return redirect('accounts:login')
-    
-    # Get recent attendance percentage
-    total_attendance = Attendance.objects.filter(student=request.user).count()
-    present_attendance = Attendance.objects.filter(student=request.user, is_present=True).count()
+    # Get overall attendance percentage from the per-subject summary
+    attendance_totals = AttendanceSummary.objects.filter(student=request.user).aggregate(
+        present=Sum('present_count'),
+        total=Sum('total_count')
+    )
+    total_attendance = attendance_totals['total'] or 0
+    present_attendance = attendance_totals['present'] or 0
     attendance_percentage = (present_attendance / total_attendance * 100) if total_attendance > 0 else 0
     
     # Get upcoming exams
@@ -43,13 +43,7 @@ def dashboard(request):
     ).order_by('due_date')
     
     # Get recent notifications
-    recent_notifications = Notification.objects.filter(
-        Q(target_audience='all') |
-        Q(target_audience='all_students') |
-        Q(target_audience='class', target_class=student.student_class) |
-        Q(target_audience='department', target_department=student.department) |
-        Q(target_audience='individual_student', target_student=student)
-    ).order_by('-created_at')[:5]
+    recent_notifications = student_notifications(student).order_by('-created_at')[:5]
     
     context = {
         'student': student,
@@ -60,46 +54,28 @@ def dashboard(request):
     }
     return render(request, 'students/dashboard.html', context)
 
-@login_required
+@role_required('student')
 def timetable(request):
     """Display student's class timetable"""
-    if not request.user.is_student:
-        messages.error(request, "Access denied.")
-        return redirect('accounts:login')
-    
-    student = request.user.student_profile
+    student = request.profile
     if not student.student_class:
         messages.warning(request, "You are not assigned to any class. Please contact administrator.")
         return render(request, 'students/timetable.html')
     
-    timetable = Timetable.objects.filter(
-        class_assigned=student.student_class
-    ).select_related('subject__course', 'time_slot').order_by(
-        'time_slot__day', 'time_slot__start_time'
-    )
-    
-    # Organize timetable by day
-    days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday']
-    organized_timetable = {}
-    
-    for day in days:
-        organized_timetable[day] = timetable.filter(time_slot__day=day)
+    # Day x slot grid, built in one query and cached until the timetable changes
+    grid = class_timetable_grid(student.student_class_id)
     
     context = {
         'student': student,
-        'organized_timetable': organized_timetable,
-        'days': days,
+        'grid': grid,
+        'days': grid['days'],
     }
     return render(request, 'students/timetable.html', context)
 
-@login_required
+@role_required('student')
 def attendance(request):
     """Display student's attendance records"""
-    if not request.user.is_student:
-        messages.error(request, "Access denied.")
-        return redirect('accounts:login')
-    
-    student = request.user.student_profile
+    student = request.profile
     
     # Get current semester from student's class
     current_semester = student.student_class.semester if student.student_class else None
@@ -117,30 +93,32 @@ def attendance(request):
     # Get all semesters
     semesters = Course.SEMESTER_CHOICES
     
-    # Get all attendance records for the logged-in student (for semester-wise breakdown)
-    all_attendance_records = Attendance.objects.filter(
+    # Attendance records for the logged-in student, used only for the recent records list
+    attendance_records = Attendance.objects.filter(
         student=request.user
     ).select_related('subject__course', 'subject__course__department', 'subject', 'marked_by').order_by('-date')
-
-    # Get filtered attendance records based on selected semester
-    attendance_records = all_attendance_records
     if selected_semester:
         attendance_records = attendance_records.filter(subject__course__semester=selected_semester)
 
-    # Subjects assigned to the student's class, filtered by selected semester
-    subjects = Subject.objects.filter(class_assigned=student.student_class).select_related('course', 'course__department')
-    
-    if selected_semester:
-        subjects = subjects.filter(course__semester=selected_semester)
+    # Present/total counters per subject, read from the summary table instead of counting records
+    summaries = {
+        summary.subject_id: summary
+        for summary in AttendanceSummary.objects.filter(student=request.user)
+    }
+
+    # All subjects assigned to the student's class (for the semester-wise breakdown)
+    all_subjects = list(
+        Subject.objects.filter(class_assigned=student.student_class).select_related('course', 'course__department')
+    )
+
+    # Subjects filtered by selected semester
+    subjects = [s for s in all_subjects if not selected_semester or s.course.semester == selected_semester]
 
     # Filter by subject if requested
     selected_subject_id = request.GET.get('subject')
     selected_subject = None
     if selected_subject_id:
-        try:
-            selected_subject = subjects.get(id=selected_subject_id)
-        except Subject.DoesNotExist:
-            pass
+        selected_subject = next((s for s in subjects if str(s.id) == selected_subject_id), None)
 
     # Build per-subject rows and aggregates by subject type
     rows = []
@@ -150,7 +128,7 @@ def attendance(request):
         'TU': {'present': 0, 'total': 0},
     }
     
-    # Group by semester for semester-wise breakdown (using ALL attendance records)
+    # Group by semester for semester-wise breakdown (across all semesters)
     semester_attendance = {}
     for semester_num, semester_name in semesters:
         semester_attendance[semester_num] = {
@@ -161,14 +139,11 @@ def attendance(request):
             'percentage': 0.0
         }
 
-    # Get all subjects for semester-wise breakdown
-    all_subjects = Subject.objects.filter(class_assigned=student.student_class).select_related('course', 'course__department')
-    
-    # Build semester-wise data from all subjects and all attendance records
     for subject in all_subjects:
-        total = all_attendance_records.filter(subject=subject).count()
-        present = all_attendance_records.filter(subject=subject, is_present=True).count()
-        percentage = round((present / total * 100), 2) if total > 0 else 0.0
+        summary = summaries.get(subject.id)
+        present = summary.present_count if summary else 0
+        total = summary.total_count if summary else 0
+        percentage = summary.percentage if summary else 0.0
         
         # Add to semester-wise data
         sem = subject.course.semester
@@ -182,11 +157,9 @@ def attendance(request):
             semester_attendance[sem]['present'] += present
             semester_attendance[sem]['total'] += total
 
-    # Build rows for filtered subjects (based on selected semester)
-    for subject in subjects:
-        total = attendance_records.filter(subject=subject).count()
-        present = attendance_records.filter(subject=subject, is_present=True).count()
-        percentage = round((present / total * 100), 2) if total > 0 else 0.0
+        # Build rows for filtered subjects (based on selected semester)
+        if selected_semester and sem != selected_semester:
+            continue
 
         rows.append({
             'subject': subject,
@@ -194,7 +167,7 @@ def attendance(request):
             'present': present,
             'total': total,
             'percentage': percentage,
-            'semester': subject.course.semester,
+            'semester': sem,
         })
 
         if subject.subject_type in aggregates:
@@ -256,14 +229,10 @@ def attendance(request):
     }
     return render(request, 'students/attendance.html', context)
 
-@login_required
+@role_required('student')
 def exams(request):
     """Display upcoming and past exams with results"""
-    if not request.user.is_student:
-        messages.error(request, "Access denied.")
-        return redirect('accounts:login')
-    
-    student = request.user.student_profile
+    student = request.profile
     
     # Get all exams for student's class
     upcoming_exams = Exam.objects.filter(
@@ -303,14 +272,10 @@ def exams(request):
     }
     return render(request, 'students/exams.html', context)
 
-@login_required
+@role_required('student')
 def results(request):
     """Display exam results and grades"""
-    if not request.user.is_student:
-        messages.error(request, "Access denied.")
-        return redirect('accounts:login')
-    
-    student = request.user.student_profile
+    student = request.profile
     
     # Get all results (published and unpublished)
     results = Result.objects.filter(
@@ -342,17 +307,13 @@ def results(request):
     }
     return render(request, 'students/results.html', context)
 
-@login_required
+@role_required('student')
 def fees(request):
     """Display fee details and payment status"""
-    if not request.user.is_student:
-        messages.error(request, "Access denied.")
-        return redirect('accounts:login')
-    
     from academics.models import PaymentMethod, Transaction
     import uuid
     
-    student = request.user.student_profile
+    student = request.profile
     
     all_fees = Fee.objects.filter(
         student=request.user
@@ -369,7 +330,7 @@ def fees(request):
     total_fees_amount = total_pending + total_paid + total_partial
     
     # Get available payment methods
-    payment_methods = PaymentMethod.objects.filter(is_active=True)
+    payment_methods = active_payment_methods()
     
     # Handle payment processing
     if request.method == 'POST':
@@ -391,38 +352,42 @@ def fees(request):
                     messages.error(request, "Invalid amount entered.")
                     return redirect('students:fees')
                 
-                # Create transaction
-                transaction_id = f"TXN-{uuid.uuid4().hex[:12].upper()}"
-                transaction = Transaction.objects.create(
-                    fee=fee,
-                    payment_method=payment_method,
-                    amount=amount_decimal,
-                    status='completed',
-                    transaction_id=transaction_id,
-                    reference_number=reference_number,
-                    completed_at=timezone.now()
-                )
+                with transaction.atomic():
+                    # Create transaction
+                    transaction_id = f"TXN-{uuid.uuid4().hex[:12].upper()}"
+                    payment = Transaction.objects.create(
+                        fee=fee,
+                        payment_method=payment_method,
+                        amount=amount_decimal,
+                        status='completed',
+                        transaction_id=transaction_id,
+                        reference_number=reference_number,
+                        completed_at=timezone.now()
+                    )
                 
-                # Update fee status based on amount
-                if amount_decimal >= fee.amount:
-                    fee.payment_status = 'paid'
-                    fee.payment_date = timezone.now().date()
-                    success_msg = f"""
-                    ✅ <strong>Full Payment Successful!</strong><br>
-                    Amount Paid: <strong>₹{amount_decimal}</strong><br>
-                    Transaction ID: <strong>{transaction_id}</strong><br>
-                    <a href="{{{{ url 'students:fee_receipt' {0} }}}}" target="_blank" class="btn btn-sm btn-primary mt-2">
-                        📄 Download Receipt
-                    </a>
-                    """.format(fee.id)
-                    messages.success(request, success_msg)
-                elif amount_decimal > 0:
-                    fee.payment_status = 'partial'
-                    messages.success(request, f"✅ Partial payment of ₹{amount_decimal} received!\nTransaction ID: {transaction_id}\nRemaining: ₹{fee.amount - amount_decimal}")
+                    # Update fee status based on amount
+                    if amount_decimal >= fee.amount:
+                        fee.payment_status = 'paid'
+                        fee.payment_date = timezone.now().date()
+                        success_msg = f"""
+                        ✅ <strong>Full Payment Successful!</strong><br>
+                        Amount Paid: <strong>₹{amount_decimal}</strong><br>
+                        Transaction ID: <strong>{transaction_id}</strong><br>
+                        <a href="{{{{ url 'students:fee_receipt' {0} }}}}" target="_blank" class="btn btn-sm btn-primary mt-2">
+                            📄 Download Receipt
+                        </a>
+                        """.format(fee.id)
+                        messages.success(request, success_msg)
+                    elif amount_decimal > 0:
+                        fee.payment_status = 'partial'
+                        messages.success(request, f"✅ Partial payment of ₹{amount_decimal} received!\nTransaction ID: {transaction_id}\nRemaining: ₹{fee.amount - amount_decimal}")
                 
-                fee.payment_method = payment_method.get_method_type_display() if payment_method else 'Online'
-                fee.transaction_id = transaction_id
-                fee.save()
+                    fee.payment_method = payment_method.get_method_type_display() if payment_method else 'Online'
+                    fee.transaction_id = transaction_id
+                    fee.save()
+                    
+                    # Add the payment to the daily collection rollup
+                    record_fee_collection(payment)
         
         except Fee.DoesNotExist:
             messages.error(request, "Fee not found.")
@@ -454,13 +419,9 @@ def fees(request):
     return render(request, 'students/fees.html', context)
 
 
-@login_required
+@role_required('student')
 def fee_receipt(request, fee_id):
     """Generate and display fee payment receipt with all payment details"""
-    if not request.user.is_student:
-        messages.error(request, "Access denied.")
-        return redirect('accounts:login')
-    
     try:
         fee = Fee.objects.get(id=fee_id, student=request.user)
     except Fee.DoesNotExist:
@@ -468,7 +429,7 @@ def fee_receipt(request, fee_id):
         return redirect('students:fees')
     
     # Get student profile
-    student = request.user.student_profile
+    student = request.profile
     
     # Get transaction details if the fee is paid
     transaction = None
@@ -492,37 +453,38 @@ def fee_receipt(request, fee_id):
     }
     return render(request, 'students/fee_receipt.html', context)
 
-@login_required
+@role_required('student')
 def notifications(request):
-    """Display notifications for student"""
-    if not request.user.is_student:
-        messages.error(request, "Access denied.")
-        return redirect('accounts:login')
-    
-    student = request.user.student_profile
-    
-    notifications = Notification.objects.filter(
-        Q(target_audience='all') |
-        Q(target_audience='all_students') |
-        Q(target_audience='class', target_class=student.student_class) |
-        Q(target_audience='department', target_department=student.department) |
-        Q(target_audience='individual_student', target_student=student)
-    ).order_by('-created_at')
+    """Display the student's notification inbox, one page at a time"""
+    student = request.profile
+    
+    cursor = request.GET.get('before')
+    notifications, next_cursor = inbox_page(student, cursor)
     
     context = {
         'student': student,
         'notifications': notifications,
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
+        # Kept current by publishing and mark_read; the refresh_unread_counts command handles expiry
+        'unread_count': request.user.unread_notifications,
     }
     return render(request, 'students/notifications.html', context)
 
-@login_required
+@role_required('student')
+def mark_notifications_read(request):
+    """Mark one notification, or every notification, as read"""
+    if request.method == 'POST':
+        student = request.profile
+        notification_ids = request.POST.getlist('notification_id') or None
+        mark_read(student, request.user, notification_ids)
+    
+    return redirect('students:notifications')
+
+@role_required('student')
 def academic_calendar(request):
     """Display academic calendar for the institution"""
-    if not request.user.is_student:
-        messages.error(request, "Access denied.")
-        return redirect('accounts:login')
-    
-    student = request.user.student_profile
+    student = request.profile
     
     # Get academic calendar events
     calendar_events = AcademicCalendar.objects.all().order_by('start_date')
@@ -534,13 +496,9 @@ def academic_calendar(request):
     return render(request, 'students/academic_calendar.html', context)
 
 
-@login_required
+@role_required('student')
 def download_fee_receipt(request, fee_id):
     """Download fee receipt as PDF"""
-    if not request.user.is_student:
-        messages.error(request, "Access denied.")
-        return redirect('accounts:login')
-    
     try:
         fee = Fee.objects.get(id=fee_id, student=request.user)
     except Fee.DoesNotExist:
@@ -558,7 +516,7 @@ def download_fee_receipt(request, fee_id):
         from io import BytesIO
         from django.http import HttpResponse
         
-        student = request.user.student_profile
+        student = request.profile
         
         # Get transaction details
         from academics.models import Transaction
@@ -1,3 +1,127 @@
+from datetime import date
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import User
+from academics.models import Department, Course, Class, Subject, Attendance, AttendanceSummary
+from students.models import Student, Notification
+from tests_utils import create_student
+from .models import Teacher
+from .views import save_attendance, create_attendance_notification, load_teacher_dashboard
+
+
+class SaveAttendanceTests(TestCase):
+    """Bulk attendance write path used by attendance_mark"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Computer Engineering', code='CE')
+        cls.teacher = User.objects.create_user('teacher', user_type='teacher')
+        cls.subjects = {}
+        for size in (5, 40):
+            student_class = Class.objects.create(
+                name=f'CE-{size}', department=cls.department, semester=1,
+                section=str(size), academic_year='2025-2026'
+            )
+            course = Course.objects.create(
+                name=f'Course {size}', code=f'CE{size}', department=cls.department, semester=1, credits=3
+            )
+            cls.subjects[size] = Subject.objects.create(course=course, class_assigned=student_class, teacher=cls.teacher)
+            for i in range(size):
+                user = User.objects.create_user(f'student{size}_{i}', user_type='student')
+                create_student(user, student_class, f'{size}-{i:03d}', f'ADM{size}-{i:03d}')
+
+    def mark(self, size, present_count, day=date(2025, 10, 1)):
+        subject = self.subjects[size]
+        students = list(Student.objects.filter(student_class=subject.class_assigned).select_related('user'))
+        present_ids = {str(s.id) for s in students[:present_count]}
+        with CaptureQueriesContext(connection) as queries:
+            counts = save_attendance(subject, day, students, present_ids, {}, self.teacher)
+        return counts, len(queries)
+
+    def test_query_count_does_not_grow_with_class_size(self):
+        _, small = self.mark(5, 3)
+        _, large = self.mark(40, 30)
+        self.assertEqual(small, large)
+
+        _, small_remark = self.mark(5, 1)
+        _, large_remark = self.mark(40, 10)
+        self.assertEqual(small_remark, large_remark)
+
+    def test_reports_created_then_updated(self):
+        self.assertEqual(self.mark(5, 3)[0], (5, 0))
+        self.assertEqual(self.mark(5, 1)[0], (0, 5))
+
+        subject = self.subjects[5]
+        self.assertEqual(Attendance.objects.filter(subject=subject).count(), 5)
+        self.assertEqual(Attendance.objects.filter(subject=subject, is_present=True).count(), 1)
+        self.assertEqual(
+            sorted(AttendanceSummary.objects.filter(subject=subject).values_list('present_count', 'total_count')),
+            [(0, 1)] * 4 + [(1, 1)]
+        )
+
+    def test_remarking_updates_the_same_notification(self):
+        subject = self.subjects[5]
+        first = create_attendance_notification(subject, date(2025, 10, 1), self.teacher)
+        again = create_attendance_notification(subject, date(2025, 10, 1), self.teacher)
+        create_attendance_notification(subject, date(2025, 10, 2), self.teacher)
+
+        self.assertEqual(first.pk, again.pk)
+        self.assertTrue(again.title.startswith('Attendance Updated'))
+        self.assertEqual(Notification.objects.filter(target_class=subject.class_assigned).count(), 2)
+
+
+class TeacherDashboardTests(TestCase):
+    """Fixed-cost loader behind the teacher dashboard"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Computer Engineering', code='CE')
+        cls.other_department = Department.objects.create(name='Mechanical Engineering', code='ME')
+        student_class = Class.objects.create(
+            name='CE-1', department=cls.department, semester=1, section='A', academic_year='2025-2026'
+        )
+        cls.teachers = {}
+        for count in (1, 6):
+            user = User.objects.create_user(f'teacher{count}', user_type='teacher')
+            cls.teachers[count] = user
+            Teacher.objects.create(
+                user=user, employee_id=f'EMP{count}', department=cls.department, designation='Lecturer',
+                qualification='master', employment_type='permanent', joining_date=date(2020, 7, 1)
+            )
+            for i in range(count):
+                course = Course.objects.create(
+                    name=f'Course {count}-{i}', code=f'CE{count}{i}', department=cls.department, semester=1, credits=3
+                )
+                Subject.objects.create(course=course, class_assigned=student_class, teacher=user)
+
+    def load(self, count):
+        with CaptureQueriesContext(connection) as queries:
+            data = load_teacher_dashboard(self.teachers[count], today=date(2025, 10, 1))
+        return data, len(queries)
+
+    def test_query_count_does_not_grow_with_subjects(self):
+        few, few_queries = self.load(1)
+        many, many_queries = self.load(6)
+        self.assertEqual(len(few['pending_today']), 1)
+        self.assertEqual(len(many['pending_today']), 6)
+        self.assertEqual(few_queries, many_queries)
+
+    def test_notifications_follow_department_and_individual_targets(self):
+        teacher = self.teachers[1]
+        profile = teacher.teacher_profile
+        other_profile = self.teachers[6].teacher_profile
+        for title, audience, extra in [
+            ('Everyone', 'all', {}),
+            ('Own department', 'department', {'target_department': self.department}),
+            ('Other department', 'department', {'target_department': self.other_department}),
+            ('Just me', 'individual_teacher', {'target_teacher': profile}),
+            ('Someone else', 'individual_teacher', {'target_teacher': other_profile}),
+            ('Students only', 'all_students', {}),
+        ]:
+            Notification.objects.create(title=title, message=title, target_audience=audience, created_by=teacher, **extra)
 
-# Create your tests here.
+        titles = {n.title for n in self.load(1)[0]['teacher_notifications']}
+        self.assertEqual(titles, {'Everyone', 'Own department', 'Just me'})
@@ -1,106 +1,164 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import Exists, OuterRef, Subquery
 from datetime import datetime, timedelta
-from collections import defaultdict
 
 from academics.models import Class, Subject, Attendance, Course, Timetable, Exam, TimeSlot, TeacherTimetable
+from academics.reference import time_slots
+from academics.rollups import apply_attendance_changes, refresh_daily_attendance
+from academics.timetables import teacher_timetable_grid
+from accounts.decorators import role_required
 from students.models import Student, Notification
-
-
-def create_attendance_notification(subject, date, marked_by, students):
-    """Create attendance notifications for students when attendance is marked"""
-    # Create notification for the class
-    notification = Notification.objects.create(
-        title=f"Attendance Marked - {subject.course.name}",
-        message=f"Attendance has been marked for {subject.course.name} on {date.strftime('%B %d, %Y')} by {marked_by.get_full_name()}.",
-        notification_type='academic',
-        target_audience='class',
-        target_class=subject.class_assigned,
-        created_by=marked_by,
-        is_urgent=False
+from students.notices import count_as_unread, teacher_notifications
+from administration.stats import invalidate_dashboard_stats
+
+
+def create_attendance_notification(subject, date, marked_by):
+    """
+    Tell the class that attendance was marked for a subject and date.
+
+    There is one class-level notification per (subject, date): re-marking the same
+    lecture updates it in place rather than adding rows for every student.
+    """
+    course_name = subject.course.name
+    date_text = date.strftime('%B %d, %Y')
+    notification, created = Notification.objects.get_or_create(
+        coalesce_key=f"attendance:{subject.id}:{date.isoformat()}",
+        defaults={
+            'title': f"Attendance Marked - {course_name}",
+            'message': f"Attendance has been marked for {course_name} on {date_text} by {marked_by.get_full_name()}. Check your attendance records for details.",
+            'notification_type': 'academic',
+            'target_audience': 'class',
+            'target_class': subject.class_assigned,
+            'created_by': marked_by,
+            'is_urgent': False,
+        }
     )
-    
-    # Also create individual notifications for each student
+    if created:
+        count_as_unread(notification)
+    else:
+        notification.title = f"Attendance Updated - {course_name}"
+        notification.message = f"Attendance for {course_name} on {date_text} was updated by {marked_by.get_full_name()}. Check your attendance records for details."
+        notification.created_by = marked_by
+        notification.save(update_fields=['title', 'message', 'created_by'])
+    return notification
+
+
+def save_attendance(subject, date, students, present_ids, remarks_map, marked_by):
+    """
+    Write one marking of a subject for a date as a set-based upsert.
+
+    Existing rows for (subject, date) are read once, then every row is written with a
+    single INSERT ... ON CONFLICT on the (student, subject, date) key, so the number of
+    statements does not grow with class size. The attendance rollups are updated in the
+    same transaction. Returns (created, updated) counts.
+    """
+    previous = dict(
+        Attendance.objects.filter(subject=subject, date=date).values_list('student_id', 'is_present')
+    )
+
+    records = []
+    changes = {}
     for student in students:
-        Notification.objects.create(
-            title=f"Your Attendance Marked - {subject.course.name}",
-            message=f"Your attendance for {subject.course.name} on {date.strftime('%B %d, %Y')} has been marked by {marked_by.get_full_name()}. Check your attendance records for details.",
-            notification_type='academic',
-            target_audience='individual_student',
-            target_student=student,
-            created_by=marked_by,
-            is_urgent=False
+        is_present = str(student.id) in present_ids
+        changes[student.user_id] = (previous.get(student.user_id), is_present)
+        records.append(Attendance(
+            student_id=student.user_id,
+            subject=subject,
+            date=date,
+            is_present=is_present,
+            remarks=remarks_map.get(str(student.id), ''),
+            marked_by=marked_by,
+        ))
+
+    with transaction.atomic():
+        Attendance.objects.bulk_create(
+            records,
+            update_conflicts=True,
+            unique_fields=['student', 'subject', 'date'],
+            update_fields=['is_present', 'remarks', 'marked_by'],
         )
+        apply_attendance_changes(subject, changes)
+        refresh_daily_attendance([date], subject=subject)
+    # bulk_create sends no post_save, so drop the cached admin statistics here
+    invalidate_dashboard_stats()
+
+    updated = sum(1 for was_present, _ in changes.values() if was_present is not None)
+    return len(changes) - updated, updated
+
+
+def load_teacher_dashboard(teacher_user, today=None):
+    """
+    Everything the teacher dashboard shows, as evaluated lists.
+
+    Each panel is one query: whether a subject was marked today is annotated onto
+    the subject rows, and today's slots come from the teacher's own timetable for
+    their latest academic year. The query count does not depend on how many
+    subjects the teacher has.
+    """
+    now = timezone.now()
+    today = today or now.date()
+    weekday = today.strftime('%A').lower()
 
-
-@login_required
-def dashboard(request):
-    """Teacher dashboard with overview similar to student/admin dashboards."""
-    if not request.user.is_teacher:
-        messages.error(request, "Access denied.")
-        return redirect('accounts:login')
-
-    teacher_user = request.user
-
-    # Subjects taught by this teacher
-    subjects = Subject.objects.filter(teacher=teacher_user).select_related('course', 'class_assigned')
+    # Subjects taught by this teacher, flagged when attendance exists for today
+    subjects = list(Subject.objects.filter(teacher=teacher_user).select_related(
+        'course', 'class_assigned__department'
+    ).annotate(
+        marked_today=Exists(Attendance.objects.filter(subject=OuterRef('pk'), date=today))
+    ))
 
     # Classes managed by this teacher as class teacher
-    managed_classes = Class.objects.filter(class_teacher=teacher_user).select_related('department')
-
-    # Today's timetable slots for teacher's subjects
-    today = timezone.now().date()
-    weekday = today.strftime('%A').lower()
-    todays_slots = Timetable.objects.filter(
-        subject__in=subjects,
+    managed_classes = list(Class.objects.filter(class_teacher=teacher_user).select_related('department'))
+
+    # Today's slots from the teacher's timetable
+    latest_year = TeacherTimetable.objects.filter(
+        teacher=teacher_user
+    ).order_by('-academic_year').values('academic_year')[:1]
+    todays_slots = list(TeacherTimetable.objects.filter(
+        teacher=teacher_user,
+        academic_year=Subquery(latest_year),
         time_slot__day=weekday,
-    ).select_related('subject__course', 'class_assigned', 'time_slot').order_by('time_slot__start_time')
+    ).select_related(
+        'subject__course', 'subject__class_assigned__department', 'time_slot'
+    ).order_by('time_slot__start_time'))
 
     # Upcoming exams for teacher's subjects
-    upcoming_exams = Exam.objects.filter(
-        subject__in=subjects,
-        date__gte=timezone.now()
-    ).select_related('subject__course').order_by('date')[:5]
+    upcoming_exams = list(Exam.objects.filter(
+        subject__teacher=teacher_user,
+        date__gte=now
+    ).select_related('subject__course').order_by('date')[:5])
 
     # Recent attendance marked by this teacher
-    recent_marked_attendance = Attendance.objects.filter(
+    recent_marked_attendance = list(Attendance.objects.filter(
         marked_by=teacher_user
-    ).select_related('subject__course', 'student').order_by('-date')[:10]
-
-    # Pending attendance to mark today (subjects where no records exist for today)
-    pending_today = []
-    for sub in subjects:
-        has_today = Attendance.objects.filter(subject=sub, date=today).exists()
-        if not has_today:
-            pending_today.append(sub)
+    ).select_related('subject__course', 'student').order_by('-date')[:10])
 
-    # Notifications targeting teachers
-    teacher_notifications = Notification.objects.filter(
-        # all + all_teachers + department + individual_teacher
-        target_audience__in=['all', 'all_teachers']
-    ).order_by('-created_at')[:5]
+    # Notifications for everyone, all teachers, the teacher's department or the teacher
+    teacher_notices = list(teacher_notifications(teacher_user, now).order_by('-created_at')[:5])
 
-    context = {
+    return {
         'subjects': subjects,
         'managed_classes': managed_classes,
         'todays_slots': todays_slots,
         'upcoming_exams': upcoming_exams,
         'recent_marked_attendance': recent_marked_attendance,
-        'pending_today': pending_today,
+        'pending_today': [sub for sub in subjects if not sub.marked_today],
+        'teacher_notifications': teacher_notices,
         'today': today,
     }
+
+
+@role_required('teacher', profile=False)
+def dashboard(request):
+    """Teacher dashboard with overview similar to student/admin dashboards."""
+    context = load_teacher_dashboard(request.user)
     return render(request, 'teachers/dashboard.html', context)
 
-@login_required
+@role_required('teacher', profile=False)
 def attendance_select(request):
     """Allow a teacher to select semester, subject, and date to mark attendance."""
-    if not request.user.is_teacher:
-        messages.error(request, "Access denied.")
-        return redirect('accounts:login')
-
     # Get filter parameters
     selected_semester = request.GET.get('semester')
     selected_subject_id = request.GET.get('subject')
@@ -138,14 +196,10 @@ def attendance_select(request):
     return render(request, 'teachers/attendance_select.html', context)
 
 
-@login_required
+@role_required('teacher', profile=False)
 @transaction.atomic
 def attendance_mark(request, subject_id):
     """Mark attendance for all students in a class for a subject and date."""
-    if not request.user.is_teacher:
-        messages.error(request, "Access denied.")
-        return redirect('accounts:login')
-
     # Only allow teacher assigned to this subject to mark attendance
     subject = get_object_or_404(
         Subject.objects.select_related('course', 'class_assigned'), 
@@ -169,28 +223,10 @@ def attendance_mark(request, subject_id):
                 student_id = key.split('remark_')[1]
                 remarks_map[student_id] = value
 
-        created, updated = 0, 0
-        for student in students:
-            is_present = str(student.id) in present_ids
-            remarks = remarks_map.get(str(student.id), '')
-
-            obj, existed = Attendance.objects.update_or_create(
-                student=student.user,
-                subject=subject,
-                date=date,
-                defaults={
-                    'is_present': is_present,
-                    'remarks': remarks,
-                    'marked_by': request.user,
-                }
-            )
-            if existed:
-                updated += 1
-            else:
-                created += 1
-
-        # Create notifications for students
-        create_attendance_notification(subject, date, request.user, students)
+        created, updated = save_attendance(subject, date, students, present_ids, remarks_map, request.user)
+
+        # Notify the class (one notification per subject and date)
+        create_attendance_notification(subject, date, request.user)
         
         messages.success(request, f"Attendance saved for {subject.course.name} on {date}. Created {created}, updated {updated}.")
         return redirect('teachers:attendance')
@@ -217,42 +253,14 @@ def attendance_mark(request, subject_id):
     return render(request, 'teachers/attendance_mark.html', context)
 
 
-@login_required
+@role_required('teacher', profile=False)
 def teacher_timetable(request):
     """Display organized teacher timetable in grid format."""
-    if not request.user.is_teacher:
-        messages.error(request, "Access denied.")
-        return redirect('accounts:login')
-
     # Get selected academic year from GET params
     selected_year = request.GET.get('year', '2025-2026')
     
-    # Get teacher's timetable
-    teacher_timetable_objs = TeacherTimetable.objects.filter(
-        teacher=request.user,
-        academic_year=selected_year
-    ).select_related('subject__course', 'subject__class_assigned', 'time_slot').order_by(
-        'time_slot__day', 'time_slot__start_time'
-    )
-    
-    # Organize timetable by day for grid display
-    organized_timetable = defaultdict(list)
-    time_slots_set = set()
-    days_set = set()
-    unique_classes = set()
-    unique_subjects = set()
-    
-    for entry in teacher_timetable_objs:
-        day = entry.time_slot.day.lower()
-        organized_timetable[day].append(entry)
-        days_set.add(day)
-        time_slots_set.add((entry.time_slot.start_time, entry.time_slot.end_time))
-        unique_classes.add(entry.subject.class_assigned.id)
-        unique_subjects.add(entry.subject.course.id)
-    
-    # Convert to sorted lists
-    days = sorted(list(days_set), key=lambda x: ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday'].index(x))
-    time_slots = sorted(list(time_slots_set))
+    # Day x slot grid, built in one query and cached until the timetable changes
+    grid = teacher_timetable_grid(request.user.id, selected_year)
     
     # Get available academic years
     academic_years = TeacherTimetable.objects.filter(
@@ -260,48 +268,39 @@ def teacher_timetable(request):
     ).values_list('academic_year', flat=True).distinct().order_by('-academic_year')
     
     context = {
-        'teacher_timetable': teacher_timetable_objs,
-        'organized_timetable': organized_timetable,
-        'days': days,
-        'time_slots': time_slots,
+        'grid': grid,
+        'teacher_timetable': grid['entries'],
+        'days': grid['days'],
         'academic_years': academic_years or ['2025-2026'],
         'selected_year': selected_year,
-        'unique_classes': len(unique_classes),
-        'unique_subjects': len(unique_subjects),
+        'unique_classes': grid['class_count'],
+        'unique_subjects': grid['course_count'],
     }
     return render(request, 'teachers/timetable.html', context)
 
 
-@login_required
+@role_required('teacher', profile=False)
 def exam_select(request):
     """Allow a teacher to select subjects and schedule an exam."""
-    if not request.user.is_teacher:
-        messages.error(request, "Access denied.")
-        return redirect('accounts:login')
-    
     # Get subjects taught by this teacher
     subjects = Subject.objects.filter(
         teacher=request.user
     ).select_related('course', 'class_assigned').order_by('course__code')
     
     # Get time slots for the form
-    time_slots = TimeSlot.objects.all().order_by('start_time')
+    slots = sorted(time_slots(), key=lambda slot: slot.start_time)
     
     context = {
         'subjects': subjects,
-        'time_slots': time_slots,
+        'time_slots': slots,
         'exam_types': Exam.EXAM_TYPE_CHOICES,
     }
     return render(request, 'teachers/exam_select.html', context)
 
 
-@login_required
+@role_required('teacher', profile=False)
 def schedule_exam(request):
     """Create exam records for selected subjects."""
-    if not request.user.is_teacher:
-        messages.error(request, "Access denied.")
-        return redirect('accounts:login')
-    
     if request.method == 'POST':
         exam_name = request.POST.get('exam_name', '').strip()
         exam_type = request.POST.get('exam_type', 'quiz')
@@ -381,13 +380,9 @@ def schedule_exam(request):
     return redirect('teachers:exam_select')
 
 
-@login_required
+@role_required('teacher', profile=False)
 def my_classes(request):
     """Display classes managed by the teacher"""
-    if not request.user.is_teacher:
-        messages.error(request, "Access denied.")
-        return redirect('accounts:login')
-    
     from students.models import Student
     
     managed_classes = Class.objects.filter(
@@ -410,13 +405,9 @@ def my_classes(request):
     return render(request, 'teachers/my_classes.html', context)
 
 
-@login_required
+@role_required('teacher', profile=False)
 def enter_grades(request):
     """Allow teachers to enter student grades for exams"""
-    if not request.user.is_teacher:
-        messages.error(request, "Access denied.")
-        return redirect('accounts:login')
-    
     from academics.models import Result
     from students.models import Student
     
@@ -0,0 +1,20 @@
+"""Fixtures shared by the test suites of every app; imported only by tests.py modules"""
+from datetime import date
+
+from students.models import Student
+
+
+def create_student(user, student_class, roll_number, admission_number, **fields):
+    """A Student profile for `user` in `student_class`, with placeholder guardian details"""
+    fields = {
+        'department': student_class.department,
+        'admission_date': date(2025, 7, 1),
+        'guardian_name': 'Guardian',
+        'guardian_phone': '9999999999',
+        'guardian_address': 'Pune',
+        'emergency_contact': '9999999999',
+        **fields,
+    }
+    return Student.objects.create(
+        user=user, roll_number=roll_number, admission_number=admission_number, student_class=student_class, **fields
+    )